@@ -13,7 +13,13 @@ from .models import County, Species, CountySpecies, CountyEnvironment
 
 @admin.action(description='Approve selected alerts')
 def approve_alerts(modeladmin, request, queryset):
-    queryset.update(is_approved=True)
+    moved = queryset.set_status('verified')
+    modeladmin.message_user(request, f"{moved} alert(s) marked as verified.")
+
+@admin.action(description='Mark selected alerts as resolved')
+def resolve_alerts(modeladmin, request, queryset):
+    moved = queryset.set_status('resolved')
+    modeladmin.message_user(request, f"{moved} alert(s) marked as resolved.")
 
 # Admin class for Alert with the custom action
 
@@ -21,7 +27,7 @@ class ReportAdmin(admin.ModelAdmin):
     list_display = ('title', 'reporter', 'report_type', 'status', 'has_image')  
     list_filter = ('report_type', 'status')
     readonly_fields = ('image_preview',)
-    actions = [approve_alerts]
+    actions = [approve_alerts, resolve_alerts]
     fieldsets = (
         ('Report Information', {
             'fields': ('title', 'description', 'report_type', 'location_name', 'phoneNumber', 'reporter')
@@ -6,3 +6,4 @@ class AppConfig(AppConfig):
 
     def ready(self):
         import App.signals  # Import signals to register signal handlers
+        import App.checks  # Register system checks
@@ -0,0 +1,22 @@
+import os
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def county_boundaries_check(app_configs, **kwargs):
+    """Point-in-polygon county detection needs a boundary file; without one it falls back to centroids"""
+    path = getattr(settings, 'COUNTY_BOUNDARIES_GEOJSON', '')
+    if not path:
+        return [Warning(
+            "COUNTY_BOUNDARIES_GEOJSON is not set, counties are resolved by nearest centroid only.",
+            hint="Point it at a GeoJSON FeatureCollection of Kenya's county boundaries.",
+            id='App.W001',
+        )]
+    if not os.path.exists(path):
+        return [Warning(
+            f"COUNTY_BOUNDARIES_GEOJSON file {path} does not exist, counties are resolved by nearest centroid only.",
+            hint="Download a Kenya county boundary GeoJSON to that path or fix the setting.",
+            id='App.W002',
+        )]
+    return []
@@ -0,0 +1,165 @@
+"""
+County resolution from boundary polygons
+
+County polygons are read once from the GeoJSON file at
+COUNTY_BOUNDARIES_GEOJSON and bucketed into a bounding-box grid, so a lookup
+only runs the exact point-in-polygon test on the one or two counties whose
+boxes cover the point. Points outside every polygon (or all points, when the
+setting is empty or the file is missing, which manage.py check warns about)
+fall back to the nearest county centroid.
+"""
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+COUNTY_BOUNDARIES_GEOJSON = getattr(settings, 'COUNTY_BOUNDARIES_GEOJSON', '')
+BOUNDARY_GRID_DEGREES = getattr(settings, 'COUNTY_BOUNDARY_GRID_DEGREES', 0.25)
+
+# Feature properties that commonly hold the county name in published Kenya datasets
+NAME_PROPERTIES = ('name', 'NAME', 'COUNTY', 'COUNTY_NAM', 'county', 'shapeName', 'ADM1_EN')
+
+
+def feature_name(properties):
+    for key in NAME_PROPERTIES:
+        if properties.get(key):
+            return str(properties[key]).replace(' County', '').strip()
+    return None
+
+
+def points_in_ring(lons, lats, ring):
+    """Even-odd ray casting for many points against one closed ring"""
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    lons = lons[:, None]
+    lats = lats[:, None]
+    straddles = (y1 > lats) != (y2 > lats)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (lats - y1) * (x2 - x1) / (y2 - y1)
+    return ((straddles & (lons < x_cross)).sum(axis=1) % 2) == 1
+
+
+class BoundaryIndex:
+    """County polygons bucketed into a bounding-box grid"""
+
+    def __init__(self, path=COUNTY_BOUNDARIES_GEOJSON, grid=BOUNDARY_GRID_DEGREES):
+        self.path = path
+        self.grid = grid
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.polygons = []  # (name, (min_lon, min_lat, max_lon, max_lat), [outer, *holes])
+        self.cells = defaultdict(list)
+
+    @property
+    def available(self):
+        self._load()
+        return bool(self.polygons)
+
+    def _cell(self, lon, lat):
+        return int(lon // self.grid), int(lat // self.grid)
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if np is None or not self.path or not os.path.exists(self.path):
+                logger.info("No county boundaries at %r, using nearest centroid", self.path)
+                self._loaded = True
+                return
+
+            with open(self.path, encoding='utf-8') as f:
+                features = json.load(f).get('features', [])
+
+            for feature in features:
+                name = feature_name(feature.get('properties') or {})
+                geometry = feature.get('geometry') or {}
+                if not name or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+                    continue
+                parts = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+                for part in parts:
+                    rings = [np.asarray(ring, dtype=float)[:, :2] for ring in part]
+                    outer = rings[0]
+                    bbox = (outer[:, 0].min(), outer[:, 1].min(), outer[:, 0].max(), outer[:, 1].max())
+                    polygon_id = len(self.polygons)
+                    self.polygons.append((name, bbox, rings))
+
+                    min_x, min_y = self._cell(bbox[0], bbox[1])
+                    max_x, max_y = self._cell(bbox[2], bbox[3])
+                    for cell_x in range(min_x, max_x + 1):
+                        for cell_y in range(min_y, max_y + 1):
+                            self.cells[(cell_x, cell_y)].append(polygon_id)
+
+            logger.info("Loaded %d county polygons", len(self.polygons))
+            self._loaded = True
+
+    def _contains(self, polygon_id, lons, lats):
+        _, (min_lon, min_lat, max_lon, max_lat), rings = self.polygons[polygon_id]
+        inside = (lons >= min_lon) & (lons <= max_lon) & (lats >= min_lat) & (lats <= max_lat)
+        if inside.any():
+            candidates = np.flatnonzero(inside)
+            hit = points_in_ring(lons[candidates], lats[candidates], rings[0])
+            for hole in rings[1:]:
+                hit &= ~points_in_ring(lons[candidates], lats[candidates], hole)
+            inside[candidates] = hit
+        return inside
+
+    def resolve_many(self, points):
+        """Return the containing county name for each (lat, lon), or None outside every polygon"""
+        self._load()
+        results = [None] * len(points)
+        if not self.polygons or not points:
+            return results
+
+        coords = np.asarray(points, dtype=float).reshape(-1, 2)
+        lats, lons = coords[:, 0], coords[:, 1]
+
+        # Group points by the polygons registered in their grid cell
+        candidates = defaultdict(list)
+        for i, (lat, lon) in enumerate(coords):
+            for polygon_id in self.cells.get(self._cell(lon, lat), ()):
+                candidates[polygon_id].append(i)
+
+        for polygon_id, indexes in candidates.items():
+            indexes = np.asarray([i for i in indexes if results[i] is None], dtype=int)
+            if not len(indexes):
+                continue
+            inside = self._contains(polygon_id, lons[indexes], lats[indexes])
+            name = self.polygons[polygon_id][0]
+            for i in indexes[inside]:
+                results[i] = name
+        return results
+
+    def resolve(self, lat, lon):
+        return self.resolve_many([(lat, lon)])[0]
+
+
+_BOUNDARY_INDEX = BoundaryIndex()
+
+
+def detect_county(lat, lon):
+    """Return the county containing a point, or the nearest centroid outside all boundaries"""
+    return detect_counties([(lat, lon)])[0]
+
+
+def detect_counties(points):
+    """Resolve many (lat, lon) points to county names in one pass"""
+    from .utils import detect_nearest_counties
+    points = [(float(lat), float(lon)) for lat, lon in points]
+    results = _BOUNDARY_INDEX.resolve_many(points)
+
+    missing = [i for i, name in enumerate(results) if name is None]
+    if missing:
+        for i, name in zip(missing, detect_nearest_counties([points[i] for i in missing])):
+            results[i] = name
+    return results
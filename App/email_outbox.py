@@ -0,0 +1,216 @@
+"""
+Outbox for transactional email
+
+Views queue messages with queue_email() instead of talking to SMTP inside
+the request. Queued rows are drained after the transaction commits by a
+single background thread per process (and by the drain_email_outbox command
+on a schedule), which claims a batch, sends it over one SMTP connection and
+records each message's delivery status. Failed messages are retried with
+exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS.
+"""
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+EMAIL_OUTBOX_BACKOFF_BASE = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_BASE', 60)
+EMAIL_OUTBOX_BACKOFF_MAX = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_MAX', 60 * 60)
+EMAIL_OUTBOX_CLAIM_TIMEOUT = getattr(settings, 'EMAIL_OUTBOX_CLAIM_TIMEOUT', 10 * 60)
+
+# One thread, so a process never drains twice at once; other processes are
+# kept apart by the row claims
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-outbox')
+
+
+def queue_email(subject, body, to, html_body='', from_email=None, kind='', dedupe_key=None):
+    """
+    Save a message to the outbox and drain it once the transaction commits
+
+    A message with a dedupe_key that was already queued is not queued again.
+    """
+    from .models import OutboundEmail
+    if dedupe_key:
+        existing = OutboundEmail.objects.filter(dedupe_key=dedupe_key).first()
+        if existing:
+            return existing
+    email = OutboundEmail.objects.create(
+        kind=kind,
+        dedupe_key=dedupe_key,
+        subject=subject,
+        body=body,
+        html_body=html_body or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[address for address in to if address],
+    )
+    transaction.on_commit(schedule_drain)
+    return email
+
+
+def queue_emails(messages, drain_after_commit=True):
+    """
+    Save many queue_email() keyword dicts in one insert
+
+    Messages whose dedupe_key was already queued are skipped. Bulk senders
+    that drain the outbox themselves pass drain_after_commit=False.
+    """
+    from .models import OutboundEmail
+    keys = [message['dedupe_key'] for message in messages if message.get('dedupe_key')]
+    queued = set(OutboundEmail.objects.filter(dedupe_key__in=keys).values_list('dedupe_key', flat=True)) if keys else set()
+    emails = OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            kind=message.get('kind', ''),
+            dedupe_key=message.get('dedupe_key'),
+            subject=message['subject'],
+            body=message['body'],
+            html_body=message.get('html_body') or '',
+            from_email=message.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+            to=[address for address in message['to'] if address],
+        )
+        for message in messages
+        if not message.get('dedupe_key') or message['dedupe_key'] not in queued
+    ], ignore_conflicts=True)
+    if emails and drain_after_commit:
+        transaction.on_commit(schedule_drain)
+    return emails
+
+
+def schedule_drain():
+    _executor.submit(_drain_in_background)
+
+
+def _drain_in_background():
+    try:
+        drain()
+    except Exception:
+        logger.exception("Email outbox drain crashed")
+    finally:
+        connection.close()  # Thread-local DB connection opened by the drain
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, in seconds, never shorter than the base delay"""
+    return random.uniform(EMAIL_OUTBOX_BACKOFF_BASE, min(EMAIL_OUTBOX_BACKOFF_MAX, EMAIL_OUTBOX_BACKOFF_BASE * (2 ** attempts)))
+
+
+def claim_batch(batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Mark a batch of due messages as sending and return them
+
+    Messages left in 'sending' by a process that died are claimed again after
+    EMAIL_OUTBOX_CLAIM_TIMEOUT.
+    """
+    from .models import OutboundEmail
+    now = timezone.now()
+    due = OutboundEmail.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) |
+        Q(status='sending', claimed_at__lt=now - timedelta(seconds=EMAIL_OUTBOX_CLAIM_TIMEOUT))
+    ).order_by('next_attempt_at')
+    with transaction.atomic():
+        batch = list(due.select_for_update(skip_locked=True)[:batch_size])
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(status='sending', claimed_at=now)
+    return batch
+
+
+def build_message(email, smtp_connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        connection=smtp_connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def record_failure(email, error):
+    from .models import OutboundEmail
+    attempts = email.attempts + 1
+    updates = {'attempts': attempts, 'last_error': str(error), 'claimed_at': None}
+    if attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+        updates['status'] = 'failed'
+    else:
+        updates['status'] = 'pending'
+        updates['next_attempt_at'] = timezone.now() + timedelta(seconds=retry_delay(attempts - 1))
+    OutboundEmail.objects.filter(pk=email.pk).update(**updates)
+    logger.warning("%s #%s attempt %d failed: %s", email.kind or 'email', email.pk, attempts, error)
+
+
+def send_batch(batch):
+    """Send claimed messages over one SMTP connection; return the number sent"""
+    from .models import OutboundEmail
+    smtp_connection = get_connection(fail_silently=False)
+    try:
+        smtp_connection.open()
+    except Exception as e:
+        for email in batch:
+            record_failure(email, e)
+        return 0
+
+    sent = 0
+    try:
+        for email in batch:
+            if not email.to:
+                OutboundEmail.objects.filter(pk=email.pk).update(status='failed', last_error='No recipients')
+                continue
+            try:
+                smtp_connection.send_messages([build_message(email, smtp_connection)])
+            except Exception as e:
+                record_failure(email, e)
+                continue
+            OutboundEmail.objects.filter(pk=email.pk).update(
+                status='sent', sent_at=timezone.now(), attempts=email.attempts + 1, last_error=''
+            )
+            sent += 1
+    finally:
+        try:
+            smtp_connection.close()
+        except Exception:
+            pass
+    return sent
+
+
+def drain_parallel(workers, batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Drain with several threads, each sending its batches over its own SMTP connection
+
+    Falls back to one thread on databases that cannot skip locked rows
+    (SQLite), where concurrent claims could pick the same messages.
+    """
+    if workers <= 1 or not connection.features.has_select_for_update_skip_locked:
+        return drain(batch_size)
+
+    def worker():
+        try:
+            return drain(batch_size)
+        finally:
+            connection.close()  # Thread-local DB connection opened by the worker
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='email-drain') as executor:
+        results = [future.result() for future in [executor.submit(worker) for _ in range(workers)]]
+    return sum(sent for sent, _ in results), sum(claimed for _, claimed in results)
+
+
+def drain(batch_size=EMAIL_OUTBOX_BATCH_SIZE, max_batches=None):
+    """Send due messages batch by batch until none are left; return (sent, claimed)"""
+    sent = claimed = batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = claim_batch(batch_size)
+        if not batch:
+            break
+        batches += 1
+        claimed += len(batch)
+        sent += send_batch(batch)
+    if claimed:
+        logger.info("Sent %d of %d messages", sent, claimed)
+    return sent, claimed
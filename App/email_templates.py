@@ -0,0 +1,130 @@
+"""
+Template-based rendering for notification emails
+
+Email templates live in App/templates/App/emails. The first time a template
+is used in a process its <style> rules are inlined into the matching
+elements' style attributes (mail clients drop <style> blocks) and the result
+is compiled into a Django Template that every later render reuses, so a send
+only pays for variable substitution. render_emails() renders one template for
+many recipients in a single pass, for bulk notifications.
+"""
+import re
+import threading
+from django.template import engines
+
+# Rules whose selectors are a tag, a class or tag.class can be inlined;
+# anything else (:hover, combinators, @media) stays in the <style> block
+SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?(?:\.([\w-]+))?$')
+STYLE_BLOCK = re.compile(r'<style[^>]*>(.*?)</style>', re.S | re.I)
+AT_RULE = re.compile(r'@[^{]+\{(?:[^{}]*\{[^{}]*\})*[^{}]*\}', re.S)
+CSS_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}', re.S)
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+OPEN_TAG = re.compile(r'<([a-zA-Z][\w-]*)(\s[^<>]*?)?(/?)>')
+CLASS_ATTR = re.compile(r'\sclass\s*=\s*"([^"]*)"', re.I)
+STYLE_ATTR = re.compile(r'\sstyle\s*=\s*"([^"]*)"', re.I)
+
+_compiled = {}
+_compile_lock = threading.Lock()
+
+
+def _declarations(block):
+    return '; '.join(' '.join(part.split()) for part in block.split(';') if part.strip())
+
+
+def parse_styles(css):
+    """Split CSS into inlinable (tag, class, declarations) rules and leftover CSS"""
+    css = CSS_COMMENT.sub('', css)
+    leftover = AT_RULE.findall(css)
+    css = AT_RULE.sub('', css)
+
+    rules = []
+    for selectors, block in CSS_RULE.findall(css):
+        kept = []
+        for selector in selectors.split(','):
+            selector = selector.strip()
+            match = SIMPLE_SELECTOR.match(selector)
+            if match and selector:
+                rules.append((match.group(1), match.group(2), _declarations(block)))
+            else:
+                kept.append(selector)
+        if kept:
+            leftover.append(f"{', '.join(kept)} {{ {_declarations(block)} }}")
+    return rules, leftover
+
+
+def _specificity(rule):
+    tag, css_class, _ = rule
+    return (1 if css_class else 0, 1 if tag else 0)
+
+
+def inline_css(html):
+    """Move simple <style> rules into style attributes; inline styles keep precedence"""
+    rules = []
+    leftover = []
+    for css in STYLE_BLOCK.findall(html):
+        block_rules, block_leftover = parse_styles(css)
+        rules.extend(block_rules)
+        leftover.extend(block_leftover)
+    if not rules:
+        return html
+
+    # Sort once by specificity; the stable sort keeps source order within a level
+    rules.sort(key=_specificity)
+
+    def apply(match):
+        tag, attrs, self_closing = match.group(1), match.group(2) or '', match.group(3)
+        class_match = CLASS_ATTR.search(attrs)
+        classes = set(class_match.group(1).split()) if class_match else set()
+        declarations = [
+            block for rule_tag, rule_class, block in rules
+            if (rule_tag is None or rule_tag.lower() == tag.lower())
+            and (rule_class is None or rule_class in classes)
+        ]
+        if not declarations:
+            return match.group(0)
+
+        style_match = STYLE_ATTR.search(attrs)
+        if style_match:
+            declarations.append(style_match.group(1).strip().rstrip(';'))
+            attrs = STYLE_ATTR.sub('', attrs, count=1)
+        style = '; '.join(block for block in declarations if block)
+        return f'<{tag}{attrs} style="{style}"{self_closing}>'
+
+    html = STYLE_BLOCK.sub('', html)
+    head_end = html.lower().find('</head>')
+    body = OPEN_TAG.sub(apply, html[head_end:] if head_end >= 0 else html)
+    if head_end < 0:
+        return body
+    head = html[:head_end]
+    if leftover:
+        head += '<style>\n' + '\n'.join(leftover) + '\n</style>\n'
+    return head + body
+
+
+def compile_template(name):
+    """Return the CSS-inlined, compiled template, building it once per process"""
+    template = _compiled.get(name)
+    if template is not None:
+        return template
+    with _compile_lock:
+        if name not in _compiled:
+            engine = engines['django']
+            source = engine.get_template(name).template.source
+            _compiled[name] = engine.from_string(inline_css(source))
+        return _compiled[name]
+
+
+def render_email(name, context):
+    return compile_template(name).render(context)
+
+
+def render_emails(name, contexts):
+    """Render one template for many contexts, e.g. every recipient of a bulk notification"""
+    template = compile_template(name)
+    return [template.render(context) for context in contexts]
+
+
+def clear_compiled():
+    """Drop compiled templates so the next render reloads them"""
+    with _compile_lock:
+        _compiled.clear()
@@ -0,0 +1,198 @@
+"""
+Background bulk exports of reports, tree plantings and tree predictions
+
+An ExportJob is written by a small thread pool, chunk by chunk in id order,
+to a file under EXPORT_ROOT as gzipped CSV, Parquet or Arrow IPC, and is
+downloaded once it is done. Incremental jobs start after the last id written
+by the previous completed export of the same dataset, so nightly syncs only
+move new rows (edits to rows already exported are not picked up).
+"""
+import csv
+import gzip
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_ROOT = getattr(settings, 'EXPORT_ROOT', os.path.join(settings.BASE_DIR, 'exports'))
+EXPORT_JOB_WORKERS = getattr(settings, 'EXPORT_JOB_WORKERS', 1)
+
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+_executor = ThreadPoolExecutor(max_workers=EXPORT_JOB_WORKERS, thread_name_prefix='export-job')
+
+
+def last_exported_id(dataset):
+    """Largest id written by a completed export of the dataset, or 0"""
+    from .models import ExportJob
+    last_id = ExportJob.objects.filter(dataset=dataset, status='done').aggregate(last=Max('last_id'))['last']
+    return last_id or 0
+
+
+def create_export_job(dataset, format='csv.gz', incremental=False, since_id=None, requested_by=None):
+    """Validate the request and save a pending job; raises ValueError on bad input"""
+    from .models import ExportJob
+    from .exports import DATASETS
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}', expected one of: {', '.join(DATASETS)}")
+    if format not in dict(ExportJob.FORMAT_CHOICES):
+        raise ValueError(f"Unknown format '{format}', expected one of: {', '.join(dict(ExportJob.FORMAT_CHOICES))}")
+    if format in COLUMNAR_FORMATS and pa is None:
+        raise ValueError("Parquet and Arrow exports need pyarrow installed")
+
+    if since_id is None:
+        since_id = last_exported_id(dataset) if incremental else 0
+    return ExportJob.objects.create(
+        dataset=dataset,
+        format=format,
+        since_id=max(int(since_id), 0),
+        requested_by=requested_by,
+    )
+
+
+def start_export_job(dataset, format='csv.gz', incremental=False, since_id=None, requested_by=None):
+    """Queue an export and return the job"""
+    job = create_export_job(dataset, format, incremental, since_id, requested_by)
+    _executor.submit(run_export_job, job.pk)
+    return job
+
+
+def export_path(job):
+    return os.path.join(EXPORT_ROOT, job.file_path)
+
+
+def _plain(value):
+    """Convert values the writers cannot take as-is"""
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+ARROW_TYPES = {
+    'AutoField': 'int64',
+    'BigAutoField': 'int64',
+    'ForeignKey': 'int64',
+    'IntegerField': 'int64',
+    'PositiveIntegerField': 'int64',
+    'BigIntegerField': 'int64',
+    'FloatField': 'float64',
+    'DecimalField': 'float64',
+    'BooleanField': 'bool_',
+}
+
+
+def arrow_schema(dataset):
+    from .exports import column_types
+    fields = []
+    for column, internal_type in column_types(dataset).items():
+        if internal_type == 'DateTimeField':
+            arrow_type = pa.timestamp('us', tz='UTC')
+        else:
+            arrow_type = getattr(pa, ARROW_TYPES.get(internal_type, 'string'))()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+def write_csv_gz(path, dataset, chunks):
+    from .exports import DATASETS
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(DATASETS[dataset][1])
+        for rows in chunks:
+            writer.writerows(
+                [value.isoformat() if hasattr(value, 'isoformat') else _plain(value) for value in row]
+                for row in rows
+            )
+
+
+def write_columnar(path, dataset, chunks, format):
+    schema = arrow_schema(dataset)
+    if format == 'parquet':
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(path, schema)
+    try:
+        for rows in chunks:
+            columns = [[_plain(value) for value in column] for column in zip(*rows)]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+    finally:
+        writer.close()
+
+
+def run_export_job(job_id):
+    """Write a queued export to EXPORT_ROOT"""
+    from .models import ExportJob
+    from .exports import dataset_model, iter_id_chunks
+    partial_path = None
+    try:
+        updated = ExportJob.objects.filter(pk=job_id, status='pending').update(status='running')
+        if not updated:
+            return
+        job = ExportJob.objects.get(pk=job_id)
+
+        # Rows added while the export runs are left for the next one
+        until_id = dataset_model(job.dataset).objects.aggregate(last=Max('pk'))['last'] or 0
+        job.last_id = max(job.since_id, until_id)
+
+        progress = {'rows': 0}
+
+        def chunks():
+            for rows in iter_id_chunks(job.dataset, job.since_id, until_id):
+                progress['rows'] += len(rows)
+                yield rows
+
+        os.makedirs(EXPORT_ROOT, exist_ok=True)
+        job.file_path = f"{job.dataset}_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{job.pk.hex[:8]}.{job.format}"
+        partial_path = export_path(job) + '.part'
+        if job.format in COLUMNAR_FORMATS:
+            write_columnar(partial_path, job.dataset, chunks(), job.format)
+        else:
+            write_csv_gz(partial_path, job.dataset, chunks())
+        os.replace(partial_path, export_path(job))
+
+        job.row_count = progress['rows']
+        job.status = 'done'
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'last_id', 'row_count', 'file_path', 'completed_at'])
+        logger.info("Export job %s wrote %d %s rows to %s", job_id, job.row_count, job.dataset, job.file_path)
+    except Exception as e:
+        logger.exception("Export job %s failed", job_id)
+        if partial_path and os.path.exists(partial_path):
+            os.remove(partial_path)
+        ExportJob.objects.filter(pk=job_id).update(status='failed', error=str(e), completed_at=timezone.now())
+    finally:
+        connection.close()  # Thread-local DB connection opened by the job
+
+
+def job_payload(job):
+    """JSON representation returned by the export job endpoints"""
+    return {
+        "success": True,
+        "job_id": str(job.pk),
+        "dataset": job.dataset,
+        "format": job.format,
+        "status": job.status,
+        "ready": job.status == 'done',
+        "since_id": job.since_id,
+        "last_id": job.last_id,
+        "row_count": job.row_count,
+        "error": job.error or None,
+        "created_at": job.created_at.isoformat(),
+        "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+    }
@@ -0,0 +1,160 @@
+"""
+CSV export rows for reports and tree plantings
+
+Querysets are filtered from request parameters, fetch related rows in the
+same query and are walked with a chunked iterator, so exports use constant
+memory however many rows there are.
+
+DATASETS describes the raw columns of the bulk exports in export_jobs.py,
+which are read in id order so an export can resume after the last id written.
+"""
+import csv
+from datetime import datetime, time
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+
+REPORT_HEADER = ['Title', 'Type', 'Location', 'Reporter', 'Status', 'Date', 'Description']
+PLANTING_HEADER = ['Title', 'Location', 'Tree Type', 'Number of Trees', 'Planter', 'Status', 'Date', 'Phone Number']
+
+# Bulk export datasets: model name and raw columns, id first
+DATASETS = {
+    'reports': ('Report', [
+        'id', 'reporter_id', 'title', 'report_type', 'location_name', 'latitude', 'longitude',
+        'status', 'predicted_category', 'timestamp', 'description',
+    ]),
+    'plantings': ('TreePlanting', [
+        'id', 'planter_id', 'planter_name', 'title', 'location_name', 'latitude', 'longitude',
+        'tree_type', 'number_of_trees', 'status', 'suitability_score', 'tree_age_months',
+        'planted_date', 'description',
+    ]),
+    'predictions': ('TreePrediction', [
+        'id', 'user_id', 'weather_snapshot_id', 'tree_species', 'region', 'county', 'soil_type',
+        'rainfall_mm', 'temperature_c', 'altitude_m', 'soil_ph', 'planting_season', 'planting_method',
+        'care_level', 'water_source', 'tree_age_months', 'survival_probability', 'survival_level',
+        'confidence_level', 'model_version', 'risk_factors', 'explanation_reasons',
+        'recommended_species', 'created_at',
+    ]),
+}
+
+
+class Echo:
+    """File-like object whose write() returns the line, for csv.writer streaming"""
+
+    def write(self, value):
+        return value
+
+
+def parse_date(value, end_of_day=False):
+    """Parse a YYYY-MM-DD parameter into an aware datetime, or None"""
+    if not value:
+        return None
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+    return timezone.make_aware(datetime.combine(day, time.max if end_of_day else time.min))
+
+
+def apply_filters(queryset, params, date_field, statuses):
+    """Filter by ?start=, ?end= (inclusive dates) and ?status= (comma-separated)"""
+    start = parse_date(params.get('start'))
+    end = parse_date(params.get('end'), end_of_day=True)
+    if start:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{date_field}__lte': end})
+
+    status = [s.strip() for s in params.get('status', '').split(',') if s.strip()]
+    if status:
+        unknown = set(status) - set(statuses)
+        if unknown:
+            raise ValueError(f"Unknown status: {', '.join(sorted(unknown))}")
+        queryset = queryset.filter(status__in=status)
+    return queryset
+
+
+def report_queryset(params):
+    from .models import Report
+    reports = Report.objects.select_related('reporter').order_by('-timestamp')
+    return apply_filters(reports, params, 'timestamp', [key for key, _ in Report.STATUS_CHOICES])
+
+
+def planting_queryset(params):
+    from .models import TreePlanting
+    plantings = TreePlanting.objects.select_related('planter').order_by('-planted_date')
+    return apply_filters(plantings, params, 'planted_date', [key for key, _ in TreePlanting.PLANTING_STATUS])
+
+
+def report_row(report):
+    return [
+        report.title,
+        report.get_report_type_display(),
+        report.location_name,
+        report.reporter.username if report.reporter else 'N/A',
+        report.status,
+        report.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        report.description
+    ]
+
+
+def planting_row(planting):
+    return [
+        planting.title,
+        planting.location_name,
+        planting.get_tree_type_display(),
+        planting.number_of_trees,
+        planting.planter_display_name,
+        planting.status,
+        planting.planted_date.strftime('%Y-%m-%d'),
+        planting.phoneNumber
+    ]
+
+
+def iter_rows(queryset, row_builder):
+    for obj in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield row_builder(obj)
+
+
+def iter_csv(header, rows):
+    """Yield CSV-encoded lines, header first"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def dataset_model(dataset):
+    from django.apps import apps
+    return apps.get_model('App', DATASETS[dataset][0])
+
+
+def column_types(dataset):
+    """Return {column: Django internal field type} for a dataset"""
+    model = dataset_model(dataset)
+    types = {}
+    for column in DATASETS[dataset][1]:
+        field = model._meta.get_field(column[:-3] if column.endswith('_id') and column != 'id' else column)
+        types[column] = 'ForeignKey' if field.is_relation else field.get_internal_type()
+    return types
+
+
+def iter_id_chunks(dataset, since_id=0, until_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield lists of raw value tuples with since_id < id <= until_id, in id order
+
+    Each chunk is a separate query starting after the last id of the previous
+    one, so long exports never hold a cursor open or re-scan skipped rows.
+    """
+    columns = DATASETS[dataset][1]
+    queryset = dataset_model(dataset).objects.order_by('pk').values_list(*columns)
+    if until_id is not None:
+        queryset = queryset.filter(pk__lte=until_id)
+
+    cursor = since_id
+    while True:
+        rows = list(queryset.filter(pk__gt=cursor)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        cursor = rows[-1][0]
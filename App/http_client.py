@@ -0,0 +1,231 @@
+"""
+Shared outbound HTTP layer for third-party integrations
+
+One keep-alive connection pool per process (requests for sync code, httpx for
+the Mistral SDK and async views), with default timeouts, a per-host
+concurrency limit and retries with exponential backoff and full jitter.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Pool settings (overridable in settings.py)
+HTTP_CONNECT_TIMEOUT = getattr(settings, 'HTTP_CONNECT_TIMEOUT', 3.05)
+HTTP_READ_TIMEOUT = getattr(settings, 'HTTP_READ_TIMEOUT', 10)
+HTTP_POOL_MAXSIZE = getattr(settings, 'HTTP_POOL_MAXSIZE', 10)
+HTTP_MAX_PER_HOST = getattr(settings, 'HTTP_MAX_PER_HOST', 8)
+HTTP_MAX_RETRIES = getattr(settings, 'HTTP_MAX_RETRIES', 2)
+HTTP_BACKOFF_BASE = getattr(settings, 'HTTP_BACKOFF_BASE', 0.5)
+HTTP_BACKOFF_MAX = getattr(settings, 'HTTP_BACKOFF_MAX', 8)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+USER_AGENT = 'MsituGuard/1.0 (+https://msituguard.onrender.com)'
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter, honouring a Retry-After header"""
+    if retry_after:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def should_retry(method, attempt, retries, status=None):
+    """Retry idempotent calls on connection errors and retryable statuses"""
+    if attempt >= retries:
+        return False
+    if method.upper() not in IDEMPOTENT_METHODS:
+        return False
+    return status is None or status in RETRY_STATUSES
+
+
+class HostLimiter:
+    """Cap concurrent requests per host so one slow API cannot drain every worker thread"""
+
+    def __init__(self, max_per_host=HTTP_MAX_PER_HOST):
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def get(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return semaphore
+
+
+class AsyncHostLimiter:
+    """asyncio counterpart of HostLimiter, one semaphore per host and event loop"""
+
+    def __init__(self, max_per_host=HTTP_MAX_PER_HOST):
+        self.max_per_host = max_per_host
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def get(self, url):
+        loop_semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        host = urlsplit(url).netloc
+        semaphore = loop_semaphores.get(host)
+        if semaphore is None:
+            semaphore = loop_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphore
+
+
+_session = None
+_session_lock = threading.Lock()
+_httpx_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_LIMITER = HostLimiter()
+_ASYNC_LIMITER = AsyncHostLimiter()
+
+
+def get_session():
+    """Return the process-wide keep-alive requests.Session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Retries are handled in request() so they get jitter on every urllib3 version
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                _session = session
+    return _session
+
+
+def _httpx_limits():
+    return httpx.Limits(max_connections=HTTP_MAX_PER_HOST, max_keepalive_connections=HTTP_POOL_MAXSIZE)
+
+
+def _httpx_timeout():
+    return httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def get_httpx_client():
+    """Return the process-wide pooled httpx.Client for SDKs built on httpx"""
+    global _httpx_client
+    if httpx is None:
+        return None
+    if _httpx_client is None:
+        with _session_lock:
+            if _httpx_client is None:
+                _httpx_client = httpx.Client(
+                    limits=_httpx_limits(),
+                    timeout=_httpx_timeout(),
+                    headers={'User-Agent': USER_AGENT},
+                )
+    return _httpx_client
+
+
+def get_async_client():
+    """
+    Return the pooled httpx.AsyncClient for the running event loop
+
+    Async clients are bound to the loop they were created on, so each loop
+    (one per ASGI worker, or one per request under WSGI) gets its own pool.
+    """
+    if httpx is None:
+        raise RuntimeError("httpx is required for async HTTP requests")
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _async_clients[loop] = httpx.AsyncClient(
+            limits=_httpx_limits(),
+            timeout=_httpx_timeout(),
+            headers={'User-Agent': USER_AGENT},
+        )
+    return client
+
+
+def request(method, url, retries=None, **kwargs):
+    """
+    Send a request through the shared session
+
+    Applies the default timeout, the per-host concurrency limit and retries
+    with jitter for idempotent methods. Returns the final response; callers
+    decide whether to raise_for_status().
+    """
+    retries = HTTP_MAX_RETRIES if retries is None else retries
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    session = get_session()
+    attempt = 0
+    while True:
+        try:
+            with _LIMITER.get(url):
+                response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if not should_retry(method, attempt, retries):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("%s %s failed (%s), retrying in %.2fs", method, urlsplit(url).netloc, e, delay)
+        else:
+            if not should_retry(method, attempt, retries, response.status_code):
+                return response
+            delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+            logger.warning("%s %s returned %s, retrying in %.2fs", method, urlsplit(url).netloc, response.status_code, delay)
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+async def async_request(method, url, retries=None, **kwargs):
+    """asyncio variant of request() for async views"""
+    retries = HTTP_MAX_RETRIES if retries is None else retries
+    client = get_async_client()
+    attempt = 0
+    while True:
+        try:
+            async with _ASYNC_LIMITER.get(url):
+                response = await client.request(method, url, **kwargs)
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            if not should_retry(method, attempt, retries):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("%s %s failed (%s), retrying in %.2fs", method, urlsplit(url).netloc, e, delay)
+        else:
+            if not should_retry(method, attempt, retries, response.status_code):
+                return response
+            delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+            logger.warning("%s %s returned %s, retrying in %.2fs", method, urlsplit(url).netloc, response.status_code, delay)
+            await response.aclose()
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def async_get(url, **kwargs):
+    return await async_request('GET', url, **kwargs)
+
+
+async def async_post(url, **kwargs):
+    return await async_request('POST', url, **kwargs)
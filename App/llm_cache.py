@@ -0,0 +1,151 @@
+"""
+Persistent cache for Mistral responses
+
+Explanations and care instructions only depend on a handful of prompt inputs,
+so responses are stored in LLMResponse under a hash of those inputs (with the
+survival rate bucketed; prompts only see the bucket's range, so a cached
+response never cites a rate other than the one shown). Entries expire after
+LLM_CACHE_TTL, and every LLM_CACHE_EVICT_EVERY stores a process evicts
+expired entries and the least recently used ones beyond LLM_CACHE_MAX_ENTRIES.
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Cache settings (overridable in settings.py)
+LLM_CACHE_TTL = getattr(settings, 'LLM_CACHE_TTL', 30 * 24 * 60 * 60)
+LLM_CACHE_MAX_ENTRIES = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 5000)
+LLM_CACHE_SURVIVAL_BUCKET = getattr(settings, 'LLM_CACHE_SURVIVAL_BUCKET', 5)
+LLM_CACHE_EVICT_EVERY = getattr(settings, 'LLM_CACHE_EVICT_EVERY', 100)
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+_stores_since_evict = 0
+
+
+def bucket_survival_rate(survival_rate):
+    """Round a survival rate down to its bucket so nearby rates share a response"""
+    bucket = LLM_CACHE_SURVIVAL_BUCKET
+    return float(int(float(survival_rate) // bucket) * bucket)
+
+
+def survival_band(bucketed_rate):
+    """Prompt text for a bucketed survival rate, e.g. '70-75%'"""
+    return f"{bucketed_rate:.0f}-{bucketed_rate + LLM_CACHE_SURVIVAL_BUCKET:.0f}%"
+
+
+def normalize_value(value):
+    """Case-fold and collapse whitespace so trivially different inputs share a key"""
+    if isinstance(value, str):
+        return ' '.join(value.split()).lower()
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(item) for item in value]
+    return value
+
+
+def make_cache_key(kind, inputs):
+    payload = json.dumps(
+        {'kind': kind, 'inputs': {key: normalize_value(value) for key, value in inputs.items()}},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_stats():
+    """Return this process's hit/miss counters"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / total, 3) if total else 0.0
+    return stats
+
+
+def get_cached(kind, inputs, record_stats=True):
+    """Return the cached response for the inputs, or None"""
+    from .models import LLMResponse
+    cache_key = make_cache_key(kind, inputs)
+    cutoff = timezone.now() - timedelta(seconds=LLM_CACHE_TTL)
+    entry = LLMResponse.objects.filter(cache_key=cache_key, created_at__gte=cutoff).only('pk', 'response').first()
+    if entry is None:
+        if record_stats:
+            _record('misses')
+        return None
+
+    LLMResponse.objects.filter(pk=entry.pk).update(hit_count=F('hit_count') + 1, last_used_at=timezone.now())
+    if record_stats:
+        _record('hits')
+    return entry.response
+
+
+def store(kind, inputs, response):
+    """Save a response, evicting old entries every LLM_CACHE_EVICT_EVERY stores"""
+    global _stores_since_evict
+    from .models import LLMResponse
+    LLMResponse.objects.update_or_create(
+        cache_key=make_cache_key(kind, inputs),
+        defaults={
+            'kind': kind,
+            'prompt_inputs': inputs,
+            'response': response,
+            'hit_count': 0,
+            'created_at': timezone.now(),
+            'last_used_at': timezone.now(),
+        }
+    )
+    with _stats_lock:
+        _stores_since_evict += 1
+        due = _stores_since_evict >= LLM_CACHE_EVICT_EVERY
+        if due:
+            _stores_since_evict = 0
+    if due:
+        evict()
+
+
+def evict():
+    """Delete expired entries and the least recently used ones beyond LLM_CACHE_MAX_ENTRIES"""
+    from .models import LLMResponse
+    cutoff = timezone.now() - timedelta(seconds=LLM_CACHE_TTL)
+    LLMResponse.objects.filter(created_at__lt=cutoff).delete()
+
+    overflow = LLMResponse.objects.count() - LLM_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        stale_ids = list(LLMResponse.objects.order_by('last_used_at').values_list('pk', flat=True)[:overflow])
+        LLMResponse.objects.filter(pk__in=stale_ids).delete()
+
+
+def cached_call(kind, inputs, generate, record_stats=True):
+    """
+    Return the cached response for the inputs, calling generate() on a miss
+
+    Cache failures never block the LLM call; empty responses are not stored.
+    Background jobs pass record_stats=False since the request already
+    counted its miss.
+    """
+    try:
+        cached = get_cached(kind, inputs, record_stats=record_stats)
+    except Exception:
+        logger.exception("LLM cache lookup failed")
+        cached = None
+    if cached is not None:
+        logger.debug("LLM cache hit for %s", kind)
+        return cached
+
+    response = generate()
+    if response:
+        try:
+            store(kind, inputs, response)
+        except Exception:
+            logger.exception("LLM cache store failed")
+    return response
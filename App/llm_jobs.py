@@ -0,0 +1,103 @@
+"""
+Background generation of LLM explanations and care instructions
+
+predict_tree_survival answers with the deterministic fallback text and an
+ExplanationJob id; a small thread pool fills in the LLM text, which clients
+fetch by short polling. Jobs live only in this process's queue, so a job
+still unfinished after LLM_JOB_EXPIRY_SECONDS (e.g. lost to a restart) is
+reported as failed, and prune_explanation_jobs deletes old rows.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LLM_JOB_WORKERS = getattr(settings, 'LLM_JOB_WORKERS', 2)
+LLM_JOB_POLL_INTERVAL = getattr(settings, 'LLM_JOB_POLL_INTERVAL', 1.0)
+LLM_JOB_EXPIRY_SECONDS = getattr(settings, 'LLM_JOB_EXPIRY_SECONDS', 5 * 60)
+LLM_JOB_RETENTION_DAYS = getattr(settings, 'LLM_JOB_RETENTION_DAYS', 7)
+
+_executor = ThreadPoolExecutor(max_workers=LLM_JOB_WORKERS, thread_name_prefix='llm-job')
+
+
+def start_explanation_job(explanation_context, care_context):
+    """Queue LLM generation for a prediction and return the job"""
+    from .models import ExplanationJob
+    job = ExplanationJob.objects.create(
+        explanation_context=explanation_context,
+        care_context=care_context,
+    )
+    _executor.submit(run_explanation_job, job.pk)
+    return job
+
+
+def run_explanation_job(job_id):
+    """Generate the explanation and care instructions for a queued job"""
+    from .models import ExplanationJob
+    from .mistral_ai import generate_tree_explanation, generate_care_instructions
+    try:
+        updated = ExplanationJob.objects.filter(pk=job_id, status='pending').update(status='running')
+        if not updated:
+            return
+        job = ExplanationJob.objects.get(pk=job_id)
+
+        errors = []
+        try:
+            job.explanation = generate_tree_explanation(job.explanation_context, record_stats=False)
+        except Exception as e:
+            errors.append(str(e))
+        try:
+            job.after_care = generate_care_instructions(job.care_context, record_stats=False)
+        except Exception as e:
+            errors.append(str(e))
+
+        # Partial results are still useful; the client keeps the fallback for the rest
+        job.status = 'failed' if len(errors) == 2 else 'done'
+        job.error = '; '.join(errors)
+        job.save(update_fields=['status', 'explanation', 'after_care', 'error', 'updated_at'])
+        logger.info("Explanation job %s %s", job_id, job.status)
+    except Exception as e:
+        logger.exception("Explanation job %s crashed", job_id)
+        ExplanationJob.objects.filter(pk=job_id).update(status='failed', error=str(e))
+    finally:
+        connection.close()  # Thread-local DB connection opened by the job
+
+
+def expire_stale_jobs(job_ids=None):
+    """Mark jobs unfinished after LLM_JOB_EXPIRY_SECONDS as failed; returns how many"""
+    from .models import ExplanationJob
+    cutoff = timezone.now() - timedelta(seconds=LLM_JOB_EXPIRY_SECONDS)
+    stale = ExplanationJob.objects.filter(status__in=('pending', 'running'), created_at__lt=cutoff)
+    if job_ids is not None:
+        stale = stale.filter(pk__in=job_ids)
+    return stale.update(status='failed', error='Expired before the explanation was generated')
+
+
+def prune_jobs(days=LLM_JOB_RETENTION_DAYS):
+    """Delete jobs created more than days ago; returns how many"""
+    from .models import ExplanationJob
+    deleted, _ = ExplanationJob.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
+
+
+def get_job(job_id):
+    """The job with job_id, expired first if it is stale, or None"""
+    from .models import ExplanationJob
+    expire_stale_jobs([job_id])
+    return ExplanationJob.objects.filter(pk=job_id).first()
+
+
+def job_payload(job):
+    """JSON representation returned by the polling endpoint"""
+    return {
+        "success": True,
+        "job_id": str(job.pk),
+        "status": job.status,
+        "ready": job.status in ('done', 'failed'),
+        "explanation": job.explanation or None,
+        "after_care": job.after_care or None,
+    }
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from App.email_outbox import EMAIL_OUTBOX_BATCH_SIZE, drain
+from App.models import OutboundEmail
+
+class Command(BaseCommand):
+    help = "Send queued outbox emails that are due, including retries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_OUTBOX_BATCH_SIZE, help='Messages sent per SMTP connection')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        sent, claimed = drain(batch_size=max(1, options['batch_size']), max_batches=options['max_batches'])
+        counts = {row['status']: row['total'] for row in OutboundEmail.objects.values('status').annotate(total=Count('pk'))}
+        summary = ', '.join(f"{status}: {counts.get(status, 0)}" for status, _ in OutboundEmail.STATUS_CHOICES)
+        self.stdout.write(f"  Outbox now has {summary}")
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} of {claimed} due emails"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from App.exports import DATASETS
+from App.export_jobs import create_export_job, export_path, run_export_job
+from App.models import ExportJob
+
+class Command(BaseCommand):
+    help = "Export reports, tree plantings or tree predictions to EXPORT_ROOT (run nightly with --incremental)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS))
+        parser.add_argument('--format', default='csv.gz', choices=[key for key, _ in ExportJob.FORMAT_CHOICES])
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only export rows added since the last completed export of this dataset'
+        )
+        parser.add_argument('--since-id', type=int, help='Only export rows with a larger id')
+
+    def handle(self, *args, **options):
+        try:
+            job = create_export_job(
+                options['dataset'], options['format'],
+                incremental=options['incremental'], since_id=options['since_id'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        # Run in this process so cron exits only once the file is written
+        run_export_job(job.pk)
+        job.refresh_from_db()
+        if job.status != 'done':
+            raise CommandError(f"Export failed: {job.error}")
+        if not job.row_count:
+            self.stdout.write(self.style.SUCCESS(f"No rows after id {job.since_id}, wrote an empty {export_path(job)}"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {job.row_count} rows (ids {job.since_id + 1}-{job.last_id}) to {export_path(job)}"
+        ))
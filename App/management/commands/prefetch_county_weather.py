@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from App import http_client
+from App.models import County
+from App.weather_service import WeatherService, snap_coordinates
+
+class Command(BaseCommand):
+    help = "Refresh the shared weather cache for every county centroid"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Maximum concurrent OpenWeather requests')
+        parser.add_argument(
+            '--max-age', type=int, default=0,
+            help='Skip counties whose cached weather is younger than this many seconds (0 refreshes all)'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.OPENWEATHER_API_KEY:
+            self.stdout.write(self.style.WARNING("OPENWEATHER_API_KEY is not configured, nothing to prefetch"))
+            return
+
+        # Counties in the same grid cell share one cache entry, so fetch each cell once
+        cells = {}
+        for county in County.objects.only('name', 'latitude', 'longitude'):
+            cache_key = WeatherService.cache_key(county.latitude, county.longitude)
+            cells.setdefault(cache_key, (county.latitude, county.longitude, []))[2].append(county.name)
+
+        if options['max_age']:
+            cells = {
+                key: cell for key, cell in cells.items()
+                if not WeatherService.is_fresh(cell[0], cell[1], max_age=options['max_age'])
+            }
+
+        if not cells:
+            self.stdout.write(self.style.SUCCESS("Weather cache is already fresh for all counties"))
+            return
+
+        workers = max(1, options['workers'])
+        self.stdout.write(f"Fetching weather for {len(cells)} grid cells with {workers} workers...")
+
+        # Workers share the pooled keep-alive session in App.http_client and only
+        # do HTTP; database writes stay on this thread. Off the request path, so
+        # use the client's default timeout and retries
+        refreshed = 0
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    WeatherService.fetch_weather, *snap_coordinates(lat, lon),
+                    retries=None, timeout=http_client.DEFAULT_TIMEOUT,
+                ): key
+                for key, (lat, lon, names) in cells.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                lat, lon, names = cells[key]
+                weather_data = future.result()
+                if not weather_data:
+                    failed.extend(names)
+                    continue
+                WeatherService.store_weather(lat, lon, weather_data)
+                refreshed += 1
+                self.stdout.write(f"  {', '.join(names)}: {weather_data['temperature']}°C, {weather_data['humidity']}% humidity")
+
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Failed to refresh: {', '.join(sorted(failed))}"))
+        self.stdout.write(self.style.SUCCESS(f"Refreshed weather for {refreshed} of {len(cells)} grid cells"))
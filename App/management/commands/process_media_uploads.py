@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from App.media_pipeline import MEDIA_STALE_MINUTES, reset_stale_uploads, run_media_upload
+from App.models import MediaUpload
+
+class Command(BaseCommand):
+    help = "Process staged image uploads left pending, e.g. by a restart or a failed attempt"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes', type=int, default=MEDIA_STALE_MINUTES,
+            help='Retry uploads whose processing started longer ago than this'
+        )
+
+    def handle(self, *args, **options):
+        reset = reset_stale_uploads(options['stale_minutes'])
+        if reset:
+            self.stdout.write(f"  Reset {reset} stale uploads")
+
+        upload_ids = list(MediaUpload.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True))
+        for upload_id in upload_ids:
+            run_media_upload(upload_id)
+
+        done = MediaUpload.objects.filter(pk__in=upload_ids, status='done').count()
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} of {len(upload_ids)} pending uploads"))
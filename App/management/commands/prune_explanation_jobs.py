@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from App.llm_jobs import LLM_JOB_RETENTION_DAYS, expire_stale_jobs, prune_jobs
+
+class Command(BaseCommand):
+    help = "Fail explanation jobs that never finished and delete old ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=LLM_JOB_RETENTION_DAYS, help='Delete jobs older than this')
+
+    def handle(self, *args, **options):
+        expired = expire_stale_jobs()
+        deleted = prune_jobs(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} unfinished jobs, deleted {deleted} older than {options['days']} days"))
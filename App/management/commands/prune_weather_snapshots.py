@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from App.weather_service import SNAPSHOT_RETENTION_DAYS, WeatherService
+
+class Command(BaseCommand):
+    help = "Delete old weather snapshots that no prediction references"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=SNAPSHOT_RETENTION_DAYS, help='Delete snapshots older than this')
+
+    def handle(self, *args, **options):
+        deleted = WeatherService.prune_snapshots(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} weather snapshots older than {options['days']} days"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from App.playbook import refresh_playbook_scores
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed playbook survival scores for every county/species pair"
+
+    def handle(self, *args, **options):
+        refreshed = refresh_playbook_scores()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt playbook scores for {refreshed} county/species pairs")
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from App.platform_stats import get_counters, reconcile
+
+class Command(BaseCommand):
+    help = "Rebuild the platform counters (trees, planters, reports) from scratch"
+
+    def handle(self, *args, **options):
+        before = get_counters()
+        after = reconcile()
+        for name, value in after.items():
+            drift = value - before.get(name, 0)
+            note = f" (was {before.get(name, 0)})" if drift else ""
+            self.stdout.write(f"  {name}: {value}{note}")
+        self.stdout.write(self.style.SUCCESS("Platform counters reconciled"))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from App.profile_stats import reconcile
+
+class Command(BaseCommand):
+    help = "Rebuild the stored per-profile statistics (verified trees, predictions) from scratch"
+
+    def handle(self, *args, **options):
+        drifted = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Profile statistics reconciled ({drifted} profiles had drifted)"))
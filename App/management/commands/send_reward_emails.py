@@ -1,27 +1,82 @@
 from django.core.management.base import BaseCommand
-from App.models import TreePlanting
-from App.views import send_tree_verification_notification
+from django.db import transaction
+from django.db.models import Count
+from App.email_outbox import EMAIL_OUTBOX_BATCH_SIZE, drain_parallel, queue_emails
+from App.models import CommandCheckpoint, OutboundEmail, Profile, TreePlanting
+from App.notifications import planting_badge, tree_verified_emails
+
+CHECKPOINT = 'send_reward_emails'
+INITIATIVE_BADGE = "🌍 15 Billion Trees Initiative Participant"
 
 class Command(BaseCommand):
-    help = 'Send reward emails for recently verified tree plantings'
+    help = 'Send reward emails for verified tree plantings that have not had one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Plantings rendered and queued per chunk')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent SMTP connections while sending')
+        parser.add_argument('--batch-size', type=int, default=EMAIL_OUTBOX_BATCH_SIZE, help='Messages sent per SMTP connection')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint of an interrupted run')
+        parser.add_argument('--queue-only', action='store_true', help='Queue the emails and leave sending to drain_email_outbox')
 
     def handle(self, *args, **options):
-        # Find verified tree plantings with registered users
-        verified_plantings = TreePlanting.objects.filter(
-            status='verified',
-            tokens_awarded=True,
-            planter__isnull=False
-        )
-        
-        count = 0
-        for planting in verified_plantings:
-            try:
-                send_tree_verification_notification(planting)
-                count += 1
-                self.stdout.write(f"Sent reward email for: {planting.title}")
-            except Exception as e:
-                self.stdout.write(f"Failed to send email for {planting.title}: {e}")
-        
-        self.stdout.write(
-            self.style.SUCCESS(f'Successfully sent {count} reward emails')
-        )
\ No newline at end of file
+        if options['restart']:
+            CommandCheckpoint.objects.filter(name=CHECKPOINT).delete()
+        # The checkpoint is the last planting whose chunk was fully queued, so an interrupted
+        # run resumes after it; the tree_verified:<pk> dedupe keys still guard against resends
+        checkpoint = CommandCheckpoint.objects.filter(name=CHECKPOINT).values_list('position', flat=True).first() or 0
+        if checkpoint:
+            self.stdout.write(f"Resuming after planting #{checkpoint}")
+
+        verified = TreePlanting.objects.filter(status='verified', planter__isnull=False)
+
+        # Verified plantings per planter in one query, for the first-planting badge
+        verified_counts = dict(verified.values('planter').annotate(total=Count('pk')).values_list('planter', 'total'))
+
+        plantings = verified.select_related('planter__profile').order_by('pk')
+        chunk_size = max(1, options['chunk_size'])
+        queued = skipped = 0
+        while True:
+            chunk = list(plantings.filter(pk__gt=checkpoint)[:chunk_size])
+            if not chunk:
+                break
+
+            keys = [f'tree_verified:{planting.pk}' for planting in chunk]
+            already_queued = set(OutboundEmail.objects.filter(dedupe_key__in=keys).values_list('dedupe_key', flat=True))
+            pending = [
+                planting for planting, key in zip(chunk, keys)
+                if key not in already_queued and planting.planter.email
+            ]
+            skipped += len(chunk) - len(pending)
+
+            # Award the badges the per-planting notification would have, saved in one query.
+            # select_related gives every planting its own Profile copy, so badges are collected
+            # on the first copy seen per profile
+            profiles = {}
+            for planting in pending:
+                profile = profiles.setdefault(planting.planter.profile.pk, planting.planter.profile)
+                badges = profile.badges_list
+                new_badges = [planting_badge(planting.number_of_trees)]
+                if verified_counts.get(planting.planter_id) == 1:
+                    new_badges.append(INITIATIVE_BADGE)
+                missing = [badge for badge in new_badges if badge not in badges]
+                if missing:
+                    profile.environmental_badges = ', '.join(badges + missing)
+            messages = tree_verified_emails([(planting, planting.planter.profile.conservation_rank) for planting in pending])
+            checkpoint = chunk[-1].pk
+            # Badges, emails and the checkpoint of a chunk are saved together
+            with transaction.atomic():
+                if profiles:
+                    Profile.objects.bulk_update(profiles.values(), ['environmental_badges'])
+                queued += len(queue_emails(messages, drain_after_commit=False))
+                CommandCheckpoint.objects.update_or_create(name=CHECKPOINT, defaults={'position': checkpoint})
+            self.stdout.write(f"  Queued {queued} emails so far (through planting #{checkpoint})")
+
+        # Every planting is queued and the outbox tracks delivery from here; the next run starts
+        # over so plantings verified later with older ids are picked up
+        CommandCheckpoint.objects.filter(name=CHECKPOINT).delete()
+        self.stdout.write(f"Queued {queued} reward emails, skipped {skipped} already sent or without an email address")
+
+        if options['queue_only']:
+            return
+        sent, claimed = drain_parallel(max(1, options['workers']), batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Successfully sent {sent} of {claimed} queued emails'))
@@ -0,0 +1,220 @@
+"""
+Background processing of report, planting and tree photos
+
+Views hand uploads to stage_upload(), which saves the original under
+MEDIA_STAGING_PREFIX in the configured storage backend and records a
+MediaUpload, so the request returns without resizing anything. Staged files
+live in shared storage rather than on the web container's disk, so they
+survive restarts and the process_media_uploads cron can read them. A small
+thread pool then applies the EXIF orientation, reads the GPS position,
+re-encodes the image without EXIF (which also drops the location from the
+published file), writes the resized variants in MEDIA_VARIANTS to the field's
+storage and points the model's image field at the main variant. The staged
+original is deleted once the upload is done or has failed for good.
+"""
+import io
+import logging
+import os
+import uuid
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+MEDIA_STAGING_PREFIX = getattr(settings, 'MEDIA_STAGING_PREFIX', 'media_staging')
+MEDIA_WORKERS = getattr(settings, 'MEDIA_WORKERS', 2)
+MEDIA_MAX_ATTEMPTS = getattr(settings, 'MEDIA_MAX_ATTEMPTS', 3)
+MEDIA_JPEG_QUALITY = getattr(settings, 'MEDIA_JPEG_QUALITY', 85)
+MEDIA_STALE_MINUTES = getattr(settings, 'MEDIA_STALE_MINUTES', 30)
+
+# Variant name -> longest side in pixels; 'main' is stored in the model field
+MEDIA_VARIANTS = getattr(settings, 'MEDIA_VARIANTS', {'main': 1600, 'medium': 800, 'thumb': 320})
+
+GPS_IFD = 0x8825
+
+_executor = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix='media')
+
+
+def stage_upload(instance, field_name, uploaded_file):
+    """Save an upload to staging storage and queue it for processing after commit"""
+    from .models import MediaUpload
+    original_name = os.path.basename(uploaded_file.name or 'upload')
+    staged_path = default_storage.save(
+        f"{MEDIA_STAGING_PREFIX}/{uuid.uuid4().hex}_{get_valid_filename(original_name)}", uploaded_file
+    )
+
+    upload = MediaUpload.objects.create(
+        model_label=instance._meta.label,
+        object_id=instance.pk,
+        field_name=field_name,
+        staged_path=staged_path,
+        original_name=original_name,
+    )
+    transaction.on_commit(lambda: _executor.submit(run_media_upload, upload.pk))
+    return upload
+
+
+def staged_file_exists(upload):
+    try:
+        return default_storage.exists(upload.staged_path)
+    except Exception:  # e.g. an absolute local path from before uploads were staged in storage
+        return False
+
+
+def discard_staged_file(upload):
+    try:
+        default_storage.delete(upload.staged_path)
+    except Exception as e:
+        logger.warning("Could not delete staged file %s: %s", upload.staged_path, e)
+
+
+def reset_stale_uploads(minutes=MEDIA_STALE_MINUTES):
+    """Put uploads whose processing started more than minutes ago back to pending; returns how many"""
+    from .models import MediaUpload
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return MediaUpload.objects.filter(status='processing', started_at__lt=cutoff).update(status='pending')
+
+
+def _rational(value):
+    try:
+        return float(value)
+    except (TypeError, ZeroDivisionError):
+        numerator, denominator = value
+        return numerator / denominator if denominator else 0.0
+
+
+def extract_gps(exif):
+    """Return (latitude, longitude) from EXIF GPS tags, or (None, None)"""
+    try:
+        gps = exif.get_ifd(GPS_IFD)
+        lat, lon = gps.get(2), gps.get(4)
+        if not lat or not lon:
+            return None, None
+        latitude = sum(_rational(part) / 60 ** i for i, part in enumerate(lat))
+        longitude = sum(_rational(part) / 60 ** i for i, part in enumerate(lon))
+        if gps.get(1) in ('S', b'S'):
+            latitude = -latitude
+        if gps.get(3) in ('W', b'W'):
+            longitude = -longitude
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return None, None
+        return round(latitude, 7), round(longitude, 7)
+    except Exception:
+        return None, None
+
+
+def encode(image, max_side):
+    """Downscale to max_side and encode as JPEG (PNG when transparent) without metadata"""
+    variant = image.copy()
+    variant.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    if variant.mode in ('RGBA', 'LA') or (variant.mode == 'P' and 'transparency' in variant.info):
+        variant.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue(), 'png'
+    variant.convert('RGB').save(buffer, format='JPEG', quality=MEDIA_JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue(), 'jpg'
+
+
+def process_image(staged_file):
+    """Return (variants {name: (bytes, extension)}, (width, height), (lat, lon)) for a staged image"""
+    with Image.open(staged_file) as image:
+        gps = extract_gps(image.getexif())
+        image = ImageOps.exif_transpose(image)
+        variants = {name: encode(image, max_side) for name, max_side in MEDIA_VARIANTS.items()}
+        return variants, image.size, gps
+
+
+def store_variants(instance, field_name, upload, variants):
+    """Save the variants to the field's storage; return {variant: stored name}"""
+    field = instance._meta.get_field(field_name)
+    stem = os.path.splitext(get_valid_filename(upload.original_name))[0][:80] or 'image'
+    stored = {}
+    for name, (data, extension) in variants.items():
+        if name == 'main':
+            filename = field.generate_filename(instance, f"{stem}.{extension}")
+        else:
+            filename = field.generate_filename(instance, f"variants/{stem}_{name}.{extension}")
+        stored[name] = field.storage.save(filename, ContentFile(data), max_length=field.max_length)
+    return stored
+
+
+def run_media_upload(upload_id):
+    """Process one staged upload and attach it to its model instance"""
+    from .models import MediaUpload
+    try:
+        updated = MediaUpload.objects.filter(pk=upload_id, status='pending').update(
+            status='processing', started_at=timezone.now()
+        )
+        if not updated:
+            return
+        upload = MediaUpload.objects.get(pk=upload_id)
+        if not staged_file_exists(upload):
+            MediaUpload.objects.filter(pk=upload_id).update(
+                status='failed', attempts=upload.attempts + 1,
+                error=f"Staged file {upload.staged_path} is missing, the upload cannot be recovered",
+            )
+            logger.error("%s failed: staged file %s is missing", upload, upload.staged_path)
+            return
+
+        model = apps.get_model(upload.model_label)
+        instance = model.objects.filter(pk=upload.object_id).first()
+        if instance is None:
+            raise LookupError(f"{upload.model_label} #{upload.object_id} no longer exists")
+
+        if Image is None:
+            raise RuntimeError("Pillow is not installed")
+        with default_storage.open(upload.staged_path, 'rb') as staged_file:
+            variants, (width, height), (latitude, longitude) = process_image(staged_file)
+        stored = store_variants(instance, upload.field_name, upload, variants)
+
+        # update() so model save() side effects (counters, badges) do not run again
+        changes = {upload.field_name: stored['main']}
+        field_names = {field.name for field in model._meta.get_fields()}
+        if latitude is not None and {'latitude', 'longitude'} <= field_names \
+                and instance.latitude is None and instance.longitude is None:
+            changes.update(latitude=latitude, longitude=longitude)
+        model.objects.filter(pk=instance.pk).update(**changes)
+        from .signals import invalidate_page_cache
+        invalidate_page_cache(model)  # update() sends no post_save
+
+        MediaUpload.objects.filter(pk=upload_id).update(
+            status='done', attempts=upload.attempts + 1, error='', width=width, height=height,
+            gps_latitude=latitude, gps_longitude=longitude, variants=stored, processed_at=timezone.now(),
+        )
+        discard_staged_file(upload)
+        logger.info("%s stored as %s", upload, stored['main'])
+    except Exception as e:
+        logger.exception("Upload %s failed", upload_id)
+        upload = MediaUpload.objects.filter(pk=upload_id).first()
+        if upload:
+            attempts = upload.attempts + 1
+            upload.status = 'failed' if attempts >= MEDIA_MAX_ATTEMPTS else 'pending'
+            MediaUpload.objects.filter(pk=upload_id).update(status=upload.status, attempts=attempts, error=str(e))
+            if upload.status == 'failed':
+                discard_staged_file(upload)
+    finally:
+        connection.close()  # Thread-local DB connection opened by the job
+
+
+def variant_url(instance, field_name, variant):
+    """URL of a processed variant (e.g. 'thumb'), falling back to the field's own file"""
+    from .models import MediaUpload
+    upload = MediaUpload.objects.filter(
+        model_label=instance._meta.label, object_id=instance.pk, field_name=field_name, status='done'
+    ).order_by('-processed_at').first()
+    field_file = getattr(instance, field_name)
+    if upload and variant in upload.variants:
+        return field_file.storage.url(upload.variants[variant])
+    return field_file.url if field_file else ''
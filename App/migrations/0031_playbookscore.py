@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0030_weathersnapshot_treeprediction_weather_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaybookScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('county_name', models.CharField(max_length=100)),
+                ('species_name', models.CharField(max_length=100)),
+                ('season_scores', models.JSONField(default=dict, help_text='Playbook survival scores as {season_key: {care_level: score}}')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('county_species', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='playbook_score', to='App.countyspecies')),
+            ],
+            options={
+                'unique_together': {('county_name', 'species_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0031_playbookscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weathersnapshot',
+            name='grid_key',
+            field=models.CharField(blank=True, default='', help_text='Grid-snapped "lat,lon" used as the shared weather cache key', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='weathersnapshot',
+            name='pressure',
+            field=models.FloatField(default=1013),
+        ),
+        migrations.AddField(
+            model_name='weathersnapshot',
+            name='weather_main',
+            field=models.CharField(default='Clear', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='weathersnapshot',
+            index=models.Index(fields=['grid_key', '-created_at'], name='App_weather_grid_ke_de2f9e_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0032_weathersnapshot_grid_key_weathersnapshot_pressure_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(help_text='SHA-256 of the normalized prompt inputs', max_length=64, unique=True)),
+                ('kind', models.CharField(max_length=30)),
+                ('prompt_inputs', models.JSONField(default=dict)),
+                ('response', models.JSONField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
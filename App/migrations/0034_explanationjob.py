@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:31
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0033_llmresponse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExplanationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('explanation_context', models.JSONField(default=dict)),
+                ('care_context', models.JSONField(default=dict)),
+                ('explanation', models.TextField(blank=True)),
+                ('after_care', models.JSONField(default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:34
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+REPORT_STATUSES = ('new', 'verified', 'resolved')
+
+
+def populate_counters(apps, schema_editor):
+    PlatformCounter = apps.get_model('App', 'PlatformCounter')
+    TreePlanting = apps.get_model('App', 'TreePlanting')
+    Report = apps.get_model('App', 'Report')
+    plantings = TreePlanting.objects.aggregate(
+        trees_planted=Sum('number_of_trees'),
+        verified_trees=Sum('number_of_trees', filter=Q(status='verified')),
+        tree_plantings=Count('pk'),
+        verified_plantings=Count('pk', filter=Q(status='verified')),
+    )
+    counters = {name: value or 0 for name, value in plantings.items()}
+    counters['planters'] = TreePlanting.objects.values('planter').distinct().count()
+    counters['reports_total'] = Report.objects.count()
+    by_status = dict(Report.objects.values_list('status').annotate(total=Count('pk')).order_by())
+    for status in REPORT_STATUSES:
+        counters[f'reports_{status}'] = by_status.get(status, 0)
+    # Per-planter planting tallies, moved to PlanterTally by 0043
+    for planter_id, total in TreePlanting.objects.values_list('planter').annotate(total=Count('pk')).order_by():
+        counters[f"planter_plantings:{planter_id or 'none'}"] = total
+    PlatformCounter.objects.bulk_create(
+        PlatformCounter(name=name, value=value) for name, value in counters.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0034_explanationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
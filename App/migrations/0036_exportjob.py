@@ -0,0 +1,38 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:39
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0035_platformcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('dataset', models.CharField(choices=[('reports', 'Reports'), ('plantings', 'Tree Plantings'), ('predictions', 'Tree Predictions')], max_length=20)),
+                ('format', models.CharField(choices=[('csv.gz', 'Compressed CSV'), ('parquet', 'Parquet'), ('arrow', 'Arrow IPC')], default='csv.gz', max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('since_id', models.BigIntegerField(default=0, help_text='Only rows with a larger id are exported')),
+                ('last_id', models.BigIntegerField(blank=True, help_text='Largest id written; the next incremental export starts here', null=True)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['dataset', 'status', '-created_at'], name='App_exportj_dataset_9632f3_idx')],
+            },
+        ),
+    ]
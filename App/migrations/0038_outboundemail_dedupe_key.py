@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0037_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='dedupe_key',
+            field=models.CharField(blank=True, help_text='Set for notifications that must only be sent once', max_length=100, null=True, unique=True),
+        ),
+    ]
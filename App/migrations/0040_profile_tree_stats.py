@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:54
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_profile_stats(apps, schema_editor):
+    Profile = apps.get_model('App', 'Profile')
+    TreePlanting = apps.get_model('App', 'TreePlanting')
+    TreePrediction = apps.get_model('App', 'TreePrediction')
+    verified_trees = TreePlanting.objects.filter(planter=OuterRef('user'), status='verified') \
+        .order_by().values('planter').annotate(total=Sum('number_of_trees')).values('total')
+    predictions = TreePrediction.objects.filter(user=OuterRef('user')) \
+        .order_by().values('user').annotate(total=Count('pk')).values('total')
+    Profile.objects.update(
+        verified_tree_count=Coalesce(Subquery(verified_trees, output_field=IntegerField()), 0),
+        tree_prediction_count=Coalesce(Subquery(predictions, output_field=IntegerField()), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0039_mediaupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='tree_prediction_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='verified_tree_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Trees in verified plantings'),
+        ),
+        migrations.RunPython(populate_profile_stats, migrations.RunPython.noop),
+    ]
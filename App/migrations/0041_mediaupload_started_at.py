@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0040_profile_tree_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaupload',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='When the current processing attempt began', null=True),
+        ),
+        migrations.AlterField(
+            model_name='mediaupload',
+            name='staged_path',
+            field=models.CharField(help_text='Name of the original in staging storage, until processed', max_length=500),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0041_mediaupload_started_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='explanationjob',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
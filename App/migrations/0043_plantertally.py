@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+TALLY_PREFIX = 'planter_plantings:'
+
+
+def move_planter_tallies(apps, schema_editor):
+    PlanterTally = apps.get_model('App', 'PlanterTally')
+    TreePlanting = apps.get_model('App', 'TreePlanting')
+    PlanterTally.objects.bulk_create(
+        PlanterTally(planter_pk=planter_id or 0, plantings=total)
+        for planter_id, total in TreePlanting.objects.values_list('planter').annotate(total=Count('pk')).order_by()
+    )
+    apps.get_model('App', 'PlatformCounter').objects.filter(name__startswith=TALLY_PREFIX).delete()
+
+
+def restore_planter_tallies(apps, schema_editor):
+    PlatformCounter = apps.get_model('App', 'PlatformCounter')
+    PlatformCounter.objects.bulk_create(
+        PlatformCounter(name=f"{TALLY_PREFIX}{tally.planter_pk or 'none'}", value=tally.plantings)
+        for tally in apps.get_model('App', 'PlanterTally').objects.all()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0042_explanationjob_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanterTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('planter_pk', models.IntegerField(help_text='Planter user id, 0 for plantings without a registered planter', unique=True)),
+                ('plantings', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(move_planter_tallies, restore_planter_tallies),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:16
+
+from django.db import migrations, models
+
+GENERATION_PREFIX = 'cache_generation:'
+
+
+def move_generations(apps, schema_editor):
+    # Carry the numbers over so keys of entries cached before the move are never reused
+    PlatformCounter = apps.get_model('App', 'PlatformCounter')
+    PageCacheGeneration = apps.get_model('App', 'PageCacheGeneration')
+    counters = PlatformCounter.objects.filter(name__startswith=GENERATION_PREFIX)
+    PageCacheGeneration.objects.bulk_create(
+        PageCacheGeneration(group=counter.name[len(GENERATION_PREFIX):], generation=counter.value)
+        for counter in counters
+    )
+    counters.delete()
+
+
+def restore_generations(apps, schema_editor):
+    PlatformCounter = apps.get_model('App', 'PlatformCounter')
+    PlatformCounter.objects.bulk_create(
+        PlatformCounter(name=GENERATION_PREFIX + row.group, value=row.generation)
+        for row in apps.get_model('App', 'PageCacheGeneration').objects.all()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0043_plantertally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageCacheGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.CharField(help_text='Model group, see App/page_cache.py', max_length=50, unique=True)),
+                ('generation', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(move_generations, restore_generations),
+    ]
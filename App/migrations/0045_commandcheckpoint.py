@@ -0,0 +1,22 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0044_pagecachegeneration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommandCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Management command that owns the checkpoint', max_length=100, unique=True)),
+                ('position', models.BigIntegerField(default=0, help_text='Last id the command fully processed')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -2,13 +2,17 @@
 LLM integration for Tree Prediction explanations and care instructions
 """
 import os
+from . import http_client, llm_cache
 try:
     from mistralai.client import MistralClient
     from mistralai.models.chat_completion import ChatMessage
+    MISTRAL_SDK_V1 = False
 except ImportError:
     try:
         from mistralai import Mistral
+        from mistralai.utils.retries import RetryConfig, BackoffStrategy
         MistralClient = Mistral
+        MISTRAL_SDK_V1 = True
         class ChatMessage:
             def __init__(self, role, content):
                 self.role = role
@@ -16,6 +20,7 @@ except ImportError:
     except ImportError:
         MistralClient = None
         ChatMessage = None
+        MISTRAL_SDK_V1 = False
 
 # Initialize Mistral client
 # Load environment variables
@@ -25,13 +30,52 @@ try:
 except ImportError:
     pass
 
+MISTRAL_MODEL = "mistral-small"
+
+def _create_client(api_key):
+    """Build a Mistral client that reuses the shared keep-alive connection pool"""
+    if not MISTRAL_SDK_V1:
+        return MistralClient(api_key=api_key)
+    return MistralClient(
+        api_key=api_key,
+        client=http_client.get_httpx_client(),
+        # SDK backoff already applies jitter; intervals are in milliseconds
+        retry_config=RetryConfig(
+            'backoff',
+            BackoffStrategy(
+                int(http_client.HTTP_BACKOFF_BASE * 1000),
+                int(http_client.HTTP_BACKOFF_MAX * 1000),
+                2,
+                30000,
+            ),
+            True,
+        ),
+        timeout_ms=int(http_client.HTTP_READ_TIMEOUT * 3000),
+    )
+
 api_key = os.environ.get("MISTRAL_API_KEY")
-client = MistralClient(api_key=api_key) if api_key else None
+client = _create_client(api_key) if api_key else None
 
 print(f"[MISTRAL] API Key configured: {'Yes' if api_key else 'No'}")
 print(f"[MISTRAL] Client initialized: {'Yes' if client else 'No'}")
 
-def generate_tree_explanation(context):
+def _chat(messages, max_tokens, temperature=0.3):
+    """Send a chat completion with whichever Mistral SDK generation is installed"""
+    if MISTRAL_SDK_V1:
+        return client.chat.complete(
+            model=MISTRAL_MODEL,
+            messages=[{"role": m.role, "content": m.content} for m in messages],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+    return client.chat(
+        model=MISTRAL_MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+
+def generate_tree_explanation(context, record_stats=True):
     """Generate natural explanation for tree prediction using LLM"""
     if not client:
         print("[MISTRAL] No client available, using fallback explanation")
@@ -48,17 +92,39 @@ def generate_tree_explanation(context):
             return f"{species} performs well in {county} with proper care. {reason}. Planting in {season} is suitable, though following care instructions closely will maximize success."
         else:
             return f"{species} faces challenges in {county} during {season}. {reason}. Consider alternative species or wait for optimal planting season for better results."
-    
+
+    inputs = _explanation_inputs(context)
+    return llm_cache.cached_call(
+        'explanation', inputs, lambda: _request_tree_explanation(inputs), record_stats=record_stats
+    )
+
+def _explanation_inputs(context):
+    # The prompt only depends on these inputs, so identical scenarios share one response
+    return {
+        'species': context['species'],
+        'county': context['county'],
+        'season': context['season'],
+        'survival_rate': llm_cache.bucket_survival_rate(context['survival_rate']),
+        'risk_level': context['risk_level'],
+        'reason': context['reason'],
+    }
+
+def get_cached_explanation(context):
+    """Return the cached LLM explanation for a prediction without calling the LLM"""
+    return llm_cache.get_cached('explanation', _explanation_inputs(context))
+
+def _request_tree_explanation(inputs):
+    """Ask the LLM for a prediction explanation"""
     prompt = f"""
     You are an expert Kenyan forestry advisor. Generate a clear, simple explanation for this tree planting prediction:
 
-    Species: {context['species']}
-    Location: {context['county']} County, Kenya
-    Planting Season: {context['season']}
-    Survival Rate: {context['survival_rate']:.1f}%
-    Risk Level: {context['risk_level']}
+    Species: {inputs['species']}
+    Location: {inputs['county']} County, Kenya
+    Planting Season: {inputs['season']}
+    Survival Rate: {llm_cache.survival_band(inputs['survival_rate'])}
+    Risk Level: {inputs['risk_level']}
     
-    Base reason: {context['reason']}
+    Base reason: {inputs['reason']}
     
     Instructions:
     - Explain WHY this species works well (or doesn't) in this location and season
@@ -76,21 +142,7 @@ def generate_tree_explanation(context):
     messages = [ChatMessage(role="user", content=prompt)]
     
     try:
-        if hasattr(client, 'chat'):
-            response = client.chat(
-                model="mistral-small",
-                messages=messages,
-                max_tokens=150,
-                temperature=0.3
-            )
-        else:
-            # Try newer API format
-            response = client.completions.create(
-                model="mistral-small",
-                messages=messages,
-                max_tokens=150,
-                temperature=0.3
-            )
+        response = _chat(messages, max_tokens=150)
         # Clean up LLM response
         content = response.choices[0].message.content.strip()
         # Remove markdown formatting, quotes, and word count
@@ -104,7 +156,7 @@ def generate_tree_explanation(context):
     except Exception as e:
         raise Exception(f"LLM explanation failed: {str(e)}")
 
-def generate_care_instructions(context):
+def generate_care_instructions(context, record_stats=True):
     """Generate personalized care instructions using LLM"""
     if not client:
         print("[MISTRAL] No client available, using fallback care instructions")
@@ -123,16 +175,39 @@ def generate_care_instructions(context):
             return ["Consider alternative species for this season", "If proceeding: water daily for first 2 months", "Apply organic fertilizer monthly", "Provide shade during hot periods", "Monitor daily for stress signs"]
     
     base_care = context.get('base_care', [])
+    inputs = _care_inputs(context)
+    care_instructions = llm_cache.cached_call(
+        'care_instructions', inputs, lambda: _request_care_instructions(inputs), record_stats=record_stats
+    )
+    return care_instructions or base_care
+
+def _care_inputs(context):
+    return {
+        'species': context['species'],
+        'county': context['county'],
+        'season': context['season'],
+        'survival_rate': llm_cache.bucket_survival_rate(context['survival_rate']),
+        'risk_level': context['risk_level'],
+        'base_care': list(context.get('base_care', [])),
+    }
+
+def get_cached_care_instructions(context):
+    """Return cached LLM care instructions for a prediction without calling the LLM"""
+    return llm_cache.get_cached('care_instructions', _care_inputs(context))
+
+def _request_care_instructions(inputs):
+    """Ask the LLM for care instructions; returns an empty list if none were usable"""
+    base_care = inputs['base_care']
     base_care_text = "; ".join(base_care) if base_care else "Standard tree care"
     
     prompt = f"""
     You are an expert Kenyan forestry advisor. Generate personalized care instructions for this tree planting:
 
-    Species: {context['species']}
-    Location: {context['county']} County, Kenya
-    Planting Season: {context['season']}
-    Survival Rate: {context['survival_rate']:.1f}%
-    Risk Level: {context['risk_level']}
+    Species: {inputs['species']}
+    Location: {inputs['county']} County, Kenya
+    Planting Season: {inputs['season']}
+    Survival Rate: {llm_cache.survival_band(inputs['survival_rate'])}
+    Risk Level: {inputs['risk_level']}
     
     Base care instructions: {base_care_text}
     
@@ -148,17 +223,13 @@ def generate_care_instructions(context):
     - Don't use markdown formatting or quotes
     - Write in plain text only
     - Keep each instruction under 100 characters
+    - Don't mention percentages
     """
     
     messages = [ChatMessage(role="user", content=prompt)]
     
     try:
-        response = client.chat(
-            model="mistral-small",
-            messages=messages,
-            max_tokens=200,
-            temperature=0.3
-        )
+        response = _chat(messages, max_tokens=200)
         
         # Parse response into list
         care_text = response.choices[0].message.content.strip()
@@ -182,7 +253,7 @@ def generate_care_instructions(context):
             if len(clean) > 20 and not clean.endswith(('with', 'using', 'to', 'for', 'and', 'or')):
                 cleaned_instructions.append(clean)
         
-        return cleaned_instructions if cleaned_instructions else base_care
+        return cleaned_instructions
         
     except Exception as e:
         raise Exception(f"LLM care instructions failed: {str(e)}")
@@ -222,4 +293,4 @@ def analyze_prediction_with_llm(context):
         return max(-15, min(12, adjustment))
     
     # LLM analysis would go here
-    return 0
\ No newline at end of file
+    return 0
@@ -13,6 +13,23 @@ try:
 except ImportError:
     ML_AVAILABLE = False
 
+# Species the model was trained on
+SPECIES_LIST = ['Eucalyptus', 'Pine', 'Acacia', 'Cypress', 'Cedar', 
+                'Grevillea', 'Neem', 'Wattle', 'Bamboo', 'Casuarina', 
+                'Jacaranda', 'Indigenous Mix']
+
+# (encoder name, input key, encoded column, code used for unknown categories)
+CATEGORICAL_FEATURES = [
+    ('species', 'tree_species', 'tree_species_encoded', 0),
+    ('region', 'region', 'region_encoded', 0),
+    ('county', 'county', 'county_encoded', 0),
+    ('soil_type', 'soil_type', 'soil_type_encoded', 0),
+    ('planting_season', 'planting_season', 'planting_season_encoded', 0),
+    ('planting_method', 'planting_method', 'planting_method_encoded', 0),
+    ('care_level', 'care_level', 'care_level_encoded', 1),  # Default to medium
+    ('water_source', 'water_source', 'water_source_encoded', 0),
+]
+
 class TreeSurvivalPredictor:
     """Tree survival prediction utility for MsituGuard"""
     
@@ -21,6 +38,7 @@ class TreeSurvivalPredictor:
         self.scaler = None
         self.encoders = None
         self.feature_columns = None
+        self.encoder_lookup = {}
         self.load_model()
     
     def load_model(self):
@@ -39,6 +57,7 @@ class TreeSurvivalPredictor:
             self.scaler = joblib.load(os.path.join(model_dir, 'tree_scaler.pkl'))
             self.encoders = joblib.load(os.path.join(model_dir, 'tree_encoders.pkl'))
             self.feature_columns = joblib.load(os.path.join(model_dir, 'feature_columns.pkl'))
+            self._build_encoder_lookup()
             
             print("Model loaded successfully!")
             
@@ -48,10 +67,68 @@ class TreeSurvivalPredictor:
             self.model = None
             self._setup_fallback_data()
     
+    def _build_encoder_lookup(self):
+        """Precompute category -> code dicts so encoding is a plain dict lookup"""
+        self.encoder_lookup = {
+            name: {label: code for code, label in enumerate(encoder.classes_)}
+            for name, encoder in self.encoders.items()
+        }
+    
+    def _encode_features(self, rows):
+        """Build the (n_rows, n_features) matrix in feature_columns order for many rows at once"""
+        n_rows = len(rows)
+        columns = {}
+        
+        for encoder_name, key, column, default in CATEGORICAL_FEATURES:
+            lookup = self.encoder_lookup.get(encoder_name, {})
+            columns[column] = np.fromiter(
+                (lookup.get(row.get(key), default) for row in rows), dtype=float, count=n_rows
+            )
+        
+        def numeric(key, default):
+            return np.fromiter(
+                (float(row.get(key, default)) for row in rows), dtype=float, count=n_rows
+            )
+        
+        # Engineered features that the model expects
+        columns['water_balance'] = numeric('rainfall_mm', 600) - numeric('temperature_c', 20) * 20
+        columns['is_high_altitude'] = (numeric('altitude_m', 1500) > 1800).astype(float)
+        columns['soil_acidity'] = (numeric('soil_ph', 6.5) < 6.0).astype(float)
+        
+        # Raw numeric inputs; missing features default to 0
+        for col in self.feature_columns:
+            if col not in columns:
+                columns[col] = numeric(col, 0)
+        
+        return np.column_stack([columns[col] for col in self.feature_columns])
+    
+    def _score_features(self, X):
+        """Scale a feature matrix and return survival probabilities for every row"""
+        X_scaled = self.scaler.transform(pd.DataFrame(X, columns=self.feature_columns))
+        X_df = pd.DataFrame(X_scaled, columns=self.feature_columns)
+        return self.model.predict_proba(X_df)[:, 1]  # Probability of survival
+    
+    def _build_result(self, survival_prob, tree_data, demo_mode=False):
+        """Assemble the prediction response for one row"""
+        result = {
+            'success': True,
+            'survival_probability': round(survival_prob * 100, 1),
+            'confidence_level': self.get_confidence_level(survival_prob * 100),
+            'prediction': "Likely to Survive" if survival_prob >= 0.6 else "High Risk",
+            'recommendation': self.get_recommendation(survival_prob, tree_data),
+            'risk_level': self.get_risk_level(survival_prob),
+            'risks': self.identify_risks(tree_data),
+            'reasons': self.explain_prediction(tree_data, survival_prob),
+            'model_version': MODEL_VERSION
+        }
+        if demo_mode:
+            result['demo_mode'] = True
+        return result
+    
     def _setup_fallback_data(self):
         """Setup fallback data for demo when model fails to load"""
         self.fallback_encoders = {
-            'species': ['Eucalyptus', 'Pine', 'Acacia', 'Cypress', 'Cedar', 'Grevillea', 'Neem', 'Wattle', 'Bamboo', 'Casuarina', 'Jacaranda', 'Indigenous Mix'],
+            'species': list(SPECIES_LIST),
             'region': ['Central', 'Eastern', 'Western', 'Coastal', 'Northern'],
             'county': ['Nairobi', 'Kiambu', 'Nakuru', 'Mombasa', 'Kisumu', 'Eldoret', 'Thika', 'Machakos'],
             'soil_type': ['Clay', 'Loam', 'Sandy', 'Rocky', 'Volcanic'],
@@ -83,7 +160,7 @@ class TreeSurvivalPredictor:
             'weather_condition': 'Clear'
         }
     
-    def _calculate_demo_probability(self, tree_data):
+    def _calculate_demo_probability(self, tree_data, weather_data=None):
         """Calculate realistic demo probability using LIVE weather + county data"""
         
         base_prob = 0.65  # Base survival rate
@@ -93,7 +170,8 @@ class TreeSurvivalPredictor:
         lat = tree_data.get('latitude')
         lon = tree_data.get('longitude')
         
-        weather_data = self.get_live_weather_data(county, lat, lon)
+        if weather_data is None:
+            weather_data = self.get_live_weather_data(county, lat, lon)
         
         # Normalize rainfall from hourly to daily
         from .weather_normalizer import normalize_rainfall
@@ -196,7 +274,6 @@ class TreeSurvivalPredictor:
         if not self.model:
             # Use fallback demo prediction
             survival_prob = self._calculate_demo_probability(tree_data)
-            recommendation = self.get_recommendation(survival_prob, tree_data)
             
             print(f"[COUNTY DATA] Environmental factors used:")
             print(f"   County: {tree_data.get('county')}")
@@ -206,23 +283,7 @@ class TreeSurvivalPredictor:
             print(f"   Soil pH: {tree_data.get('soil_ph')}")
             print(f"   -> Survival Probability: {survival_prob:.3f}")
             
-            # Enhanced response with confidence and explanations
-            confidence_level = self.get_confidence_level(survival_prob * 100)
-            risks = self.identify_risks(tree_data)
-            reasons = self.explain_prediction(tree_data, survival_prob)
-            
-            return {
-                'success': True,
-                'survival_probability': round(survival_prob * 100, 1),
-                'confidence_level': confidence_level,
-                'prediction': "Likely to Survive" if survival_prob >= 0.6 else "High Risk",
-                'recommendation': recommendation,
-                'risk_level': self.get_risk_level(survival_prob),
-                'risks': risks,
-                'reasons': reasons,
-                'model_version': MODEL_VERSION,
-                'demo_mode': True
-            }
+            return self._build_result(survival_prob, tree_data, demo_mode=True)
         
         try:
             if not ML_AVAILABLE:
@@ -234,122 +295,71 @@ class TreeSurvivalPredictor:
                 tree_data['rainfall_mm'] = weather['rainfall_mm']
                 tree_data['temperature_c'] = weather['temperature_c']
                 
-            # Prepare input data
-            input_data = pd.DataFrame([tree_data])
-            
-            # Handle unknown categories gracefully
-            try:
-                input_data['tree_species_encoded'] = self.encoders['species'].transform([tree_data['tree_species']])[0]
-            except ValueError:
-                input_data['tree_species_encoded'] = 0  # Default to first category
-                
-            try:
-                input_data['region_encoded'] = self.encoders['region'].transform([tree_data['region']])[0]
-            except ValueError:
-                input_data['region_encoded'] = 0
-                
-            try:
-                input_data['county_encoded'] = self.encoders['county'].transform([tree_data['county']])[0]
-            except ValueError:
-                input_data['county_encoded'] = 0
-                
-            try:
-                input_data['soil_type_encoded'] = self.encoders['soil_type'].transform([tree_data['soil_type']])[0]
-            except ValueError:
-                input_data['soil_type_encoded'] = 0
-                
-            try:
-                input_data['planting_season_encoded'] = self.encoders['planting_season'].transform([tree_data['planting_season']])[0]
-            except ValueError:
-                input_data['planting_season_encoded'] = 0
-                
-            try:
-                input_data['planting_method_encoded'] = self.encoders['planting_method'].transform([tree_data['planting_method']])[0]
-            except ValueError:
-                input_data['planting_method_encoded'] = 0
-                
-            try:
-                input_data['care_level_encoded'] = self.encoders['care_level'].transform([tree_data['care_level']])[0]
-            except ValueError:
-                input_data['care_level_encoded'] = 1  # Default to medium
-                
-            try:
-                input_data['water_source_encoded'] = self.encoders['water_source'].transform([tree_data['water_source']])[0]
-            except ValueError:
-                input_data['water_source_encoded'] = 0
-            
-            # Add engineered features that the model expects
-            input_data['water_balance'] = tree_data.get('rainfall_mm', 600) - (tree_data.get('temperature_c', 20) * 20)
-            input_data['is_high_altitude'] = 1 if tree_data.get('altitude_m', 1500) > 1800 else 0
-            input_data['soil_acidity'] = 1 if tree_data.get('soil_ph', 6.5) < 6.0 else 0
-            
-            # Select features (handle missing columns gracefully)
-            available_features = [col for col in self.feature_columns if col in input_data.columns]
-            if len(available_features) != len(self.feature_columns):
-                # Add missing features with default values
-                for col in self.feature_columns:
-                    if col not in input_data.columns:
-                        input_data[col] = 0
-            
-            X = input_data[self.feature_columns]
-            
-            # Scale features
-            X_scaled = self.scaler.transform(X)
-            
-            # Make prediction with proper DataFrame handling
+            # Encode, scale and score through the same path as batch predictions
             try:
-                # Ensure we're using DataFrame with proper column names
-                X_df = pd.DataFrame(X_scaled, columns=self.feature_columns)
-                survival_prob = self.model.predict_proba(X_df)[0][1]  # Probability of survival
+                X = self._encode_features([tree_data])
+                survival_prob = float(self._score_features(X)[0])
                 print(f"   ML model prediction successful: {survival_prob:.3f}")
             except Exception as pred_error:
                 print(f"   ML prediction error: {pred_error}")
                 # Fallback to demo calculation
                 survival_prob = self._calculate_demo_probability(tree_data)
             
-            # Generate recommendation
-            recommendation = self.get_recommendation(survival_prob, tree_data)
-            
-            # Enhanced response with confidence and explanations
-            confidence_level = self.get_confidence_level(survival_prob * 100)
-            risks = self.identify_risks(tree_data)
-            reasons = self.explain_prediction(tree_data, survival_prob)
-            
-            return {
-                'success': True,
-                'survival_probability': round(survival_prob * 100, 1),
-                'confidence_level': confidence_level,
-                'prediction': "Likely to Survive" if survival_prob >= 0.6 else "High Risk",
-                'recommendation': recommendation,
-                'risk_level': self.get_risk_level(survival_prob),
-                'risks': risks,
-                'reasons': reasons,
-                'model_version': MODEL_VERSION
-            }
+            return self._build_result(survival_prob, tree_data)
             
         except Exception as e:
             print(f"Full prediction error: {e}")
             # Fallback to demo prediction
             survival_prob = self._calculate_demo_probability(tree_data)
-            recommendation = self.get_recommendation(survival_prob, tree_data)
-            
-            # Enhanced response with confidence and explanations
-            confidence_level = self.get_confidence_level(survival_prob * 100)
-            risks = self.identify_risks(tree_data)
-            reasons = self.explain_prediction(tree_data, survival_prob)
-            
-            return {
-                'success': True,
-                'survival_probability': round(survival_prob * 100, 1),
-                'confidence_level': confidence_level,
-                'prediction': "Likely to Survive" if survival_prob >= 0.6 else "High Risk",
-                'recommendation': recommendation,
-                'risk_level': self.get_risk_level(survival_prob),
-                'risks': risks,
-                'reasons': reasons,
-                'model_version': MODEL_VERSION,
-                'demo_mode': True
-            }
+            return self._build_result(survival_prob, tree_data, demo_mode=True)
+    
+    def predict_survival_batch(self, rows):
+        """
+        Predict survival for many planting scenarios in a single model call
+        
+        Args:
+            rows (list): List of tree_data dicts, as accepted by predict_survival
+        
+        Returns:
+            list: Prediction results in the same order and format as predict_survival
+        """
+        if not rows:
+            return []
+        
+        # Fetch live weather once per distinct location in the batch
+        weather_by_location = {}
+        batch = []
+        batch_weather = []
+        for row in rows:
+            tree_data = dict(row)
+            location = (tree_data.get('latitude'), tree_data.get('longitude'))
+            if location not in weather_by_location:
+                weather_by_location[location] = self.get_live_weather_data(
+                    tree_data.get('county'), *location
+                )
+            weather = weather_by_location[location]
+            tree_data['rainfall_mm'] = weather['rainfall_mm']
+            tree_data['temperature_c'] = weather['temperature_c']
+            batch.append(tree_data)
+            batch_weather.append(weather)
+        
+        if self.model and ML_AVAILABLE:
+            try:
+                X = self._encode_features(batch)
+                probabilities = self._score_features(X)
+                print(f"   ML batch prediction successful for {len(batch)} rows")
+                return [
+                    self._build_result(float(prob), tree_data)
+                    for prob, tree_data in zip(probabilities, batch)
+                ]
+            except Exception as e:
+                print(f"Batch prediction error: {e}")
+        
+        # Fallback to demo predictions, reusing the weather fetched above
+        return [
+            self._build_result(self._calculate_demo_probability(tree_data, weather), tree_data, demo_mode=True)
+            for tree_data, weather in zip(batch, batch_weather)
+        ]
     
     def get_recommendation(self, survival_prob, tree_data):
         """Generate planting recommendation based on survival probability"""
@@ -469,39 +479,53 @@ class TreeSurvivalPredictor:
         }
         return species in success_map.get(county, [])
     
-    def get_species_recommendations(self, location_data):
-        """Get recommended species for a specific location"""
+    def get_species_recommendations(self, location_data, species_list=None, top_k=5):
+        """
+        Get recommended species for a specific location
         
-        species_list = ['Eucalyptus', 'Pine', 'Acacia', 'Cypress', 'Cedar', 
-                       'Grevillea', 'Neem', 'Wattle', 'Bamboo', 'Casuarina', 
-                       'Jacaranda', 'Indigenous Mix']
+        Args:
+            location_data (dict): Location context shared by every candidate species
+            species_list (list): Candidate species names, defaults to SPECIES_LIST
+            top_k (int): Number of recommendations to return
+        
+        Returns:
+            list: Top species sorted by survival probability
+        """
         
-        recommendations = []
+        species_list = list(species_list or SPECIES_LIST)
         
-        for species in species_list:
-            test_data = {
+        # One row per species; the batch fetches weather once and scores all rows together
+        rows = [
+            {
                 **location_data,
                 'tree_species': species,
                 'tree_age_months': 12,  # Standard age for comparison
                 'care_level': 'Medium',
                 'planting_method': 'Seedling'
             }
-            
-            try:
-                result = self.predict_survival(test_data)
-                if result['success']:
-                    recommendations.append({
-                        'species': species,
-                        'survival_probability': result['survival_probability'],
-                        'risk_level': result['risk_level']
-                    })
-            except:
-                continue
+            for species in species_list
+        ]
+        
+        try:
+            results = self.predict_survival_batch(rows)
+        except Exception as e:
+            print(f"Species recommendation error: {e}")
+            return []
+        
+        recommendations = [
+            {
+                'species': species,
+                'survival_probability': result['survival_probability'],
+                'risk_level': result['risk_level']
+            }
+            for species, result in zip(species_list, results)
+            if result['success']
+        ]
         
         # Sort by survival probability
         recommendations.sort(key=lambda x: x['survival_probability'], reverse=True)
         
-        return recommendations[:5]  # Top 5 recommendations
+        return recommendations[:top_k]
 
 # Global predictor instance
 tree_predictor = TreeSurvivalPredictor()
\ No newline at end of file
@@ -1,13 +1,29 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.contrib.auth.models import AbstractUser, Group, Permission
 import os
+import uuid
 import requests
 from django.conf import settings
 
 
 # Create your models here.
+class ProfileQuerySet(models.QuerySet):
+    def with_tree_stats(self):
+        """
+        Annotate computed_verified_trees and computed_tree_predictions from the source tables
+
+        One query for any number of profiles; compare with the stored
+        verified_tree_count and tree_prediction_count to spot drift.
+        """
+        from .profile_stats import tree_predictions_subquery, verified_trees_subquery
+        return self.annotate(
+            computed_verified_trees=verified_trees_subquery(),
+            computed_tree_predictions=tree_predictions_subquery(),
+        )
+
+
 class Profile(models.Model):
     ACCOUNT_TYPES = [
         ('community', 'Community Member'),
@@ -47,6 +63,18 @@ class Profile(models.Model):
     tree_points = models.PositiveIntegerField(default=0, help_text='Points from verified tree plantings')
     environmental_badges = models.TextField(blank=True, help_text='Comma-separated list of earned badges')
     
+    # Maintained by App/profile_stats.py from TreePlanting and TreePrediction signals
+    verified_tree_count = models.PositiveIntegerField(default=0, editable=False, help_text='Trees in verified plantings')
+    tree_prediction_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    STAT_FIELDS = ('verified_tree_count', 'tree_prediction_count')
+    
+    objects = ProfileQuerySet.as_manager()
+    
+    def refresh_tree_stats(self):
+        """Reload the counters, which change with UPDATEs, before saving a copy loaded earlier"""
+        if self.pk:
+            self.refresh_from_db(fields=self.STAT_FIELDS)
     
     @property
     def badges_list(self):
@@ -59,6 +87,7 @@ class Profile(models.Model):
         if badge_name not in current_badges:
             current_badges.append(badge_name)
             self.environmental_badges = ', '.join(current_badges)
+            self.refresh_tree_stats()
             self.save()
     
     @property
@@ -94,20 +123,12 @@ class Profile(models.Model):
     @property
     def total_verified_trees(self):
         """Count of verified trees planted by this user"""
-        from django.db.models import Sum
-        result = TreePlanting.objects.filter(planter=self.user, status='verified').aggregate(
-            total=Sum('number_of_trees')
-        )
-        return result['total'] or 0
-    
-
+        return self.verified_tree_count
     
     @property
     def total_tree_predictions(self):
         """Count of tree predictions made by this user"""
-        return TreePrediction.objects.filter(user=self.user).count()
-    
-
+        return self.tree_prediction_count
     
     @property
     def conservation_rank(self):
@@ -123,6 +144,29 @@ class Profile(models.Model):
     def __str__(self):
         return self.user.username 
 
+class ReportQuerySet(models.QuerySet):
+    def set_status(self, status):
+        """
+        Move every report in the queryset to status with one UPDATE per old status
+
+        report_status_changed is sent once per old status with the number of
+        reports moved, so no rows are loaded. Returns the total moved.
+        """
+        from .signals import report_status_changed
+        moved = 0
+        with transaction.atomic():
+            changing = self.exclude(status=status)
+            old_statuses = list(changing.order_by().values_list('status', flat=True).distinct())
+            for old_status in old_statuses:
+                count = changing.filter(status=old_status).update(status=status)
+                if count:
+                    report_status_changed.send(
+                        sender=self.model, instance=None, old_status=old_status, new_status=status, count=count
+                    )
+                    moved += count
+        return moved
+
+
 class Report(models.Model):
     REPORT_TYPES = [
         ('fire', 'Fire/Wildfire'),
@@ -167,7 +211,7 @@ class Report(models.Model):
     #AI classification
     predicted_category = models.CharField(max_length=50, blank=True, null=True)
     
-
+    objects = ReportQuerySet.as_manager()
     
     class Meta:
         ordering = ['-timestamp']
@@ -357,6 +401,8 @@ class TreePlanting(models.Model):
             if user_tree_count == 1:  # First verified tree planting
                 self.planter.profile.add_badge("🌍 15 Billion Trees Initiative Participant")
             
+            # Saving this planting moved the counters since the profile was loaded
+            self.planter.profile.refresh_tree_stats()
             self.planter.profile.save()
             return True
         return False
@@ -377,16 +423,22 @@ class TreePlanting(models.Model):
 
 
 class WeatherSnapshot(models.Model):
+    grid_key = models.CharField(max_length=50, blank=True, default='', help_text='Grid-snapped "lat,lon" used as the shared weather cache key')
     latitude = models.FloatField()
     longitude = models.FloatField()
     temperature_c = models.FloatField()
     humidity = models.IntegerField()
     rain_mm_hour = models.FloatField(default=0)
     wind_speed = models.FloatField()
+    pressure = models.FloatField(default=1013)
+    weather_main = models.CharField(max_length=50, default="Clear")
     source = models.CharField(max_length=50, default="OpenWeather")
     cached = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['grid_key', '-created_at'])]
+
     def __str__(self):
         return f"Weather @ {self.created_at} ({self.latitude},{self.longitude})"
 
@@ -515,3 +567,195 @@ class CountySpecies(models.Model):
     def __str__(self):
         return f"{self.species.name} in {self.county.name} ({self.survival_rate}% survival)"
 
+
+
+class PlaybookScore(models.Model):
+    county_species = models.OneToOneField(CountySpecies, on_delete=models.CASCADE, related_name='playbook_score')
+    county_name = models.CharField(max_length=100)
+    species_name = models.CharField(max_length=100)
+    season_scores = models.JSONField(default=dict, help_text='Playbook survival scores as {season_key: {care_level: score}}')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('county_name', 'species_name')
+
+    def __str__(self):
+        return f"Playbook scores for {self.species_name} in {self.county_name}"
+
+
+class LLMResponse(models.Model):
+    cache_key = models.CharField(max_length=64, unique=True, help_text='SHA-256 of the normalized prompt inputs')
+    kind = models.CharField(max_length=30)
+    prompt_inputs = models.JSONField(default=dict)
+    response = models.JSONField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} response ({self.hit_count} hits)"
+
+
+class ExplanationJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    explanation_context = models.JSONField(default=dict)
+    care_context = models.JSONField(default=dict)
+    explanation = models.TextField(blank=True)
+    after_care = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Explanation job {self.id} ({self.status})"
+
+
+class PlatformCounter(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class CommandCheckpoint(models.Model):
+    name = models.CharField(max_length=100, unique=True, help_text='Management command that owns the checkpoint')
+    position = models.BigIntegerField(default=0, help_text='Last id the command fully processed')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at #{self.position}"
+
+
+class PageCacheGeneration(models.Model):
+    group = models.CharField(max_length=50, unique=True, help_text='Model group, see App/page_cache.py')
+    generation = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.group} generation {self.generation}"
+
+
+class PlanterTally(models.Model):
+    # Not a foreign key: a user delete cascades to the tally before the plantings' post_delete runs
+    planter_pk = models.IntegerField(unique=True, help_text='Planter user id, 0 for plantings without a registered planter')
+    plantings = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Planter {self.planter_pk}: {self.plantings} plantings"
+
+
+class ExportJob(models.Model):
+    DATASET_CHOICES = [
+        ('reports', 'Reports'),
+        ('plantings', 'Tree Plantings'),
+        ('predictions', 'Tree Predictions'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv.gz', 'Compressed CSV'),
+        ('parquet', 'Parquet'),
+        ('arrow', 'Arrow IPC'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    dataset = models.CharField(max_length=20, choices=DATASET_CHOICES)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv.gz')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    since_id = models.BigIntegerField(default=0, help_text='Only rows with a larger id are exported')
+    last_id = models.BigIntegerField(null=True, blank=True, help_text='Largest id written; the next incremental export starts here')
+    row_count = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['dataset', 'status', '-created_at'])]
+
+    def __str__(self):
+        return f"{self.get_dataset_display()} export {self.id} ({self.status})"
+
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50, blank=True, help_text='Which notification queued the email')
+    dedupe_key = models.CharField(max_length=100, unique=True, null=True, blank=True, help_text='Set for notifications that must only be sent once')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.status})"
+
+
+class MediaUpload(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    model_label = models.CharField(max_length=100, help_text='e.g. App.Report')
+    object_id = models.PositiveBigIntegerField()
+    field_name = models.CharField(max_length=50)
+    staged_path = models.CharField(max_length=500, help_text='Name of the original in staging storage, until processed')
+    original_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    gps_latitude = models.FloatField(null=True, blank=True)
+    gps_longitude = models.FloatField(null=True, blank=True)
+    variants = models.JSONField(default=dict, help_text='Variant name to stored file name')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, help_text='When the current processing attempt began')
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['model_label', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id}.{self.field_name} ({self.status})"
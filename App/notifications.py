@@ -0,0 +1,110 @@
+"""
+Notification emails built from the templates in App/templates/App/emails
+
+Each builder returns the keyword arguments for email_outbox.queue_email();
+the *_emails variants render one template for a whole batch of recipients.
+"""
+from django.conf import settings
+from django.urls import reverse
+from .email_templates import render_email, render_emails
+
+SITE_URL = getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000').rstrip('/')
+
+
+def planting_badge(number_of_trees):
+    """Badge awarded for a verified planting of this many trees"""
+    if number_of_trees >= 50:
+        return "🌳 Forest Hero"
+    elif number_of_trees >= 20:
+        return "🌲 Tree Champion"
+    elif number_of_trees >= 10:
+        return "🌿 Green Warrior"
+    elif number_of_trees >= 5:
+        return "🌱 Eco Defender"
+    return "🍃 Nature Friend"
+
+
+def report_submitted_email(report, dashboard_url):
+    return {
+        'subject': '🌱 Report Submitted Successfully',
+        'body': f'Hello {report.reporter.username},\n\nThank you for submitting "{report.title}". Track progress: {dashboard_url}',
+        'to': [report.reporter.email],
+        'html_body': render_email('App/emails/report_submitted.html', {
+            'report': report,
+            'dashboard_url': dashboard_url,
+        }),
+        'kind': 'report_submitted',
+    }
+
+
+def _tree_verified_context(tree_planting, conservation_rank):
+    return {
+        'tree_planting': tree_planting,
+        'points_earned': tree_planting.number_of_trees,
+        'badge': planting_badge(tree_planting.number_of_trees),
+        'conservation_rank': conservation_rank,
+        'site_url': SITE_URL + '/',
+    }
+
+
+def _tree_verified_message(context, html_body):
+    tree_planting = context['tree_planting']
+    return {
+        'subject': 'Tree Planting Verified - Points & Badge Earned! - MsituGuard',
+        'body': f'Hello {tree_planting.planter.first_name},\n\nYour tree planting "{tree_planting.title}" has been verified! You earned {context["points_earned"]} tree points and the "{context["badge"]}" badge.',
+        'to': [tree_planting.planter.email],
+        'html_body': html_body,
+        'kind': 'tree_verified',
+        'dedupe_key': f'tree_verified:{tree_planting.pk}',
+    }
+
+
+def tree_verified_email(tree_planting, conservation_rank):
+    context = _tree_verified_context(tree_planting, conservation_rank)
+    return _tree_verified_message(context, render_email('App/emails/tree_verified.html', context))
+
+
+def tree_verified_emails(plantings):
+    """
+    Build verification emails for many (tree_planting, conservation_rank) pairs
+
+    The template is rendered for the whole batch in one pass.
+    """
+    contexts = [_tree_verified_context(tree_planting, rank) for tree_planting, rank in plantings]
+    html_bodies = render_emails('App/emails/tree_verified.html', contexts)
+    return [_tree_verified_message(context, html) for context, html in zip(contexts, html_bodies)]
+
+
+def unregistered_reward_email(tree_planting, name, email):
+    points_earned = tree_planting.number_of_trees
+    badge = planting_badge(tree_planting.number_of_trees)
+    register_url = SITE_URL + reverse('register')
+    return {
+        'subject': 'Tree Planting Verified - Claim Your Rewards! - MsituGuard',
+        'body': f'Hello {name},\n\nYour tree planting "{tree_planting.title}" has been verified! You earned {points_earned} tree points and the "{badge}" badge. Create your free account to claim your complete rewards: {register_url}',
+        'to': [email],
+        'html_body': render_email('App/emails/unregistered_reward.html', {
+            'tree_planting': tree_planting,
+            'name': name,
+            'points_earned': points_earned,
+            'badge': badge,
+            'register_url': register_url,
+        }),
+        'kind': 'unregistered_reward',
+    }
+
+
+def tree_planting_verification_email(user, verification_url, temp_password, login_url, is_logged_in):
+    return {
+        'subject': 'Verify Your Tree Planting Account - MsituGuard',
+        'body': f'Hello {user.first_name},\n\nThank you for contributing to Kenya\'s 15 billion trees initiative! Please verify your account: {verification_url}',
+        'to': [user.email],
+        'html_body': render_email('App/emails/tree_planting_verification.html', {
+            'user': user,
+            'verification_url': verification_url,
+            'temp_password': temp_password,
+            'login_url': login_url,
+            'is_logged_in': is_logged_in,
+        }),
+        'kind': 'tree_planting_verification',
+    }
@@ -0,0 +1,129 @@
+"""
+Data for the organization dashboard
+
+The page itself only renders the headline figures and the first page of
+reports; tree registrations and map markers are fetched from JSON endpoints
+after the first paint. Lists are paged by keyset on the primary key, newest
+first (ids follow the auto_now_add timestamps), so a page costs the same
+however long an organization's history is. Totals and badge figures are
+aggregated in the database in one query per table.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+
+ORG_DASHBOARD_PAGE_SIZE = getattr(settings, 'ORG_DASHBOARD_PAGE_SIZE', 24)
+ORG_DASHBOARD_MARKER_PAGE_SIZE = getattr(settings, 'ORG_DASHBOARD_MARKER_PAGE_SIZE', 500)
+
+BADGES = ('Diamond', 'Gold', 'Silver', 'Bronze')
+
+REPORT_MARKER_FIELDS = ('id', 'title', 'location_name', 'latitude', 'longitude', 'report_type', 'status', 'timestamp', 'description')
+PLANTING_MARKER_FIELDS = (
+    'id', 'title', 'location_name', 'latitude', 'longitude', 'tree_type', 'number_of_trees', 'status',
+    'planter', 'planter_name', 'planter__first_name', 'planter__last_name', 'planter__username', 'description',
+)
+
+
+def parse_cursor(value):
+    """The ?after= cursor is the last id of the previous page"""
+    if not value:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid cursor '{value}'")
+
+
+def keyset_page(queryset, after=None, limit=ORG_DASHBOARD_PAGE_SIZE):
+    """Return (rows, next cursor) for the page of queryset after the given id, newest first"""
+    queryset = queryset.order_by('-pk')
+    if after is not None:
+        queryset = queryset.filter(pk__lt=after)
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not has_more:
+        return rows, None
+    last = rows[-1]
+    return rows, last['id'] if isinstance(last, dict) else last.pk
+
+
+def report_page(after=None, status=None, limit=ORG_DASHBOARD_PAGE_SIZE):
+    from .models import Report
+    reports = Report.objects.select_related('reporter')
+    if status:
+        reports = reports.filter(status=status)
+    return keyset_page(reports, after, limit)
+
+
+def tree_page(after=None, user_type=None, limit=ORG_DASHBOARD_PAGE_SIZE):
+    from treeregistration.models import Tree
+    trees = Tree.objects.select_related('user__treeregistration_profile')
+    if user_type:
+        trees = trees.filter(user__treeregistration_profile__user_type=user_type)
+    return keyset_page(trees, after, limit)
+
+
+def _coordinates_to_float(row):
+    row['latitude'], row['longitude'] = float(row['latitude']), float(row['longitude'])
+
+
+def report_markers(after=None, limit=ORG_DASHBOARD_MARKER_PAGE_SIZE):
+    """Map markers for reports with coordinates, as plain dicts"""
+    from .models import Report
+    reports = Report.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    rows, cursor = keyset_page(reports.values(*REPORT_MARKER_FIELDS), after, limit)
+    report_types = dict(Report.REPORT_TYPES)
+    for row in rows:
+        _coordinates_to_float(row)
+        row['get_report_type_display'] = report_types.get(row['report_type'], row['report_type'])
+    return rows, cursor
+
+
+def _planter_display_name(row):
+    # Same rules as TreePlanting.planter_display_name, without loading the planter
+    if row['planter']:
+        name = f"{row['planter__first_name']} {row['planter__last_name']}".strip()
+        return name or row['planter__username']
+    return f"{row['planter_name']} (Unregistered)" if row['planter_name'] else "Unknown Planter"
+
+
+def planting_markers(after=None, limit=ORG_DASHBOARD_MARKER_PAGE_SIZE):
+    """Map markers for tree plantings with coordinates, as plain dicts"""
+    from .models import TreePlanting
+    plantings = TreePlanting.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    rows, cursor = keyset_page(plantings.values(*PLANTING_MARKER_FIELDS), after, limit)
+    tree_types = dict(TreePlanting.TREE_TYPES)
+    for row in rows:
+        _coordinates_to_float(row)
+        row['planter_display_name'] = _planter_display_name(row)
+        row['get_tree_type_display'] = tree_types.get(row['tree_type'], row['tree_type'])
+        for field in ('planter__first_name', 'planter__last_name', 'planter__username'):
+            del row[field]
+    return rows, cursor
+
+
+def tree_registration_stats():
+    """Registered tree and participant totals, with badge counts, in two queries"""
+    from treeregistration.models import Tree, UserProfile
+    org = Q(user_type=UserProfile.ORGANISATION)
+    badge_counts = {}
+    for badge in BADGES:
+        name = badge.lower()
+        badge_counts[f'{name}_users'] = Count('pk', filter=Q(badge=badge))
+        badge_counts[f'org_{name}_users'] = Count('pk', filter=Q(badge=badge) & org)
+    stats = UserProfile.objects.aggregate(
+        total_tree_users=Count('pk'),
+        org_tree_users=Count('pk', filter=org),
+        individual_tree_users=Count('pk', filter=Q(user_type=UserProfile.INDIVIDUAL)),
+        **badge_counts,
+    )
+    stats.update(Tree.objects.aggregate(
+        total_registered_trees=Count('pk'),
+        org_registered_trees_count=Count(
+            'pk', filter=Q(user__treeregistration_profile__user_type=UserProfile.ORGANISATION)
+        ),
+        individual_registered_trees_count=Count(
+            'pk', filter=Q(user__treeregistration_profile__user_type=UserProfile.INDIVIDUAL)
+        ),
+    ))
+    return stats
@@ -0,0 +1,80 @@
+"""
+Cache for public page fragments and JSON payloads
+
+Each entry is keyed on the generation numbers of the model groups it was
+built from, and signals bump a group's generation when one of its models is
+saved or deleted, so the next request misses and rebuilds. Code that writes
+with QuerySet.update() bumps the group itself; PAGE_CACHE_TTL bounds how long
+an entry can outlive a write that was missed. Generations live in
+PageCacheGeneration, shared by every worker process; the payloads themselves
+live in Django's cache.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+PAGE_CACHE_TTL = getattr(settings, 'PAGE_CACHE_TTL', 10 * 60)
+
+# Model groups pages can depend on
+GROUPS = ('reports', 'resources', 'plantings', 'species')
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def get_generations(groups):
+    """Return {group: generation} for the groups in one query"""
+    from .models import PageCacheGeneration
+    stored = dict(PageCacheGeneration.objects.filter(group__in=groups).values_list('group', 'generation'))
+    return {group: stored.get(group, 0) for group in groups}
+
+
+def bump(group):
+    """Invalidate every cached entry that depends on a group"""
+    from .models import PageCacheGeneration
+    if not PageCacheGeneration.objects.filter(group=group).update(generation=F('generation') + 1):
+        PageCacheGeneration.objects.get_or_create(group=group)
+        PageCacheGeneration.objects.filter(group=group).update(generation=F('generation') + 1)
+
+
+def make_key(name, groups, parts=()):
+    generations = get_generations(groups)
+    version = ','.join(f"{group}{generations[group]}" for group in groups)
+    suffix = hashlib.md5(repr(parts).encode('utf-8')).hexdigest() if parts else ''
+    return f"page:{name}:{version}:{suffix}"
+
+
+def _record(name, outcome):
+    with _stats_lock:
+        _stats[name][outcome] += 1
+
+
+def get_stats():
+    """Return this process's hit/miss counters per cached page"""
+    with _stats_lock:
+        stats = {name: dict(counts) for name, counts in _stats.items()}
+    for counts in stats.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / total, 3) if total else 0.0
+    return stats
+
+
+def get_or_build(name, groups, build, parts=()):
+    """
+    Return the cached value for name/parts, calling build() on a miss
+
+    parts distinguishes variants of one page, e.g. the county of an API call.
+    """
+    key = make_key(name, groups, parts)
+    value = cache.get(key)
+    if value is not None:
+        _record(name, 'hits')
+        return value
+
+    _record(name, 'misses')
+    value = build()
+    cache.set(key, value, timeout=PAGE_CACHE_TTL)
+    return value
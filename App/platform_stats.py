@@ -0,0 +1,204 @@
+"""
+Running platform totals for the homepage and tree-initiative pages
+
+Counters in PlatformCounter are adjusted from TreePlanting and Report
+signals inside the same transaction as the save, so pages read every total
+with a single query. The distinct planter count is kept from per-planter
+planting tallies in PlanterTally. reconcile() rebuilds both from scratch
+(manage.py reconcile_platform_stats).
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+REPORT_STATUSES = ('new', 'verified', 'resolved')
+
+COUNTERS = (
+    'trees_planted',
+    'verified_trees',
+    'tree_plantings',
+    'verified_plantings',
+    'planters',
+    'reports_total',
+) + tuple(f'reports_{status}' for status in REPORT_STATUSES)
+
+
+def get_counters():
+    """Return every counter as a dict, missing counters read as 0"""
+    from .models import PlatformCounter
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters.update(PlatformCounter.objects.filter(name__in=COUNTERS).values_list('name', 'value'))
+    return counters
+
+
+def apply_deltas(deltas):
+    """Atomically add deltas ({name: amount}) to the counters"""
+    from .models import PlatformCounter
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        for name, delta in deltas.items():
+            updated = PlatformCounter.objects.filter(name=name).update(value=F('value') + delta)
+            if not updated:
+                counter, _ = PlatformCounter.objects.get_or_create(name=name)
+                PlatformCounter.objects.filter(pk=counter.pk).update(value=F('value') + delta)
+
+
+def planting_state(planting):
+    """The fields of a TreePlanting that feed the counters"""
+    return {
+        'planter_id': planting.planter_id,
+        'status': planting.status,
+        'number_of_trees': planting.number_of_trees or 0,
+    }
+
+
+def stored_planting_state(pk):
+    """planting_state() of the saved row, for instances loaded with those fields deferred"""
+    from .models import TreePlanting
+    row = TreePlanting.objects.filter(pk=pk).values('planter_id', 'status', 'number_of_trees').first()
+    if row is None:
+        return None
+    row['number_of_trees'] = row['number_of_trees'] or 0
+    return row
+
+
+def _verified_trees(state):
+    return state['number_of_trees'] if state['status'] == 'verified' else 0
+
+
+def planter_tally_key(planter_id):
+    # Unregistered plantings (no planter) count as one planter, like values('planter').distinct()
+    return planter_id or 0
+
+
+def _adjust_planter_tally(planter_id, delta):
+    """
+    Add delta to a planter's planting tally and return the change in distinct planters
+
+    Tallies are stored per planter, so a cascade that deletes every planting
+    of a user only drops the planter count once. The UPDATE holds the row
+    lock until commit, so the value read back is this transaction's own.
+    """
+    from .models import PlanterTally
+    key = planter_tally_key(planter_id)
+    with transaction.atomic():
+        if not PlanterTally.objects.filter(planter_pk=key).update(plantings=F('plantings') + delta):
+            PlanterTally.objects.get_or_create(planter_pk=key)
+            PlanterTally.objects.filter(planter_pk=key).update(plantings=F('plantings') + delta)
+        after = PlanterTally.objects.filter(planter_pk=key).values_list('plantings', flat=True).get()
+    before = after - delta
+    return int(after > 0) - int(before > 0)
+
+
+def planting_saved(planting, old_state, created):
+    """Apply the counter changes for a created or updated TreePlanting"""
+    new_state = planting_state(planting)
+    deltas = {
+        'trees_planted': new_state['number_of_trees'],
+        'verified_trees': _verified_trees(new_state),
+        'verified_plantings': int(new_state['status'] == 'verified'),
+        'tree_plantings': int(created),
+    }
+    if not created:
+        deltas['trees_planted'] -= old_state['number_of_trees']
+        deltas['verified_trees'] -= _verified_trees(old_state)
+        deltas['verified_plantings'] -= int(old_state['status'] == 'verified')
+
+    planters = 0
+    if created:
+        planters += _adjust_planter_tally(new_state['planter_id'], 1)
+    elif old_state['planter_id'] != new_state['planter_id']:
+        planters += _adjust_planter_tally(old_state['planter_id'], -1)
+        planters += _adjust_planter_tally(new_state['planter_id'], 1)
+    deltas['planters'] = planters
+    apply_deltas(deltas)
+
+
+def plantings_reassigned(old_planter_id, new_planter_id, count):
+    """
+    Move count plantings between planter tallies
+
+    For bulk update(planter=...); tree and verified totals do not change.
+    """
+    if not count or old_planter_id == new_planter_id:
+        return
+    planters = _adjust_planter_tally(old_planter_id, -count) + _adjust_planter_tally(new_planter_id, count)
+    apply_deltas({'planters': planters})
+
+
+def planting_deleted(old_state):
+    apply_deltas({
+        'trees_planted': -old_state['number_of_trees'],
+        'verified_trees': -_verified_trees(old_state),
+        'verified_plantings': -int(old_state['status'] == 'verified'),
+        'tree_plantings': -1,
+        'planters': _adjust_planter_tally(old_state['planter_id'], -1),
+    })
+
+
+def report_created(status):
+    deltas = {'reports_total': 1}
+    if status in REPORT_STATUSES:
+        deltas[f'reports_{status}'] = 1
+    apply_deltas(deltas)
+
+
+def report_status_moved(old_status, new_status, count=1):
+    """Move count reports from old_status to new_status"""
+    if old_status == new_status:
+        return
+    deltas = {}
+    if old_status in REPORT_STATUSES:
+        deltas[f'reports_{old_status}'] = -count
+    if new_status in REPORT_STATUSES:
+        deltas[f'reports_{new_status}'] = count
+    apply_deltas(deltas)
+
+
+def report_deleted(status):
+    deltas = {'reports_total': -1}
+    if status in REPORT_STATUSES:
+        deltas[f'reports_{status}'] = -1
+    apply_deltas(deltas)
+
+
+def compute_counters():
+    """Compute every counter from scratch"""
+    from .models import TreePlanting, Report
+    plantings = TreePlanting.objects.aggregate(
+        trees_planted=Sum('number_of_trees'),
+        verified_trees=Sum('number_of_trees', filter=Q(status='verified')),
+        tree_plantings=Count('pk'),
+        verified_plantings=Count('pk', filter=Q(status='verified')),
+    )
+    counters = {name: value or 0 for name, value in plantings.items()}
+    counters['planters'] = TreePlanting.objects.values('planter').distinct().count()
+    counters['reports_total'] = Report.objects.count()
+    by_status = dict(Report.objects.values_list('status').annotate(total=Count('pk')).order_by())
+    for status in REPORT_STATUSES:
+        counters[f'reports_{status}'] = by_status.get(status, 0)
+    return counters
+
+
+def compute_planter_tallies():
+    """Planting count per planter, keyed by tally key"""
+    from .models import TreePlanting
+    return {
+        planter_tally_key(planter_id): total
+        for planter_id, total in TreePlanting.objects.values_list('planter').annotate(total=Count('pk')).order_by()
+    }
+
+
+def reconcile():
+    """Rebuild all counters and planter tallies from the TreePlanting and Report tables"""
+    from .models import PlanterTally, PlatformCounter
+    with transaction.atomic():
+        counters = compute_counters()
+        for name, value in counters.items():
+            PlatformCounter.objects.update_or_create(name=name, defaults={'value': value})
+        PlanterTally.objects.all().delete()
+        PlanterTally.objects.bulk_create(
+            PlanterTally(planter_pk=key, plantings=total) for key, total in compute_planter_tallies().items()
+        )
+    return counters
@@ -0,0 +1,179 @@
+"""
+Precomputed playbook survival scores for predict_tree_survival
+
+The playbook half of a prediction only depends on CountySpecies, Species and
+CountyEnvironment rows, which change when load_playbook / load_county_data or
+the admin edit them. Scores for every season key and care level are stored in
+PlaybookScore and refreshed by signals, so a request is a single lookup.
+"""
+from .models import County, Species, CountySpecies, PlaybookScore
+
+# Month tokens used to match a planting season against seasonal_performance keys
+SEASON_MONTHS = ['march', 'april', 'may', 'june', 'july', 'august', 'september', 'sept',
+                 'october', 'oct', 'november', 'december', 'dec']
+
+# Species-specific environmental adjustments
+SPECIES_ADJUSTMENTS = {
+    'Pine': {'highland_bonus': 15, 'lowland_penalty': -20, 'optimal_temp': (10, 22)},
+    'Cypress': {'highland_bonus': 12, 'lowland_penalty': -18, 'optimal_temp': (12, 22)},
+    'Grevillea': {'highland_bonus': 8, 'lowland_penalty': -10, 'optimal_temp': (15, 28)},
+    'Neem': {'drought_bonus': 15, 'highland_penalty': -15, 'optimal_temp': (24, 34)},
+    'Indigenous Mix': {'adaptation_bonus': 10, 'optimal_temp': (12, 26)},
+    'Eucalyptus': {'versatile_bonus': 5, 'optimal_temp': (18, 32)}
+}
+
+CARE_ADJUSTMENTS = {'High': 8, 'Medium': 0, 'Low': -5}
+
+# Key used in season_scores when the planting season matches no seasonal_performance entry
+NO_SEASON = ''
+
+
+def normalize_season(season):
+    """Lowercase a season label and unify dash characters"""
+    return season.lower().replace('–', '-').replace('—', '-')
+
+
+def match_season_key(seasonal_performance, planting_season):
+    """Return the first seasonal_performance key sharing a month with planting_season"""
+    planting_season_lower = normalize_season(planting_season)
+    for season_key in seasonal_performance or {}:
+        season_key_lower = normalize_season(season_key)
+        if any(month in planting_season_lower for month in SEASON_MONTHS if month in season_key_lower):
+            return season_key
+    return None
+
+
+def get_environment(county):
+    """Return the county's environment or None"""
+    return county.environment if hasattr(county, 'environment') else None
+
+
+def compute_playbook_score(base_survival_rate, env, species_name, seasonal_bonus, care_level):
+    """Calculate the species-specific playbook prediction for one scenario"""
+    playbook_prediction = base_survival_rate
+    species_config = SPECIES_ADJUSTMENTS.get(species_name, {})
+
+    # Apply species-specific environmental matching
+    if env:
+        avg_altitude = (env.altitude_m_min + env.altitude_m_max) / 2
+        avg_temp = (env.temperature_c_min + env.temperature_c_max) / 2
+
+        # Highland/Lowland species matching
+        if 'highland_bonus' in species_config and avg_altitude > 1500:
+            playbook_prediction += species_config['highland_bonus']
+        elif 'lowland_penalty' in species_config and avg_altitude > 1500:
+            playbook_prediction += species_config['lowland_penalty']
+
+        if 'highland_penalty' in species_config and avg_altitude > 1500:
+            playbook_prediction += species_config['highland_penalty']
+        elif 'drought_bonus' in species_config and avg_altitude < 1000:
+            playbook_prediction += species_config['drought_bonus']
+
+        # Temperature matching
+        if 'optimal_temp' in species_config:
+            temp_min, temp_max = species_config['optimal_temp']
+            if temp_min <= avg_temp <= temp_max:
+                playbook_prediction += 8  # Optimal temperature bonus
+            elif avg_temp < temp_min - 5 or avg_temp > temp_max + 5:
+                playbook_prediction -= 12  # Temperature stress penalty
+
+        # Adaptation bonuses
+        if 'adaptation_bonus' in species_config:
+            playbook_prediction += species_config['adaptation_bonus']
+        if 'versatile_bonus' in species_config:
+            playbook_prediction += species_config['versatile_bonus']
+
+    # Apply seasonal adjustments
+    if seasonal_bonus != 0:
+        playbook_prediction += seasonal_bonus
+
+    # Care level adjustments
+    playbook_prediction += CARE_ADJUSTMENTS.get(care_level, 0)
+    return max(15, min(95, playbook_prediction))
+
+
+def build_season_scores(county_species):
+    """Build {season_key: {care_level: score}} for a CountySpecies row"""
+    env = get_environment(county_species.county)
+    species_name = county_species.species.name
+    seasonal_performance = county_species.seasonal_performance or {}
+
+    season_bonuses = {NO_SEASON: 0, **seasonal_performance}
+    return {
+        season_key: {
+            care_level: compute_playbook_score(
+                county_species.survival_rate, env, species_name, bonus, care_level
+            )
+            for care_level in CARE_ADJUSTMENTS
+        }
+        for season_key, bonus in season_bonuses.items()
+    }
+
+
+def refresh_county_species(county_species):
+    """Recompute and store the playbook scores for one CountySpecies row"""
+    entry, _ = PlaybookScore.objects.update_or_create(
+        county_species=county_species,
+        defaults={
+            'county_name': county_species.county.name,
+            'species_name': county_species.species.name,
+            'season_scores': build_season_scores(county_species),
+        }
+    )
+    return entry
+
+
+def refresh_playbook_scores(county=None, species=None):
+    """Recompute scores for every row of a county and/or species, or all rows"""
+    county_species_qs = CountySpecies.objects.select_related('county__environment', 'species')
+    if county is not None:
+        county_species_qs = county_species_qs.filter(county=county)
+    if species is not None:
+        county_species_qs = county_species_qs.filter(species=species)
+
+    refreshed = 0
+    for county_species in county_species_qs:
+        refresh_county_species(county_species)
+        refreshed += 1
+    return refreshed
+
+
+def get_playbook_entry(county_name, species_name):
+    """
+    Fetch the precomputed playbook entry for a county/species pair
+
+    A pair with no stored scores yet is scored in memory and not saved, the
+    signals and rebuild_playbook_scores own the writes. Raises
+    County.DoesNotExist, Species.DoesNotExist or CountySpecies.DoesNotExist
+    like the ORM lookups it replaces.
+    """
+    entry = PlaybookScore.objects.select_related(
+        'county_species__county__environment', 'county_species__species'
+    ).filter(county_name=county_name, species_name=species_name).first()
+    if entry:
+        return entry
+
+    county = County.objects.get(name=county_name)
+    species = Species.objects.get(name=species_name)
+    county_species = CountySpecies.objects.select_related(
+        'county__environment', 'species'
+    ).get(county=county, species=species)
+    return PlaybookScore(
+        county_species=county_species,
+        county_name=county.name,
+        species_name=species.name,
+        season_scores=build_season_scores(county_species),
+    )
+
+
+def lookup_playbook_score(entry, planting_season, care_level):
+    """Return (playbook_prediction, seasonal_bonus) for a planting scenario"""
+    seasonal_performance = entry.county_species.seasonal_performance or {}
+    season_key = match_season_key(seasonal_performance, planting_season)
+    if season_key is None or season_key not in entry.season_scores:
+        season_key = NO_SEASON
+    seasonal_bonus = seasonal_performance.get(season_key, 0)
+
+    care_scores = entry.season_scores[season_key]
+    # Unknown care levels get no adjustment, which is the Medium score
+    return care_scores.get(care_level, care_scores['Medium']), seasonal_bonus
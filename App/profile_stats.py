@@ -0,0 +1,78 @@
+"""
+Stored per-profile tree statistics
+
+Profile.verified_tree_count (trees in the user's verified plantings) and
+Profile.tree_prediction_count are adjusted from the TreePlanting and
+TreePrediction signals with a single UPDATE each, so profile pages and
+leaderboards read them like any other column. Profile.objects.with_tree_stats()
+computes the same figures from the source tables for many profiles in one
+query, and reconcile() writes those back (manage.py reconcile_profile_stats).
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def _adjust(user_id, field, delta):
+    from .models import Profile
+    if user_id is None or not delta:
+        return
+    # Greatest() keeps a drifted counter from failing the save that corrects it
+    Profile.objects.filter(user_id=user_id).update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+def _verified_trees(state):
+    return state['number_of_trees'] if state['status'] == 'verified' else 0
+
+
+def planting_saved(old_state, new_state, created):
+    """Move the planting's verified trees between planters' counters as its state changes"""
+    if not created:
+        _adjust(old_state['planter_id'], 'verified_tree_count', -_verified_trees(old_state))
+    _adjust(new_state['planter_id'], 'verified_tree_count', _verified_trees(new_state))
+
+
+def planting_deleted(old_state):
+    _adjust(old_state['planter_id'], 'verified_tree_count', -_verified_trees(old_state))
+
+
+def prediction_created(user_id):
+    _adjust(user_id, 'tree_prediction_count', 1)
+
+
+def prediction_deleted(user_id):
+    _adjust(user_id, 'tree_prediction_count', -1)
+
+
+def verified_trees_subquery():
+    """Sum of verified planting trees for the outer profile's user"""
+    from .models import TreePlanting
+    totals = TreePlanting.objects.filter(planter=OuterRef('user'), status='verified') \
+        .order_by().values('planter').annotate(total=Sum('number_of_trees')).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def tree_predictions_subquery():
+    """Number of predictions for the outer profile's user"""
+    from .models import TreePrediction
+    totals = TreePrediction.objects.filter(user=OuterRef('user')) \
+        .order_by().values('user').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def refresh(profiles):
+    """Recompute the stored statistics of a Profile queryset with one UPDATE; returns rows updated"""
+    return profiles.update(
+        verified_tree_count=verified_trees_subquery(),
+        tree_prediction_count=tree_predictions_subquery(),
+    )
+
+
+def reconcile():
+    """Rebuild every profile's statistics; returns the number of profiles that had drifted"""
+    from .models import Profile
+    drifted = Profile.objects.with_tree_stats().exclude(
+        verified_tree_count=F('computed_verified_trees'),
+        tree_prediction_count=F('computed_tree_predictions'),
+    ).count()
+    refresh(Profile.objects.all())
+    return drifted
@@ -1,23 +1,31 @@
-from django.db.models.signals import post_save, pre_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete, post_init
+from django.dispatch import Signal, receiver
+from django.db.models import DEFERRED
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from django.contrib.auth.models import User
-from .models import Report, Notification, Profile
+from .models import Report, Notification, Profile, County, CountyEnvironment, Species, CountySpecies, TreePlanting, TreePrediction, Resource
 from django.core.mail import EmailMultiAlternatives
 
-@receiver(pre_save, sender=Report)
+# Sent when existing reports change status: by save() with the instance, or by
+# Report.objects.filter(...).set_status() with instance=None, once per old status
+report_status_changed = Signal()
+
+@receiver(post_init, sender=Report)
 def track_report_status_change(sender, instance, **kwargs):
-    """Track status changes to send notifications"""
-    if instance.pk:  # Only for existing reports
-        try:
-            old_report = Report.objects.get(pk=instance.pk)
-            instance._old_status = old_report.status
-        except Report.DoesNotExist:
-            instance._old_status = None
+    """Remember the loaded status so status changes need no extra query"""
+    if instance.pk:
+        # A deferred status is looked up in pre_save, only if the report is saved
+        instance._old_status = instance.__dict__.get('status', DEFERRED)
     else:
         instance._old_status = None
 
+@receiver(pre_save, sender=Report)
+def load_deferred_report_status(sender, instance, **kwargs):
+    if getattr(instance, '_old_status', None) is DEFERRED:
+        instance._old_status = Report.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """Create Profile when User is created"""
@@ -34,4 +42,161 @@ def create_user_profile(sender, instance, created, **kwargs):
                 'last_name': instance.last_name or '',
                 'is_verified': False
             }
-        )
\ No newline at end of file
+        )
+
+@receiver(post_save, sender=CountySpecies)
+def refresh_county_species_playbook(sender, instance, raw=False, **kwargs):
+    """Recompute precomputed playbook scores for the saved county/species pair"""
+    if raw:
+        return
+    from .playbook import refresh_county_species
+    refresh_county_species(instance)
+
+@receiver(post_save, sender=CountyEnvironment)
+def refresh_environment_playbook(sender, instance, raw=False, **kwargs):
+    """Environment ranges feed every species score in the county"""
+    if raw:
+        return
+    from .playbook import refresh_playbook_scores
+    refresh_playbook_scores(county=instance.county_id)
+
+@receiver(post_delete, sender=CountyEnvironment)
+def refresh_playbook_without_environment(sender, instance, **kwargs):
+    """Rescore after commit, the environment may be going with its county in the same cascade"""
+    from .playbook import refresh_playbook_scores
+    county_id = instance.county_id
+
+    def refresh():
+        if County.objects.filter(pk=county_id).exists():
+            refresh_playbook_scores(county=county_id)
+
+    transaction.on_commit(refresh)
+
+@receiver(post_save, sender=County)
+@receiver(post_delete, sender=County)
+def invalidate_county_index(sender, **kwargs):
+    """County centroids changed, rebuild the nearest-county index on next use"""
+    from .utils import invalidate_county_index
+    invalidate_county_index()
+
+@receiver(post_save, sender=County)
+def refresh_county_playbook(sender, instance, created, raw=False, **kwargs):
+    """Keep denormalized county names in sync"""
+    if raw or created:
+        return
+    from .playbook import refresh_playbook_scores
+    refresh_playbook_scores(county=instance)
+
+@receiver(post_save, sender=Species)
+def refresh_species_playbook(sender, instance, created, raw=False, **kwargs):
+    """Keep denormalized species names in sync"""
+    if raw or created:
+        return
+    from .playbook import refresh_playbook_scores
+    refresh_playbook_scores(species=instance)
+
+PLANTING_STATE_FIELDS = {'planter_id', 'status', 'number_of_trees'}
+
+@receiver(post_init, sender=TreePlanting)
+def remember_planting_state(sender, instance, **kwargs):
+    """Keep the loaded values so counter deltas need no extra query"""
+    from .platform_stats import planting_state
+    if instance.pk and PLANTING_STATE_FIELDS - instance.__dict__.keys():
+        # Deferred by only()/defer(); looked up in pre_save/pre_delete, only if the row changes
+        instance._stats_state = DEFERRED
+    else:
+        instance._stats_state = planting_state(instance)
+
+@receiver(pre_save, sender=TreePlanting)
+@receiver(pre_delete, sender=TreePlanting)
+def load_deferred_planting_state(sender, instance, **kwargs):
+    if instance._stats_state is DEFERRED:
+        from .platform_stats import stored_planting_state
+        instance._stats_state = stored_planting_state(instance.pk)
+
+@receiver(post_save, sender=TreePlanting)
+def update_planting_counters(sender, instance, created, raw=False, **kwargs):
+    """Adjust platform tree counters"""
+    if raw:
+        return
+    from .platform_stats import planting_saved, planting_state
+    from . import profile_stats
+    planting_saved(instance, instance._stats_state, created)
+    new_state = planting_state(instance)
+    profile_stats.planting_saved(instance._stats_state, new_state, created)
+    instance._stats_state = new_state
+
+@receiver(post_delete, sender=TreePlanting)
+def remove_planting_counters(sender, instance, **kwargs):
+    from .platform_stats import planting_deleted
+    from . import profile_stats
+    planting_deleted(instance._stats_state)
+    profile_stats.planting_deleted(instance._stats_state)
+
+@receiver(post_save, sender=TreePrediction)
+def count_profile_prediction(sender, instance, created, raw=False, **kwargs):
+    """Adjust the user's stored prediction count"""
+    if raw or not created:
+        return
+    from .profile_stats import prediction_created
+    prediction_created(instance.user_id)
+
+@receiver(post_delete, sender=TreePrediction)
+def uncount_profile_prediction(sender, instance, **kwargs):
+    from .profile_stats import prediction_deleted
+    prediction_deleted(instance.user_id)
+
+@receiver(post_save, sender=Report)
+def update_report_counters(sender, instance, created, raw=False, **kwargs):
+    """Count new reports and send report_status_changed for status changes"""
+    if raw:
+        return
+    old_status, instance._old_status = getattr(instance, '_old_status', None), instance.status
+    if created:
+        from .platform_stats import report_created
+        report_created(instance.status)
+    elif old_status != instance.status:
+        report_status_changed.send(
+            sender=Report, instance=instance, old_status=old_status, new_status=instance.status, count=1
+        )
+
+@receiver(report_status_changed, sender=Report)
+def move_report_counters(sender, old_status, new_status, count, **kwargs):
+    """Adjust platform report counters"""
+    from .platform_stats import report_status_moved
+    report_status_moved(old_status, new_status, count)
+
+@receiver(report_status_changed, sender=Report)
+def invalidate_report_pages(sender, instance, **kwargs):
+    """Bulk changes use update(), which sends no post_save to bump the page cache"""
+    if instance is None:
+        from .page_cache import bump
+        bump('reports')
+
+@receiver(post_delete, sender=Report)
+def remove_report_counters(sender, instance, **kwargs):
+    from .platform_stats import report_deleted
+    report_deleted(instance.status)
+
+# Page cache invalidation: (model, group) pairs, see App/page_cache.py
+PAGE_CACHE_GROUPS = [
+    (Report, 'reports'),
+    (Resource, 'resources'),
+    (TreePlanting, 'plantings'),
+    (County, 'species'),
+    (Species, 'species'),
+    (CountySpecies, 'species'),
+]
+
+def invalidate_page_cache(sender, raw=False, **kwargs):
+    """Bump the cache generation of the group the changed model belongs to"""
+    if raw:
+        return
+    from .page_cache import bump
+    for model, group in PAGE_CACHE_GROUPS:
+        if sender is model:
+            bump(group)
+
+for model, _group in PAGE_CACHE_GROUPS:
+    post_save.connect(invalidate_page_cache, sender=model, dispatch_uid=f'page_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_page_cache, sender=model, dispatch_uid=f'page_cache_delete_{model.__name__}')
@@ -0,0 +1,32 @@
+from django import template
+from App.page_cache import get_or_build
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, groups):
+        self.nodelist = nodelist
+        self.name = name
+        self.groups = groups
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        groups = [group.strip() for group in self.groups.resolve(context).split(',')]
+        return get_or_build(f"fragment:{name}", groups, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Cache a template fragment until one of its model groups changes (or PAGE_CACHE_TTL passes)
+
+        {% load page_cache %}
+        {% cachedfragment "latest_reports" "reports" %} ... {% endcachedfragment %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and a comma-separated list of groups")
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
@@ -1,3 +1,342 @@
-from django.test import TestCase
+import csv
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .models import CommandCheckpoint, County, CountyEnvironment, ExportJob, LLMResponse, OutboundEmail, CountySpecies, PlanterTally, PlaybookScore, Profile, Report, Species, TreePlanting
+from . import email_outbox, export_jobs, llm_cache, mistral_ai
+from .exports import iter_id_chunks, report_queryset
+from .llm_jobs import LLM_JOB_EXPIRY_SECONDS, LLM_JOB_POLL_INTERVAL
+from .platform_stats import compute_counters, get_counters, plantings_reassigned
+from .playbook import get_playbook_entry
+from .weather_service import CircuitBreaker
 
-# Create your tests here.
+# Plain static storage, the manifest only exists after collectstatic
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=STORAGES)
+class ReportBulkStatusCacheTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.report = Report.objects.create(
+            title='Charcoal kilns by the river', description='Several kilns', location_name='Kakamega',
+        )
+
+    def test_approve_action_refreshes_cached_latest_reports(self):
+        url = reverse('latest_reports')
+        self.assertNotContains(self.client.get(url), self.report.title)  # caches the fragment
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:App_report_changelist'), {
+            'action': 'approve_alerts',
+            '_selected_action': [self.report.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.status, 'verified')
+
+        self.assertContains(self.client.get(url), self.report.title)
+
+
+class PlaybookScoreSignalTests(TestCase):
+    def setUp(self):
+        self.county = County.objects.create(name='Nyeri', latitude=-0.42, longitude=36.95)
+        self.environment = CountyEnvironment.objects.create(
+            county=self.county, rainfall_mm_min=800, rainfall_mm_max=1600, temperature_c_min=12,
+            temperature_c_max=24, soil_type='Volcanic', altitude_m_min=1600, altitude_m_max=2200,
+            soil_ph_min=5.5, soil_ph_max=6.5, climate_zone='Highland', best_season='March-May',
+        )
+        self.species = Species.objects.create(name='Grevillea')
+        self.county_species = CountySpecies.objects.create(
+            county=self.county, species=self.species, survival_rate=80, seasonal_performance={'March-May': 5},
+        )
+
+    def test_deleting_a_populated_county_cascades(self):
+        self.assertTrue(PlaybookScore.objects.filter(county_species=self.county_species).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.county.delete()
+        self.assertFalse(CountySpecies.objects.exists())
+        self.assertFalse(PlaybookScore.objects.exists())
+
+    def test_deleting_an_environment_rescores_the_county(self):
+        before = PlaybookScore.objects.get(county_species=self.county_species).season_scores
+        with self.captureOnCommitCallbacks(execute=True):
+            self.environment.delete()
+        after = PlaybookScore.objects.get(county_species=self.county_species).season_scores
+        self.assertNotEqual(before, after)
+
+    def test_missing_scores_are_computed_without_saving(self):
+        PlaybookScore.objects.all().delete()
+        entry = get_playbook_entry('Nyeri', 'Grevillea')
+        self.assertIsNone(entry.pk)
+        self.assertIn('March-May', entry.season_scores)
+        self.assertFalse(PlaybookScore.objects.exists())
+
+
+class ProfileTreeStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planter', 'planter@example.com', 'password')
+
+    def test_verifying_a_planting_keeps_the_counter_through_award_tree_points(self):
+        profile = Profile.objects.get(user=self.user)  # loaded before the counter moves
+        planting = TreePlanting.objects.create(planter=self.user, location_name='Nyeri', number_of_trees=12)
+        planting.planter = User.objects.get(pk=self.user.pk)
+        planting.planter.profile = profile
+        planting.status = 'verified'
+        planting.save()
+        self.assertTrue(planting.award_tree_points())
+
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.verified_tree_count, 12)
+        self.assertEqual(profile.tree_points, 12)
+
+    def test_save_reinserts_a_deleted_profile(self):
+        profile = Profile.objects.get(user=self.user)
+        Profile.objects.filter(pk=profile.pk).delete()
+        profile.save()
+        self.assertTrue(Profile.objects.filter(pk=profile.pk).exists())
+
+
+class PlatformCounterTests(TestCase):
+    def assertNoDrift(self):
+        self.assertEqual(get_counters(), compute_counters())
+
+    def test_counters_follow_saves_reassignments_and_cascades(self):
+        user = User.objects.create_user('planter', 'planter@example.com', 'password')
+        TreePlanting.objects.create(planter=user, location_name='Nyeri', number_of_trees=4, status='verified')
+        TreePlanting.objects.create(planter=user, location_name='Nyeri', number_of_trees=6)
+        unregistered = TreePlanting.objects.create(location_name='Meru', number_of_trees=3)
+        Report.objects.create(title='Logging', description='Trucks at night', location_name='Meru')
+        self.assertNoDrift()
+        self.assertEqual(get_counters()['planters'], 2)
+
+        # Linking the unregistered planting on sign-up, as UseRegisterView does
+        linked = TreePlanting.objects.filter(pk=unregistered.pk).update(planter=user)
+        plantings_reassigned(None, user.pk, linked)
+        self.assertNoDrift()
+        self.assertFalse(PlanterTally.objects.filter(planter_pk=0, plantings__gt=0).exists())
+
+        user.delete()
+        self.assertNoDrift()
+        self.assertEqual(get_counters()['planters'], 0)
+
+
+@override_settings(STORAGES=STORAGES)
+class SendRewardEmailsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planter', 'planter@example.com', 'password')
+        self.plantings = [
+            TreePlanting.objects.create(planter=self.user, location_name='Nyeri', number_of_trees=n, status='verified')
+            for n in (5, 10, 20)
+        ]
+
+    def queued_keys(self):
+        return set(OutboundEmail.objects.values_list('dedupe_key', flat=True))
+
+    def test_interrupted_run_resumes_after_the_checkpoint(self):
+        CommandCheckpoint.objects.create(name='send_reward_emails', position=self.plantings[0].pk)
+        call_command('send_reward_emails', '--queue-only', '--chunk-size', '1', stdout=StringIO())
+        self.assertEqual(self.queued_keys(), {f'tree_verified:{planting.pk}' for planting in self.plantings[1:]})
+        self.assertFalse(CommandCheckpoint.objects.exists())
+
+    def test_restart_ignores_the_checkpoint(self):
+        CommandCheckpoint.objects.create(name='send_reward_emails', position=self.plantings[-1].pk)
+        call_command('send_reward_emails', '--queue-only', '--restart', stdout=StringIO())
+        self.assertEqual(self.queued_keys(), {f'tree_verified:{planting.pk}' for planting in self.plantings})
+
+
+@override_settings(STORAGES=STORAGES)
+class TreePredictionPageTests(TestCase):
+    def test_explanation_polling_uses_the_configured_interval(self):
+        response = self.client.get(reverse('tree_prediction'))
+        attempts = -(-LLM_JOB_EXPIRY_SECONDS // LLM_JOB_POLL_INTERVAL) + 1
+        self.assertContains(response, f"if(++attempts < {int(attempts)}) setTimeout(poll, {int(LLM_JOB_POLL_INTERVAL * 1000)});")
+
+
+class LLMCacheTests(TestCase):
+    context = {
+        'species': 'Grevillea', 'county': 'Nyeri', 'season': 'March-May',
+        'survival_rate': 72.4, 'risk_level': 'Medium', 'reason': 'Suited to the highlands',
+    }
+
+    def test_prompt_shows_the_bucketed_range_not_the_exact_rate(self):
+        reply = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='Grows well.'))])
+        with mock.patch.object(mistral_ai, '_chat', return_value=reply) as chat:
+            mistral_ai._request_tree_explanation(mistral_ai._explanation_inputs(self.context))
+        prompt = chat.call_args[0][0][0].content
+        self.assertIn('Survival Rate: 70-75%', prompt)
+        self.assertNotIn('72', prompt)
+
+    def test_eviction_runs_every_few_stores(self):
+        with mock.patch.object(llm_cache, 'LLM_CACHE_EVICT_EVERY', 3), \
+                mock.patch.object(llm_cache, 'LLM_CACHE_MAX_ENTRIES', 1), \
+                mock.patch.object(llm_cache, '_stores_since_evict', 0), \
+                mock.patch.object(llm_cache, 'evict', wraps=llm_cache.evict) as evict:
+            for n in range(2):
+                llm_cache.store('explanation', {'n': n}, f'response {n}')
+            evict.assert_not_called()
+            self.assertEqual(LLMResponse.objects.count(), 2)
+
+            llm_cache.store('explanation', {'n': 2}, 'response 2')
+            evict.assert_called_once()
+            self.assertEqual(LLMResponse.objects.count(), 1)
+
+
+@override_settings(STORAGES=STORAGES)
+class ReportExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('exporter', 'exporter@example.com', 'password')
+        self.reports = {}
+        for title, status, day in [('Old', 'new', 1), ('Checked', 'verified', 10), ('Done', 'resolved', 20)]:
+            report = Report.objects.create(title=title, description='-', location_name='Embu', status=status)
+            Report.objects.filter(pk=report.pk).update(timestamp=timezone.make_aware(datetime(2024, 3, day, 12)))
+            self.reports[title] = report
+
+    def titles(self, params):
+        return {report.title for report in report_queryset(params)}
+
+    def test_filters_by_status_and_inclusive_dates(self):
+        self.assertEqual(self.titles({'status': 'new,resolved'}), {'Old', 'Done'})
+        self.assertEqual(self.titles({'start': '2024-03-10', 'end': '2024-03-20'}), {'Checked', 'Done'})
+        self.assertEqual(self.titles({'end': '2024-03-10', 'status': 'verified'}), {'Checked'})
+
+    def test_rejects_unknown_status_and_bad_dates(self):
+        with self.assertRaises(ValueError):
+            report_queryset({'status': 'new,lost'})
+        with self.assertRaises(ValueError):
+            report_queryset({'start': '10/03/2024'})
+
+    def test_view_streams_filtered_csv(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_reports'), {'status': 'verified'})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row[0] for row in rows[1:]], ['Checked'])
+
+        response = self.client.get(reverse('export_reports'), {'status': 'lost'})
+        self.assertEqual(response.status_code, 400)
+
+
+@mock.patch('App.export_jobs.connection')
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_root, ignore_errors=True)
+        patcher = mock.patch.object(export_jobs, 'EXPORT_ROOT', self.export_root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_reports(self, *titles):
+        return [Report.objects.create(title=title, description='-', location_name='Kitui') for title in titles]
+
+    def run_job(self, **kwargs):
+        job = export_jobs.create_export_job('reports', **kwargs)
+        export_jobs.run_export_job(job.pk)
+        job.refresh_from_db()
+        with gzip.open(export_jobs.export_path(job), 'rt', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        return job, rows
+
+    def test_chunks_cover_ids_after_since_id_up_to_until_id(self, connection):
+        reports = self.add_reports('a', 'b', 'c', 'd')
+        chunks = list(iter_id_chunks('reports', since_id=reports[0].pk, until_id=reports[2].pk, chunk_size=1))
+        self.assertEqual([[row[0] for row in chunk] for chunk in chunks], [[reports[1].pk], [reports[2].pk]])
+
+    def test_incremental_export_starts_after_the_last_completed_one(self, connection):
+        first = self.add_reports('a', 'b')
+        job, rows = self.run_job()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.since_id, job.last_id, job.row_count), (0, first[-1].pk, 2))
+        self.assertEqual([row['title'] for row in rows], ['a', 'b'])
+
+        second = self.add_reports('c')
+        job, rows = self.run_job(incremental=True)
+        self.assertEqual((job.since_id, job.last_id, job.row_count), (first[-1].pk, second[-1].pk, 1))
+        self.assertEqual([row['title'] for row in rows], ['c'])
+
+        # Nothing new: the checkpoint stays put and the file only has a header
+        job, rows = self.run_job(incremental=True)
+        self.assertEqual((job.since_id, job.last_id, job.row_count), (second[-1].pk, second[-1].pk, 0))
+        self.assertEqual(rows, [])
+
+    def test_failed_jobs_do_not_move_the_checkpoint(self, connection):
+        self.add_reports('a')
+        job = export_jobs.create_export_job('reports')
+        with mock.patch.object(export_jobs, 'write_csv_gz', side_effect=OSError('disk full')):
+            export_jobs.run_export_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'disk full'))
+        self.assertEqual(export_jobs.last_exported_id('reports'), 0)
+        self.assertEqual(os.listdir(self.export_root), [])
+
+
+class EmailOutboxTests(TestCase):
+    def queue(self, to=('a@example.com',), **fields):
+        return OutboundEmail.objects.create(subject='Hi', body='Hello', from_email='noreply@example.com', to=list(to), **fields)
+
+    def test_claims_due_and_stale_messages_only(self):
+        due = self.queue()
+        later = self.queue()
+        OutboundEmail.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        stale = self.queue(status='sending', claimed_at=timezone.now() - timedelta(seconds=email_outbox.EMAIL_OUTBOX_CLAIM_TIMEOUT + 1))
+        self.queue(status='sending', claimed_at=timezone.now())
+
+        self.assertEqual({email.pk for email in email_outbox.claim_batch()}, {due.pk, stale.pk})
+        self.assertEqual(OutboundEmail.objects.get(pk=due.pk).status, 'sending')
+        self.assertEqual(email_outbox.claim_batch(), [])
+
+    def test_failures_back_off_then_give_up(self):
+        email = self.queue(attempts=email_outbox.EMAIL_OUTBOX_MAX_ATTEMPTS - 2)
+        email_outbox.record_failure(email, 'timed out')
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(email_outbox.claim_batch(), [])
+
+        email_outbox.record_failure(email, 'timed out again')
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('failed', email_outbox.EMAIL_OUTBOX_MAX_ATTEMPTS, 'timed out again'))
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_drain_sends_and_marks_messages(self):
+        email = self.queue()
+        self.queue(to=[])
+        self.assertEqual(email_outbox.drain(), (1, 2))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sent', 1))
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {'sent', 'failed'})
+
+
+@mock.patch('App.weather_service.time')
+class CircuitBreakerTests(TestCase):
+    def test_opens_after_threshold_and_half_opens_after_cooldown(self, clock):
+        clock.time.return_value = 1000
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        clock.time.return_value = 1061
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # Only one trial call at a time
+
+        breaker.record_failure()  # Failed trial reopens for a full cooldown
+        self.assertFalse(breaker.allow())
+        clock.time.return_value = 1122
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
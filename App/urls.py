@@ -10,7 +10,7 @@ from .views import CustomPasswordResetView
 from .views import request_verification  
 # from .forms import CustomLoginForm
 from django.contrib.auth.views import LoginView
-from .views_ml import predict_tree_survival, get_species_recommendations, detect_county_api
+from .views_ml import predict_tree_survival, get_species_recommendations, detect_county_api, prediction_explanation
 
 
 from .views import(HomeView,   UserLogoutView, ResourceListView, ResourceCreateView,
@@ -44,6 +44,9 @@ urlpatterns = [
     path('approved-reports/', ApprovedReportListView.as_view(), name='approved_reports'),
     path('approved-contributes/', ApprovedContributeListView.as_view(), name='approved_contributes'),
     path('organization-dashboard/', OrganizationDashboardView.as_view(), name='organization_dashboard'),
+    path('organization-dashboard/reports/', views.organization_dashboard_reports, name='organization_dashboard_reports'),
+    path('organization-dashboard/trees/', views.organization_dashboard_trees, name='organization_dashboard_trees'),
+    path('organization-dashboard/markers/<str:kind>/', views.organization_dashboard_markers, name='organization_dashboard_markers'),
     path('update-report-status/<int:report_id>/', update_report_status, name='update_report_status'),
     path('update-tree-status/<int:tree_id>/', views.update_tree_status, name='update_tree_status'),
     
@@ -86,16 +89,19 @@ urlpatterns = [
     # Export URLs
     path('export/reports/', views.export_reports, name='export_reports'),
     path('export/tree-data/', views.export_tree_data, name='export_tree_data'),
+    path('export/jobs/', views.export_jobs, name='export_jobs'),
+    path('export/jobs/<uuid:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<uuid:job_id>/download/', views.export_job_download, name='export_job_download'),
     
     # ML Prediction APIs
     path('api/predict-tree-survival/', predict_tree_survival, name='predict_tree_survival'),
     path('predict-tree-survival/', predict_tree_survival, name='predict_tree_survival_public'),
+    path('api/prediction-explanation/<uuid:job_id>/', prediction_explanation, name='prediction_explanation'),
     path('api/species-recommendations/', get_species_recommendations, name='species_recommendations'),
     # path('api/climate-data/', get_climate_data, name='get_climate_data'),
     # path('api/get-location-data/', get_location_data, name='get_location_data'),
      path('api/get-species-recommendations/', get_species_recommendations, name='get_species_recommendations'),
     path('api/predict-tree-survival/', predict_tree_survival, name='predict_tree_survival'),
-    path('api/detect-soil/', views.detect_soil_api, name='detect_soil_api'),
     path('api/detect-county/', detect_county_api, name='detect_county_api'),
     path('tree-prediction/', views.TreePredictionView.as_view(), name='tree_prediction'),
     path('welcome/', TemplateView.as_view(template_name='App/welcome.html'), name='welcome'),
@@ -1,4 +1,11 @@
 import math
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def haversine(lat1, lon1, lat2, lon2):
     """Calculate distance between two GPS coordinates"""
@@ -15,15 +22,88 @@ def haversine(lat1, lon1, lat2, lon2):
     
     return 2 * R * math.asin(math.sqrt(a))
 
+class CountyIndex:
+    """
+    In-memory index of county centroids for nearest-county lookups
+
+    Built on first use and dropped by the County signals. Other worker
+    processes pick up changes after max_age seconds.
+    """
+
+    def __init__(self, max_age=600, chunk_size=10000):
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._data = None
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+    def _load(self):
+        with self._lock:
+            if self._data is None or time.time() - self._data['built_at'] > self.max_age:
+                from .models import County
+                rows = list(County.objects.order_by('pk').values_list('name', 'latitude', 'longitude'))
+                data = {'names': [row[0] for row in rows], 'coords': [(row[1], row[2]) for row in rows], 'built_at': time.time()}
+                if np is not None:
+                    radians = np.radians(np.array(data['coords'], dtype=float).reshape(-1, 2))
+                    data['lat'] = radians[:, 0]
+                    data['lon'] = radians[:, 1]
+                    data['cos_lat'] = np.cos(radians[:, 0])
+                self._data = data
+            return self._data
+
+    def nearest(self, lat, lon):
+        """Return the name of the county whose centroid is closest to a point"""
+        return self.nearest_many([(lat, lon)])[0]
+
+    def nearest_many(self, points):
+        """Return the nearest county name for each (lat, lon) in points, in order"""
+        data = self._load()
+        if not data['names']:
+            raise ValueError("No counties loaded")
+        points = [(float(lat), float(lon)) for lat, lon in points]
+        if not points:
+            return []
+
+        if np is None:
+            return [
+                data['names'][min(
+                    range(len(data['coords'])),
+                    key=lambda i: haversine(lat, lon, data['coords'][i][0], data['coords'][i][1])
+                )]
+                for lat, lon in points
+            ]
+
+        names = data['names']
+        results = []
+        # Chunked so a large batch never builds a points x counties matrix that is too big
+        for start in range(0, len(points), self.chunk_size):
+            chunk = np.radians(np.array(points[start:start + self.chunk_size], dtype=float))
+            lat = chunk[:, 0:1]
+            lon = chunk[:, 1:2]
+            # The haversine term is monotonic in distance, so the arcsin can be skipped
+            a = (
+                np.sin((data['lat'] - lat) / 2) ** 2 +
+                np.cos(lat) * data['cos_lat'] * np.sin((data['lon'] - lon) / 2) ** 2
+            )
+            results.extend(names[i] for i in a.argmin(axis=1))
+        return results
+
+
+_COUNTY_INDEX = CountyIndex()
+
+def invalidate_county_index():
+    _COUNTY_INDEX.invalidate()
+
 def detect_nearest_county(lat, lon):
     """Find nearest county based on GPS coordinates"""
-    from .models import County
-    counties = County.objects.all()
-    nearest = min(
-        counties,
-        key=lambda c: haversine(lat, lon, c.latitude, c.longitude)
-    )
-    return nearest.name
+    return _COUNTY_INDEX.nearest(lat, lon)
+
+def detect_nearest_counties(points):
+    """Find the nearest county for many (lat, lon) points in one pass"""
+    return _COUNTY_INDEX.nearest_many(points)
 
 def get_confidence_label(has_weather, used_ml):
     """Calculate confidence level based on data sources used"""
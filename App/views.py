@@ -7,6 +7,15 @@ from django.contrib.auth.models import User
 from django.urls import reverse_lazy, reverse
 from django.utils.safestring import mark_safe
 from .models import Profile, Resource, EmergencyContact, Report, ResourceRequest, ForumPost, Comment, TreePlanting, TreePrediction
+from .platform_stats import get_counters, plantings_reassigned
+from .profile_stats import refresh as refresh_profile_stats
+from .page_cache import bump as bump_page_cache
+from .email_outbox import queue_email
+from .media_pipeline import stage_upload
+from .notifications import (
+    planting_badge, report_submitted_email, tree_verified_email, unregistered_reward_email,
+    tree_planting_verification_email,
+)
 # Keep Alert as alias for backward compatibility
 Alert = Report
 from .forms import UserRegistrationForm,  ResourceForm, ReportForm, ProfileForm,  ResourceRequestForm, ForumPostForm,  FormComment, EditProfileForm, PasswordChangingForm
@@ -26,12 +35,14 @@ from django.views.decorators.http import require_POST
 from .forms import UserForm, ProfileForm
 from django.utils import timezone
 import os
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse
+from django.contrib.admin.views.decorators import staff_member_required
 import csv
 from datetime import datetime
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
+import math
 import logging
 from django.contrib.auth.models import User
 from .models import Profile  # Assuming Profile model is in the same app
@@ -71,9 +82,9 @@ class HomeView(TemplateView):
         context['resources'] = Resource.objects.all()
         
         # Tree planting stats for homepage
-        plantings = TreePlanting.objects.all()
-        context['total_trees'] = sum(p.number_of_trees for p in plantings)
-        context['total_planters'] = plantings.values('planter').distinct().count()
+        stats = get_counters()
+        context['total_trees'] = stats['trees_planted']
+        context['total_planters'] = stats['planters']
         
         if self.request.user.is_authenticated:
             try:
@@ -291,29 +302,27 @@ class ReportCreateView(CreateView):
             if self.request.user.is_authenticated:
                 report.reporter = self.request.user
             report.status = 'new'
+            # The image is processed and uploaded in the background
+            report.image = None
             report.save()
             print(f"Report saved successfully: {report.id}")
             
             # Handle file upload only if a valid file is provided
-            if 'image' in self.request.FILES:
-                uploaded_file = self.request.FILES['image']
-                if uploaded_file and uploaded_file.size > 0:
-                    try:
-                        report.image = uploaded_file
-                        report.save()
-                        print(f"Image uploaded successfully: {uploaded_file.name}, size: {uploaded_file.size}")
-                    except Exception as img_error:
-                        print(f"Image upload failed: {img_error}")
-                        # Continue without image
-                else:
-                    print(f"No valid file provided, continuing without image")
+            uploaded_file = self.request.FILES.get('image')
+            if uploaded_file and uploaded_file.size > 0:
+                try:
+                    stage_upload(report, 'image', uploaded_file)
+                    print(f"Image staged for processing: {uploaded_file.name}, size: {uploaded_file.size}")
+                except Exception as img_error:
+                    print(f"Image staging failed: {img_error}")
+                    # Continue without image
             else:
                 print(f"No image file in request, continuing without image")
             
             # Send email notification only once
             try:
                 self.send_submission_email(report)
-                print(f"Email sent successfully")
+                print(f"Email queued successfully")
             except Exception as e:
                 print(f"Email sending failed: {e}")
                 # Continue even if email fails
@@ -340,68 +349,7 @@ class ReportCreateView(CreateView):
     def send_submission_email(self, report):
         try:
             dashboard_url = self.request.build_absolute_uri(reverse('home'))
-            
-            # Use the styled HTML email template
-            html_message = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 0; padding: 0; background-color: #f0fdf4; }}
-                    .container {{ max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; overflow: hidden; }}
-                    .header {{ background: linear-gradient(135deg, #22c55e 0%, #16a34a 100%); color: white; padding: 30px; text-align: center; }}
-                    .content {{ padding: 30px; }}
-                    .footer {{ background-color: #f8fafc; padding: 20px; text-align: center; color: #6b7280; font-size: 12px; }}
-                    .btn {{ background-color: #22c55e; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 20px 0; }}
-                    .details {{ background-color: #f0fdf4; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #22c55e; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>🌱 MsituGuard</h1>
-                        <h2>Report Submitted Successfully</h2>
-                        <p>Thank you for protecting our environment!</p>
-                    </div>
-                    <div class="content">
-                        <h3>Hello {report.reporter.first_name or report.reporter.username},</h3>
-                        <p>Thank you for submitting your environmental report <strong>"{report.title}"</strong>.</p>
-                        
-                        <p>Our team will investigate and verify this issue. You will receive email updates when the status changes.</p>
-                        
-                        <div class="details">
-                            <h4>📄 Report Details:</h4>
-                            <p><strong>Type:</strong> {report.get_report_type_display()}</p>
-                            <p><strong>Location:</strong> {report.location_name}</p>
-                            <p><strong>Status:</strong> Under Review</p>
-                        </div>
-                        
-                        <div style="text-align: center;">
-                            <a href="{dashboard_url}" class="btn">Track Your Report Progress</a>
-                        </div>
-                        
-                        <p>Thank you for being an environmental guardian! 🌿</p>
-                        
-                        <p>Best regards,<br><strong>MsituGuard Team</strong></p>
-                    </div>
-                    <div class="footer">
-                        <p>© 2024 MsituGuard - Environmental Protection Platform</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            msg = EmailMultiAlternatives(
-                subject='🌱 Report Submitted Successfully',
-                body=f'Hello {report.reporter.username},\n\nThank you for submitting "{report.title}". Track progress: {dashboard_url}',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[report.reporter.email]
-            )
-            msg.attach_alternative(html_message, "text/html")
-            msg.send(fail_silently=False)
-            
+            queue_email(**report_submitted_email(report, dashboard_url))
         except Exception as e:
             print(f"Email sending failed: {e}")
             raise e
@@ -514,9 +462,13 @@ class UseRegisterView(generic.CreateView):
                 planter__isnull=True,
                 phoneNumber=user.profile.phoneNumber
             )
-            linked_count = linked_plantings.count()
+            linked_count = linked_plantings.update(planter=user)
             if linked_count > 0:
-                linked_plantings.update(planter=user)
+                # update() bypasses the counter signals: move the plantings from the
+                # unregistered tally to the user's and refresh the user's own stats
+                plantings_reassigned(None, user.pk, linked_count)
+                refresh_profile_stats(Profile.objects.filter(user=user))
+                bump_page_cache('plantings')
                 messages.success(self.request, f"Registration successful! We've linked {linked_count} of your previous tree plantings to your account.")
             else:
                 messages.success(self.request, "Registration successful! Welcome to MsituGuard.")
@@ -668,6 +620,12 @@ class ApprovedContributeListView(ListView):
         # logger.debug(f'Approved resources retrieved: {approved_contributes}')  # Log the alerts
         return approved_contributes
 
+def can_view_organization_dashboard(user):
+    """Admins and organization accounts"""
+    return user.is_authenticated and (
+        user.is_superuser or (hasattr(user, 'profile') and user.profile.account_type == 'organization')
+    )
+
 class OrganizationDashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'App/organization_dashboard.html'
     login_url = 'login'
@@ -676,12 +634,8 @@ class OrganizationDashboardView(LoginRequiredMixin, TemplateView):
         if not request.user.is_authenticated:
             return redirect('login')
         
-        # Check if user is admin or organization
-        if request.user.is_superuser:
-            # Admin can access
-            return super().dispatch(request, *args, **kwargs)
-        elif hasattr(request.user, 'profile') and request.user.profile.account_type == 'organization':
-            # Organization can access
+        # Only admins and organizations can access
+        if can_view_organization_dashboard(request.user):
             return super().dispatch(request, *args, **kwargs)
         else:
             # Regular users cannot access
@@ -689,94 +643,80 @@ class OrganizationDashboardView(LoginRequiredMixin, TemplateView):
             return redirect('home')
     
     def get_context_data(self, **kwargs):
+        """Headline figures and the first page of reports; the other panels load from JSON endpoints"""
+        from .org_dashboard import report_page
         context = super().get_context_data(**kwargs)
-        reports = Report.objects.all().order_by('-timestamp')
+        stats = get_counters()
         
         # Stats for dashboard
-        context['new_count'] = reports.filter(status='new').count()
-        context['verified_count'] = reports.filter(status='verified').count()
-        context['resolved_count'] = reports.filter(status='resolved').count()
-        context['total_count'] = reports.count()
-        context['reports'] = reports
+        context['new_count'] = stats['reports_new']
+        context['verified_count'] = stats['reports_verified']
+        context['resolved_count'] = stats['reports_resolved']
+        context['total_count'] = stats['reports_total']
+        context['reports'], context['reports_next'] = report_page()
         
         # Tree planting data
-        tree_plantings = TreePlanting.objects.all().order_by('-planted_date')
-        context['tree_plantings'] = tree_plantings
-        context['total_trees_planted'] = sum(p.number_of_trees for p in tree_plantings)
-        context['total_tree_planters'] = tree_plantings.values('planter').distinct().count()
-        context['verified_tree_plantings'] = tree_plantings.filter(status='verified').count()
+        context['total_trees_planted'] = stats['trees_planted']
+        context['total_tree_planters'] = stats['planters']
+        context['verified_tree_plantings'] = stats['verified_plantings']
         
         # Tree Registration data from treeregistration app
         try:
-            from treeregistration.models import Tree, UserProfile
-            
-            # All registered trees
-            registered_trees = Tree.objects.all().order_by('-uploaded_at')
-            context['registered_trees'] = registered_trees
-            context['total_registered_trees'] = registered_trees.count()
-            
-            # All user profiles with tree counts
-            user_profiles = UserProfile.objects.all().order_by('-tree_count')
-            context['user_profiles'] = user_profiles
-            context['total_tree_users'] = user_profiles.count()
-            
-            # Organization-specific data
-            org_profiles = user_profiles.filter(user_type='organisation')
-            individual_profiles = user_profiles.filter(user_type='individual')
-            
-            context['org_tree_users'] = org_profiles.count()
-            context['individual_tree_users'] = individual_profiles.count()
-            
-            # Organization-specific registered trees
-            org_registered_trees = registered_trees.filter(user__treeregistration_profile__user_type='organisation')
-            individual_registered_trees = registered_trees.filter(user__treeregistration_profile__user_type='individual')
-            
-            context['org_registered_trees'] = org_registered_trees
-            context['individual_registered_trees'] = individual_registered_trees
-            context['org_registered_trees_count'] = org_registered_trees.count()
-            context['individual_registered_trees_count'] = individual_registered_trees.count()
-            
-            # Badge statistics for all users
-            context['diamond_users'] = user_profiles.filter(badge='Diamond').count()
-            context['gold_users'] = user_profiles.filter(badge='Gold').count()
-            context['silver_users'] = user_profiles.filter(badge='Silver').count()
-            context['bronze_users'] = user_profiles.filter(badge='Bronze').count()
-            
-            # Organization badge statistics
-            context['org_diamond_users'] = org_profiles.filter(badge='Diamond').count()
-            context['org_gold_users'] = org_profiles.filter(badge='Gold').count()
-            context['org_silver_users'] = org_profiles.filter(badge='Silver').count()
-            context['org_bronze_users'] = org_profiles.filter(badge='Bronze').count()
-            
-            # Recent organization registrations
-            context['recent_org_trees'] = Tree.objects.filter(
-                user__treeregistration_profile__user_type='organisation'
-            ).order_by('-uploaded_at')[:6]
-            
+            from .org_dashboard import tree_registration_stats
+            context.update(tree_registration_stats())
         except ImportError:
             # If treeregistration app is not available
-            context['registered_trees'] = []
-            context['total_registered_trees'] = 0
-            context['user_profiles'] = []
-            context['total_tree_users'] = 0
-            context['org_tree_users'] = 0
-            context['individual_tree_users'] = 0
-            context['org_registered_trees'] = []
-            context['individual_registered_trees'] = []
-            context['org_registered_trees_count'] = 0
-            context['individual_registered_trees_count'] = 0
-            context['diamond_users'] = 0
-            context['gold_users'] = 0
-            context['silver_users'] = 0
-            context['bronze_users'] = 0
-            context['org_diamond_users'] = 0
-            context['org_gold_users'] = 0
-            context['org_silver_users'] = 0
-            context['org_bronze_users'] = 0
-            context['recent_org_trees'] = []
+            context.update(dict.fromkeys([
+                'total_registered_trees', 'total_tree_users', 'org_tree_users', 'individual_tree_users',
+                'org_registered_trees_count', 'individual_registered_trees_count',
+                'diamond_users', 'gold_users', 'silver_users', 'bronze_users',
+                'org_diamond_users', 'org_gold_users', 'org_silver_users', 'org_bronze_users',
+            ], 0))
         
         return context
 
+def _organization_dashboard_cards(request, page, template_name, name, **filters):
+    """A page of dashboard cards as rendered HTML plus the cursor for the next page"""
+    if not can_view_organization_dashboard(request.user):
+        return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+    from .org_dashboard import parse_cursor
+    try:
+        rows, next_cursor = page(after=parse_cursor(request.GET.get('after')), **filters)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    html = render_to_string(template_name, {name: rows}, request=request)
+    return JsonResponse({'success': True, 'html': html, 'next': next_cursor})
+
+def organization_dashboard_reports(request):
+    """GET ?after=<id>&status= returns the next page of report cards"""
+    from .org_dashboard import report_page
+    return _organization_dashboard_cards(
+        request, report_page, 'App/organization_report_cards.html', 'reports',
+        status=request.GET.get('status') or None,
+    )
+
+def organization_dashboard_trees(request):
+    """GET ?after=<id>&user_type= returns the next page of tree registration cards"""
+    from .org_dashboard import tree_page
+    return _organization_dashboard_cards(
+        request, tree_page, 'App/organization_tree_cards.html', 'trees',
+        user_type=request.GET.get('user_type') or None,
+    )
+
+def organization_dashboard_markers(request, kind):
+    """GET ?after=<id> returns the next page of report or planting map markers"""
+    if not can_view_organization_dashboard(request.user):
+        return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+    from .org_dashboard import parse_cursor, planting_markers, report_markers
+    markers = {'reports': report_markers, 'plantings': planting_markers}.get(kind)
+    if markers is None:
+        return JsonResponse({'success': False, 'error': f"Unknown marker kind '{kind}'"}, status=404)
+    try:
+        items, next_cursor = markers(after=parse_cursor(request.GET.get('after')))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'items': items, 'next': next_cursor})
+
 @csrf_exempt
 def update_report_status(request, report_id):
     if request.method == 'POST':
@@ -794,36 +734,6 @@ def update_report_status(request, report_id):
             return JsonResponse({'success': False, 'error': str(e)})
     return JsonResponse({'success': False})
 
-@csrf_exempt
-def detect_soil_api(request):
-    if request.method == 'POST':
-        try:
-            data = json.loads(request.body)
-            latitude = data.get('latitude')
-            longitude = data.get('longitude')
-            
-            if not latitude or not longitude:
-                return JsonResponse({'success': False, 'error': 'Latitude and longitude required'})
-            
-            # Use MISTRAL AI to detect soil type
-            soil_type = detect_soil_with_mistral(latitude, longitude)
-            
-            # Detect region and county
-            region, county = detect_region_county(latitude, longitude)
-            
-            return JsonResponse({
-                'success': True,
-                'soil_type': soil_type,
-                'region': region,
-                'county': county,
-                'coordinates': f"{latitude}, {longitude}"
-            })
-            
-        except Exception as e:
-            return JsonResponse({'success': False, 'error': str(e)})
-    
-    return JsonResponse({'success': False, 'error': 'POST method required'})
-
 @csrf_exempt
 def update_tree_status(request, tree_id):
     if request.method == 'POST':
@@ -859,20 +769,7 @@ def send_tree_verification_notification(tree_planting):
     try:
         print(f"Starting tree verification notification for: {tree_planting.title}")
         
-        # Calculate tree points
-        points_earned = tree_planting.number_of_trees
-        
-        # Determine badge based on tree count
-        if tree_planting.number_of_trees >= 50:
-            badge = "🌳 Forest Hero"
-        elif tree_planting.number_of_trees >= 20:
-            badge = "🌲 Tree Champion"
-        elif tree_planting.number_of_trees >= 10:
-            badge = "🌿 Green Warrior"
-        elif tree_planting.number_of_trees >= 5:
-            badge = "🌱 Eco Defender"
-        else:
-            badge = "🍃 Nature Friend"
+        badge = planting_badge(tree_planting.number_of_trees)
         
         # Add badge to user profile
         tree_planting.planter.profile.add_badge(badge)
@@ -882,103 +779,13 @@ def send_tree_verification_notification(tree_planting):
         if user_tree_count == 1:  # First verified tree planting
             tree_planting.planter.profile.add_badge("🌍 15 Billion Trees Initiative Participant")
         
-        print(f"Awarded {points_earned} tree points and badge to user")
-        
         # Get profile (should already exist)
         profile = tree_planting.planter.profile
-        print(f"Updated profile with tree points: {profile.tree_points}")
-        
-        # No notification creation for anonymous reporting
-        print("Tree planting verified, no notification created")
-        
-        # Send HTML email with rewards
-        html_message = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 0; background-color: #f0fdf4; }}
-                .container {{ max-width: 600px; margin: 0 auto; background-color: white; }}
-                .header {{ background: linear-gradient(135deg, #22c55e 0%, #16a34a 100%); color: white; padding: 30px; text-align: center; }}
-                .content {{ padding: 30px; }}
-                .footer {{ background-color: #f8fafc; padding: 20px; text-align: center; color: #6b7280; font-size: 12px; }}
-                .btn {{ background-color: #22c55e; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 20px 0; }}
-                .details {{ background-color: #f0fdf4; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #22c55e; }}
-                .rewards {{ background: linear-gradient(135deg, #fef3c7, #fbbf24); padding: 25px; border-radius: 15px; margin: 20px 0; text-align: center; }}
-                .reward-item {{ background: white; padding: 15px; border-radius: 10px; margin: 10px; display: inline-block; min-width: 120px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🌱 MsituGuard</h1>
-                    <h2>🎉 Tree Planting Verified!</h2>
-                    <p>Your environmental contribution has been officially verified</p>
-                </div>
-                <div class="content">
-                    <h3>Hello {tree_planting.planter.first_name or tree_planting.planter.username},</h3>
-                    <p>Great news! Your tree planting contribution has been verified by our local organization partners.</p>
-                    
-                    <div class="details">
-                        <h4>🌳 {tree_planting.title}</h4>
-                        <p><strong>Location:</strong> {tree_planting.location_name}</p>
-                        <p><strong>Trees Planted:</strong> {tree_planting.number_of_trees}</p>
-                        <p><strong>Tree Type:</strong> {tree_planting.get_tree_type_display()}</p>
-                        <p style="color: #22c55e; font-weight: bold;">✅ VERIFIED</p>
-                    </div>
-                    
-                    <div class="rewards">
-                        <h3 style="color: #92400e; margin-top: 0;">🎉 Congratulations! You've Earned Rewards!</h3>
-                        <div style="text-align: center;">
-                            <div class="reward-item">
-                                <div style="font-size: 24px; font-weight: bold; color: #22c55e;">{points_earned}</div>
-                                <div style="color: #6b7280; font-size: 14px;">Tree Points Earned</div>
-                            </div>
-                            <div class="reward-item">
-                                <div style="font-size: 18px; font-weight: bold; color: #f59e0b;">{badge}</div>
-                                <div style="color: #6b7280; font-size: 14px;">New Badge</div>
-                            </div>
-                        </div>
-                        <p style="color: #92400e; margin: 10px 0; font-weight: 600;">Your Rank: {profile.conservation_rank}</p>
-                    </div>
-                    
-                    <div style="background: linear-gradient(135deg, #f0f9ff, #e0f2fe); padding: 20px; border-radius: 10px; margin: 20px 0; text-align: center; border: 2px solid #0ea5e9;">
-                        <h4 style="color: #0c4a6e; margin-top: 0;">🏆 Certificate Earned!</h4>
-                        <p style="color: #0c4a6e; margin: 10px 0;">You've earned your official 15 Billion Trees Initiative Certificate! View it in your dashboard.</p>
-                    </div>
-                    
-                    <p>Your contribution to Kenya's 15 billion trees initiative is now officially recognized. Thank you for being an environmental guardian!</p>
-                    
-                    <div style="text-align: center;">
-                        <a href="http://127.0.0.1:8000/" class="btn">Visit MsituGuard</a>
-                    </div>
-                    
-                    <p style="margin-top: 30px;">Keep up the great work protecting our forests and environment. 🌿</p>
-                    
-                    <p>Best regards,<br><strong>MsituGuard Team</strong><br><em>Protecting Kenya's Environment Together</em></p>
-                </div>
-                <div class="footer">
-                    <p>© 2024 MsituGuard - Environmental Protection Platform</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        print(f"Awarded {tree_planting.number_of_trees} tree points and badge to user, profile now has {profile.tree_points}")
         
         print(f"Sending email to: {tree_planting.planter.email}")
-        print(f"User tree count: {user_tree_count}")
-        print(f"Is first time planter: {user_tree_count == 1}")
-        
-        msg = EmailMultiAlternatives(
-            subject='Tree Planting Verified - Points & Badge Earned! - MsituGuard',
-            body=f'Hello {tree_planting.planter.first_name},\n\nYour tree planting "{tree_planting.title}" has been verified! You earned {points_earned} tree points and the "{badge}" badge.',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[tree_planting.planter.email]
-        )
-        msg.attach_alternative(html_message, "text/html")
-        msg.send(fail_silently=False)  # Show email errors for debugging
-        print("Email sent successfully!")
+        queue_email(**tree_verified_email(tree_planting, profile.conservation_rank))
+        print("Email queued successfully!")
         
     except Exception as e:
         print(f"Tree verification notification failed: {e}")
@@ -988,20 +795,6 @@ def send_tree_verification_notification(tree_planting):
 
 def send_unregistered_reward_notification(tree_planting):
     try:
-        # Calculate rewards
-        points_earned = tree_planting.number_of_trees
-        
-        if tree_planting.number_of_trees >= 50:
-            badge = "🌳 Forest Hero"
-        elif tree_planting.number_of_trees >= 20:
-            badge = "🌲 Tree Champion"
-        elif tree_planting.number_of_trees >= 10:
-            badge = "🌿 Green Warrior"
-        elif tree_planting.number_of_trees >= 5:
-            badge = "🌱 Eco Defender"
-        else:
-            badge = "🍃 Nature Friend"
-        
         # Tokens are awarded by the award_tokens method when status changes to verified
         
         # Get email from phone number (find user with this phone)
@@ -1021,105 +814,8 @@ def send_unregistered_reward_notification(tree_planting):
             print(f"No profile found for phone: {tree_planting.phoneNumber}")
             return
         
-        register_url = "http://127.0.0.1:8000/register/"
-        
-        html_message = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 0; background-color: #f0fdf4; }}
-                .container {{ max-width: 600px; margin: 0 auto; background-color: white; }}
-                .header {{ background: linear-gradient(135deg, #22c55e 0%, #16a34a 100%); color: white; padding: 30px; text-align: center; }}
-                .content {{ padding: 30px; }}
-                .footer {{ background-color: #f8fafc; padding: 20px; text-align: center; color: #6b7280; font-size: 12px; }}
-                .btn {{ background-color: #22c55e; color: white; padding: 15px 30px; text-decoration: none; border-radius: 8px; display: inline-block; margin: 15px 10px; font-weight: bold; }}
-                .btn-secondary {{ background-color: #3b82f6; }}
-                .details {{ background-color: #f0fdf4; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #22c55e; }}
-                .rewards {{ background: linear-gradient(135deg, #fef3c7, #fbbf24); padding: 25px; border-radius: 15px; margin: 20px 0; text-align: center; }}
-                .reward-item {{ background: white; padding: 15px; border-radius: 10px; margin: 10px; display: inline-block; min-width: 120px; }}
-                .cta-section {{ background: linear-gradient(135deg, #eff6ff, #dbeafe); padding: 25px; border-radius: 15px; margin: 20px 0; text-align: center; border: 2px solid #3b82f6; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🌱 MsituGuard</h1>
-                    <h2>🎉 Tree Planting Verified!</h2>
-                    <p>Your environmental contribution has been officially verified</p>
-                </div>
-                <div class="content">
-                    <h3>Hello {name},</h3>
-                    <p>Great news! Your tree planting contribution has been verified by our local organization partners.</p>
-                    
-                    <div class="details">
-                        <h4>🌳 {tree_planting.title}</h4>
-                        <p><strong>Location:</strong> {tree_planting.location_name}</p>
-                        <p><strong>Trees Planted:</strong> {tree_planting.number_of_trees}</p>
-                        <p><strong>Tree Type:</strong> {tree_planting.get_tree_type_display()}</p>
-                        <p style="color: #22c55e; font-weight: bold;">✅ VERIFIED</p>
-                    </div>
-                    
-                    <div class="rewards">
-                        <h3 style="color: #92400e; margin-top: 0;">🎉 You've Earned Rewards!</h3>
-                        <div style="text-align: center;">
-                            <div class="reward-item">
-                                <div style="font-size: 24px; font-weight: bold; color: #22c55e;">{tokens_earned}</div>
-                                <div style="color: #6b7280; font-size: 14px;">Tokens Earned</div>
-                            </div>
-                            <div class="reward-item">
-                                <div style="font-size: 18px; font-weight: bold; color: #f59e0b;">{badge}</div>
-                                <div style="color: #6b7280; font-size: 14px;">Badge Earned</div>
-                            </div>
-                        </div>
-                        <p style="color: #92400e; margin: 10px 0; font-weight: 600;">Your rewards are waiting for you!</p>
-                    </div>
-                    
-                    <div class="cta-section">
-                        <h3 style="color: #1d4ed8; margin-top: 0;">🎆 Claim Your Complete Rewards!</h3>
-                        <p style="color: #1e40af; margin-bottom: 20px;">Create your free MsituGuard account to:</p>
-                        <ul style="text-align: left; color: #1e40af; max-width: 400px; margin: 0 auto;">
-                            <li>✅ View your complete reward dashboard</li>
-                            <li>🏆 Track your environmental impact</li>
-                            <li>🌳 Join Kenya's tree planting leaderboard</li>
-                            <li>📊 Submit more environmental reports</li>
-                            <li>🌟 Earn more badges and recognition</li>
-                        </ul>
-                        <div style="margin-top: 25px;">
-                            <a href="{register_url}" class="btn">Create Free Account & Claim Rewards</a>
-                        </div>
-                        <p style="color: #6b7280; font-size: 14px; margin-top: 15px;">Takes less than 2 minutes • No spam • Your rewards are waiting!</p>
-                    </div>
-                    
-                    <div style="background: linear-gradient(135deg, #f0f9ff, #e0f2fe); padding: 20px; border-radius: 10px; margin: 20px 0; text-align: center; border: 2px solid #0ea5e9;">
-                        <h4 style="color: #0c4a6e; margin-top: 0;">🏆 Certificate Available!</h4>
-                        <p style="color: #0c4a6e; margin: 10px 0;">You've earned an official 15 Billion Trees Initiative Certificate! Register to claim and download it.</p>
-                    </div>
-                    
-                    <p>Your contribution to Kenya's 15 billion trees initiative is now officially recognized. Thank you for being an environmental guardian!</p>
-                    
-                    <p style="margin-top: 30px;">Keep up the great work protecting our forests and environment. 🌿</p>
-                    
-                    <p>Best regards,<br><strong>MsituGuard Team</strong><br><em>Protecting Kenya's Environment Together</em></p>
-                </div>
-                <div class="footer">
-                    <p>© 2024 MsituGuard - Environmental Protection Platform</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        msg = EmailMultiAlternatives(
-            subject='Tree Planting Verified - Claim Your Rewards! - MsituGuard',
-            body=f'Hello {name},\n\nYour tree planting "{tree_planting.title}" has been verified! You earned {points_earned} tree points and the "{badge}" badge. Create your free account to claim your complete rewards: {register_url}',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[email]
-        )
-        msg.attach_alternative(html_message, "text/html")
-        msg.send(fail_silently=False)
-        print(f"Unregistered reward email sent to: {email}")
+        queue_email(**unregistered_reward_email(tree_planting, name, email))
+        print(f"Unregistered reward email queued for: {email}")
         
     except Exception as e:
         print(f"Unregistered reward notification failed: {e}")
@@ -1129,12 +825,12 @@ class TreeInitiativeView(TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        plantings = TreePlanting.objects.all()
+        stats = get_counters()
         
-        context['total_trees'] = sum(p.number_of_trees for p in plantings)
-        context['total_planters'] = plantings.values('planter').distinct().count()
-        context['verified_plantings'] = plantings.filter(status='verified').count()
-        context['recent_plantings'] = plantings.order_by('-planted_date')[:6]
+        context['total_trees'] = stats['trees_planted']
+        context['total_planters'] = stats['planters']
+        context['verified_plantings'] = stats['verified_plantings']
+        context['recent_plantings'] = TreePlanting.objects.order_by('-planted_date')[:6]
         
         return context
 
@@ -1159,7 +855,11 @@ class TreePlantingFormView(LoginRequiredMixin, CreateView):
         form.instance.planter = self.request.user
         form.instance.status = 'planned' if not form.instance.after_image else 'planted'
         form.instance.title = f'Tree Planting by {self.request.user.first_name or self.request.user.username}'
+        after_image = self.request.FILES.get('after_image')
+        form.instance.after_image = None
         self.object = form.save()
+        if after_image:
+            stage_upload(self.object, 'after_image', after_image)
         
         messages.success(self.request, f'Tree planting registered successfully! {self.object.number_of_trees} trees recorded.')
         return redirect('tree_planting_form')
@@ -1393,9 +1093,10 @@ def public_tree_planting(request):
                 description=description,
                 phoneNumber=phone_number,
                 status='planted' if after_image else 'planned',
-                before_image=before_image,
-                after_image=after_image
             )
+            for field_name, uploaded_file in (('before_image', before_image), ('after_image', after_image)):
+                if uploaded_file:
+                    stage_upload(tree_planting, field_name, uploaded_file)
             
             # Send verification email with password
             send_verification_email(user, request, temp_password if created else None)
@@ -1418,22 +1119,13 @@ def send_verification_email(user, request, temp_password=None):
             reverse('verify_tree_planting_account', kwargs={'uidb64': uid, 'token': token})
         )
         
-        html_message = render_to_string('App/emails/tree_planting_verification.html', {
-            'user': user,
-            'verification_url': verification_url,
-            'temp_password': temp_password,
-            'login_url': request.build_absolute_uri(reverse('login')),
-            'is_logged_in': request.user.is_authenticated,
-        })
-        
-        send_mail(
-            subject='Verify Your Tree Planting Account - MsituGuard',
-            message=f'Hello {user.first_name},\n\nThank you for contributing to Kenya\'s 15 billion trees initiative! Please verify your account: {verification_url}',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=True,
-        )
+        queue_email(**tree_planting_verification_email(
+            user,
+            verification_url,
+            temp_password,
+            login_url=request.build_absolute_uri(reverse('login')),
+            is_logged_in=request.user.is_authenticated,
+        ))
     except Exception as e:
         print(f"Verification email failed: {e}")
 
@@ -1465,50 +1157,77 @@ class PublicTreeFormView(TemplateView):
 
 
 
+def _stream_csv_export(request, filename_prefix, header, queryset_builder, row_builder):
+    """Stream a filtered export as CSV, one chunk of rows at a time"""
+    from .exports import iter_csv, iter_rows
+    try:
+        queryset = queryset_builder(request.GET)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400, content_type='text/plain')
+
+    response = StreamingHttpResponse(iter_csv(header, iter_rows(queryset, row_builder)), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename_prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    return response
+
 @login_required
 def export_reports(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="environmental_reports_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Title', 'Type', 'Location', 'Reporter', 'Status', 'Date', 'Description'])
-    
-    reports = Report.objects.all().order_by('-timestamp')
-    for report in reports:
-        writer.writerow([
-            report.title,
-            report.get_report_type_display(),
-            report.location_name,
-            report.reporter.username if report.reporter else 'N/A',
-            report.status,
-            report.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            report.description
-        ])
-    
-    return response
+    """Export reports as CSV, filtered by ?start=&end= (YYYY-MM-DD) and ?status="""
+    from .exports import REPORT_HEADER, report_queryset, report_row
+    return _stream_csv_export(request, 'environmental_reports', REPORT_HEADER, report_queryset, report_row)
 
 @login_required
 def export_tree_data(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="tree_plantings_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Title', 'Location', 'Tree Type', 'Number of Trees', 'Planter', 'Status', 'Date', 'Phone Number'])
-    
-    plantings = TreePlanting.objects.all().order_by('-planted_date')
-    for planting in plantings:
-        writer.writerow([
-            planting.title,
-            planting.location_name,
-            planting.get_tree_type_display(),
-            planting.number_of_trees,
-            planting.planter_display_name,
-            planting.status,
-            planting.planted_date.strftime('%Y-%m-%d'),
-            planting.phoneNumber
-        ])
-    
-    return response
+    """Export tree plantings as CSV, filtered by ?start=&end= (YYYY-MM-DD) and ?status="""
+    from .exports import PLANTING_HEADER, planting_queryset, planting_row
+    return _stream_csv_export(request, 'tree_plantings', PLANTING_HEADER, planting_queryset, planting_row)
+
+@staff_member_required
+def export_jobs(request):
+    """
+    GET lists recent bulk export jobs; POST queues one
+
+    POST fields: dataset (reports, plantings, predictions), format (csv.gz,
+    parquet, arrow), incremental=1 to start after the last completed export,
+    or since_id to start after a given id.
+    """
+    from .models import ExportJob
+    from .export_jobs import start_export_job, job_payload
+    if request.method == 'POST':
+        try:
+            since_id = request.POST.get('since_id')
+            job = start_export_job(
+                request.POST.get('dataset', ''),
+                request.POST.get('format', 'csv.gz'),
+                incremental=request.POST.get('incremental') in ('1', 'true', 'on'),
+                since_id=int(since_id) if since_id else None,
+                requested_by=request.user,
+            )
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        return JsonResponse(job_payload(job), status=202)
+
+    jobs = ExportJob.objects.all()[:20]
+    return JsonResponse({'success': True, 'jobs': [job_payload(job) for job in jobs]})
+
+@staff_member_required
+def export_job_status(request, job_id):
+    from .models import ExportJob
+    from .export_jobs import job_payload
+    job = ExportJob.objects.filter(pk=job_id).first()
+    if not job:
+        return JsonResponse({'success': False, 'error': 'Export job not found'}, status=404)
+    return JsonResponse(job_payload(job))
+
+@staff_member_required
+def export_job_download(request, job_id):
+    from .models import ExportJob
+    from .export_jobs import export_path
+    job = get_object_or_404(ExportJob, pk=job_id)
+    if job.status != 'done':
+        return JsonResponse({'success': False, 'error': f'Export is {job.status}'}, status=409)
+    if not os.path.exists(export_path(job)):
+        return JsonResponse({'success': False, 'error': 'Export file is no longer available'}, status=410)
+    return FileResponse(open(export_path(job), 'rb'), as_attachment=True, filename=job.file_path)
 
 
 
@@ -1539,6 +1258,11 @@ class TreePredictionView(TemplateView):
         # Add tree registration link (landing page with Individual/Organization choice)
         context['tree_registration_url'] = '/tree-registration/'
         
+        # The page polls for the LLM explanation until the job finishes or expires
+        from .llm_jobs import LLM_JOB_EXPIRY_SECONDS, LLM_JOB_POLL_INTERVAL
+        context['llm_job_poll_ms'] = int(LLM_JOB_POLL_INTERVAL * 1000)
+        context['llm_job_poll_attempts'] = math.ceil(LLM_JOB_EXPIRY_SECONDS / LLM_JOB_POLL_INTERVAL) + 1
+        
         return context
 
 class PlatformRevenueView(LoginRequiredMixin, TemplateView):
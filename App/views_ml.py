@@ -7,12 +7,48 @@ import re
 
 from App.models import County, CountySpecies, Species, TreePrediction
 from .ml_utils import tree_predictor  # your ML model loader
+from .playbook import get_playbook_entry, lookup_playbook_score, match_season_key
+from .page_cache import get_or_build
 
 
 # ============================================================
 # STEP 1–3: Get species recommendations + planting playbook
 # ============================================================
 
+def build_species_recommendations(county_name):
+    """Build the species recommendations payload for a county"""
+    county = County.objects.filter(name=county_name).first()
+    if not county:
+        return {
+            "success": False,
+            "error": "County not found",
+            "species": [],
+            "playbook": {}
+        }
+
+    county_species_qs = CountySpecies.objects.filter(
+        county=county
+    ).select_related('species')
+
+    species_list = [cs.species for cs in county_species_qs]
+
+    playbook = {}
+    for s in species_list:
+        playbook[s.name] = {
+            "planting_guide": s.planting_guide,
+            "best_month": s.best_season,
+            "soil": s.soil,
+            "rainfall_mm": s.rainfall,
+            "temperature_c": s.temperature,
+            "care_instructions": s.care_instructions,
+        }
+
+    return {
+        "success": True,
+        "species": [s.name for s in species_list],
+        "playbook": playbook
+    }
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def get_species_recommendations(request):
@@ -23,37 +59,12 @@ def get_species_recommendations(request):
         data = json.loads(request.body)
         county_name = data.get('county')
         
-        county = County.objects.filter(name=county_name).first()
-        if not county:
-            return JsonResponse({
-                "success": False,
-                "error": "County not found",
-                "species": [],
-                "playbook": {}
-            })
-
-        county_species_qs = CountySpecies.objects.filter(
-            county=county
-        ).select_related('species')
-
-        species_list = [cs.species for cs in county_species_qs]
-
-        playbook = {}
-        for s in species_list:
-            playbook[s.name] = {
-                "planting_guide": s.planting_guide,
-                "best_month": s.best_season,
-                "soil": s.soil,
-                "rainfall_mm": s.rainfall,
-                "temperature_c": s.temperature,
-                "care_instructions": s.care_instructions,
-            }
-
-        return JsonResponse({
-            "success": True,
-            "species": [s.name for s in species_list],
-            "playbook": playbook
-        })
+        payload = get_or_build(
+            'species_recommendations', ['species'],
+            lambda: build_species_recommendations(county_name),
+            parts=(county_name,)
+        )
+        return JsonResponse(payload)
 
     except Exception as e:
         return JsonResponse({
@@ -88,11 +99,9 @@ def predict_tree_survival(request):
         if not tree_species_name or not county_name or not planting_season:
             return JsonResponse({"success": False, "error": "Missing required fields"})
 
-        # Get county-species compatibility from database
+        # Get county-species compatibility from the precomputed playbook
         try:
-            county = County.objects.get(name=county_name)
-            species = Species.objects.get(name=tree_species_name)
-            county_species = CountySpecies.objects.get(county=county, species=species)
+            playbook_entry = get_playbook_entry(county_name, tree_species_name)
         except County.DoesNotExist:
             return JsonResponse({"success": False, "error": f"County '{county_name}' not found"})
         except Species.DoesNotExist:
@@ -100,27 +109,15 @@ def predict_tree_survival(request):
         except CountySpecies.DoesNotExist:
             return JsonResponse({"success": False, "error": f"'{tree_species_name}' is not recommended for '{county_name}'"})
 
-        # Get base survival rate from database
-        base_survival_rate = county_species.survival_rate
-        
-        # Check seasonal performance
-        seasonal_performance = county_species.seasonal_performance or {}
-        seasonal_bonus = 0
-        
-        # Find matching season
-        planting_season_lower = planting_season.lower().replace('–', '-').replace('—', '-')
-        
-        for season_key, bonus in seasonal_performance.items():
-            season_key_lower = season_key.lower().replace('–', '-').replace('—', '-')
-            
-            # Check if any part of the season matches
-            if any(month in planting_season_lower for month in ['march', 'april', 'may', 'june', 'july', 'august', 'september', 'sept', 'october', 'oct', 'november', 'december', 'dec'] if month in season_key_lower):
-                seasonal_bonus = bonus
-                break
+        county_species = playbook_entry.county_species
+        county = county_species.county
+        species = county_species.species
+
+        # Species, environment, seasonal and care adjustments are already applied
+        playbook_prediction, seasonal_bonus = lookup_playbook_score(playbook_entry, planting_season, care_level)
         
         # HYBRID APPROACH: Use ML Model + Playbook Enhancement
         ml_prediction = None
-        playbook_prediction = base_survival_rate
         
         # Step 1: Try ML Model first - Let ML handle weather internally
         try:
@@ -179,61 +176,7 @@ def predict_tree_survival(request):
             ml_used = False
             ml_prediction = None
         
-        # Step 2: Calculate Species-Specific Playbook prediction
-        playbook_prediction = base_survival_rate
-        
-        # SPECIES-SPECIFIC ADJUSTMENTS (This was missing!)
-        species_adjustments = {
-            'Pine': {'highland_bonus': 15, 'lowland_penalty': -20, 'optimal_temp': (10, 22)},
-            'Cypress': {'highland_bonus': 12, 'lowland_penalty': -18, 'optimal_temp': (12, 22)},
-            'Grevillea': {'highland_bonus': 8, 'lowland_penalty': -10, 'optimal_temp': (15, 28)},
-            'Neem': {'drought_bonus': 15, 'highland_penalty': -15, 'optimal_temp': (24, 34)},
-            'Indigenous Mix': {'adaptation_bonus': 10, 'optimal_temp': (12, 26)},
-            'Eucalyptus': {'versatile_bonus': 5, 'optimal_temp': (18, 32)}
-        }
-        
-        species_config = species_adjustments.get(tree_species_name, {})
-        
-        # Apply species-specific environmental matching
-        env = county.environment if hasattr(county, 'environment') else None
-        if env:
-            avg_altitude = (env.altitude_m_min + env.altitude_m_max) / 2
-            avg_temp = (env.temperature_c_min + env.temperature_c_max) / 2
-            
-            # Highland/Lowland species matching
-            if 'highland_bonus' in species_config and avg_altitude > 1500:
-                playbook_prediction += species_config['highland_bonus']
-            elif 'lowland_penalty' in species_config and avg_altitude > 1500:
-                playbook_prediction += species_config['lowland_penalty']
-            
-            if 'highland_penalty' in species_config and avg_altitude > 1500:
-                playbook_prediction += species_config['highland_penalty']
-            elif 'drought_bonus' in species_config and avg_altitude < 1000:
-                playbook_prediction += species_config['drought_bonus']
-            
-            # Temperature matching
-            if 'optimal_temp' in species_config:
-                temp_min, temp_max = species_config['optimal_temp']
-                if temp_min <= avg_temp <= temp_max:
-                    playbook_prediction += 8  # Optimal temperature bonus
-                elif avg_temp < temp_min - 5 or avg_temp > temp_max + 5:
-                    playbook_prediction -= 12  # Temperature stress penalty
-            
-            # Adaptation bonuses
-            if 'adaptation_bonus' in species_config:
-                playbook_prediction += species_config['adaptation_bonus']
-            if 'versatile_bonus' in species_config:
-                playbook_prediction += species_config['versatile_bonus']
-        
-        # Apply seasonal adjustments
-        if seasonal_bonus != 0:
-            playbook_prediction += seasonal_bonus
-        
-        # Care level adjustments
-        care_adjustments = {'High': 8, 'Medium': 0, 'Low': -5}
-        playbook_prediction += care_adjustments.get(care_level, 0)
-        playbook_prediction = max(15, min(95, playbook_prediction))
-        
+        # Step 2: Species-specific playbook prediction comes from the precomputed lookup above
         print(f"   Playbook prediction: {playbook_prediction:.1f}%")
         
         # Step 3: Combine predictions with ML failure handling
@@ -313,22 +256,51 @@ def predict_tree_survival(request):
         print(f"   Reason: {county_species.recommendation_reason}")
         print(f"   Season: {planting_season} (bonus: {seasonal_bonus:+}%)")
 
-        # Generate intelligent explanation that matches the prediction
-        try:
-            from .mistral_ai import generate_tree_explanation
-            llm_context = {
-                'species': tree_species_name,
-                'county': county_name,
-                'season': planting_season,
-                'survival_rate': final_survival_rate,
-                'risk_level': risk_level,
-                'reason': county_species.recommendation_reason,
-                'seasonal_bonus': seasonal_bonus,
-                'best_season': species.best_season
-            }
-            explanation = generate_tree_explanation(llm_context)
-            print(f"   Enhanced explanation generated")
-        except Exception as e:
+        # Generate intelligent explanation and care instructions that match the prediction
+        from . import mistral_ai
+        llm_context = {
+            'species': tree_species_name,
+            'county': county_name,
+            'season': planting_season,
+            'survival_rate': final_survival_rate,
+            'risk_level': risk_level,
+            'reason': county_species.recommendation_reason,
+            'seasonal_bonus': seasonal_bonus,
+            'best_season': species.best_season
+        }
+        care_context = {
+            'species': tree_species_name,
+            'county': county_name,
+            'season': planting_season,
+            'survival_rate': final_survival_rate,
+            'risk_level': risk_level,
+            'base_care': species.care_instructions or []
+        }
+        explanation = after_care = None
+        explanation_job = None
+        if mistral_ai.client:
+            # Only cached LLM text is used inline; misses are generated in the background
+            try:
+                explanation = mistral_ai.get_cached_explanation(llm_context)
+                after_care = mistral_ai.get_cached_care_instructions(care_context)
+            except Exception as e:
+                print(f"   LLM cache lookup failed: {e}")
+            if explanation is None or after_care is None:
+                try:
+                    from .llm_jobs import start_explanation_job
+                    explanation_job = start_explanation_job(llm_context, care_context)
+                    print(f"   LLM text queued as job {explanation_job.pk}")
+                except Exception as e:
+                    print(f"   Failed to queue LLM job: {e}")
+        else:
+            # Without an API key the generators return static text instantly
+            try:
+                explanation = mistral_ai.generate_tree_explanation(llm_context)
+                after_care = mistral_ai.generate_care_instructions(care_context)
+            except Exception as e:
+                print(f"   Static explanation failed: {e}")
+
+        if explanation is None:
             print(f"   Using enhanced fallback explanation")
             # Enhanced fallback that matches the prediction
             if final_survival_rate >= 75:
@@ -340,20 +312,7 @@ def predict_tree_survival(request):
             else:
                 explanation = f"{tree_species_name} encounters significant challenges in {county_name} during {planting_season}. Though {county_species.recommendation_reason.lower()}, current timing and conditions are not optimal."
         
-        # Generate intelligent care instructions that match the risk level
-        try:
-            from .mistral_ai import generate_care_instructions
-            care_context = {
-                'species': tree_species_name,
-                'county': county_name,
-                'season': planting_season,
-                'survival_rate': final_survival_rate,
-                'risk_level': risk_level,
-                'base_care': species.care_instructions or []
-            }
-            after_care = generate_care_instructions(care_context)
-            print(f"   Enhanced care instructions generated")
-        except Exception as e:
+        if after_care is None:
             print(f"   Using enhanced care instructions")
             # Enhanced care instructions based on risk level
             if final_survival_rate >= 80:  # Low risk - standard care
@@ -373,11 +332,8 @@ def predict_tree_survival(request):
                 good_alternatives = []
                 for alt_cs in alternative_species:
                     alt_seasonal = alt_cs.seasonal_performance or {}
-                    alt_bonus = 0
-                    for season_key, bonus in alt_seasonal.items():
-                        if any(month in planting_season_lower for month in ['march', 'april', 'may', 'june', 'july', 'august', 'september', 'sept', 'october', 'oct', 'november', 'december', 'dec'] if month in season_key.lower()):
-                            alt_bonus = bonus
-                            break
+                    alt_season_key = match_season_key(alt_seasonal, planting_season)
+                    alt_bonus = alt_seasonal[alt_season_key] if alt_season_key is not None else 0
                     # Only consider species with significantly better survival rates (avoid circular recommendations)
                     if alt_bonus >= 0 and alt_cs.survival_rate > final_survival_rate + 15:  # Must be 15% better
                         good_alternatives.append(alt_cs.species.name)
@@ -397,24 +353,13 @@ def predict_tree_survival(request):
         # Save weather snapshot and prediction (if logged in)
         weather_snapshot = None
         if hasattr(request, 'user') and request.user.is_authenticated:
-            # Save weather snapshot for audit trail
-            from .models import WeatherSnapshot
+            # Link the cached weather snapshot for audit trail
             if hasattr(county, 'latitude') and hasattr(county, 'longitude'):
                 try:
                     from .weather_service import WeatherService
-                    live_weather = WeatherService.get_weather(county.latitude, county.longitude)
-                    if live_weather:
-                        weather_snapshot = WeatherSnapshot.objects.create(
-                            latitude=county.latitude,
-                            longitude=county.longitude,
-                            temperature_c=live_weather['temperature'],
-                            humidity=live_weather['humidity'],
-                            rain_mm_hour=live_weather['rainfall'],
-                            wind_speed=live_weather['wind_speed'],
-                            cached=False
-                        )
+                    weather_snapshot = WeatherService.get_weather_snapshot(county.latitude, county.longitude)
                 except Exception as e:
-                    print(f"Failed to save weather snapshot: {e}", flush=True)
+                    print(f"Failed to load weather snapshot: {e}", flush=True)
             
             # Calculate confidence based on data sources
             from .utils import get_confidence_label
@@ -506,6 +451,7 @@ def predict_tree_survival(request):
             "ml_confidence": ml_confidence,
             "after_care": after_care,
             "explanation": explanation,
+            "explanation_job_id": str(explanation_job.pk) if explanation_job else None,
             "species_rank": county_species.species_rank,
             "match_score": county_species.environmental_match_score,
             "recommendation_reason": county_species.recommendation_reason,
@@ -570,8 +516,8 @@ def detect_county_api(request):
         lat = float(data.get('lat'))
         lon = float(data.get('lon'))
         
-        from .utils import detect_nearest_county
-        county = detect_nearest_county(lat, lon)
+        from .county_boundaries import detect_county
+        county = detect_county(lat, lon)
         
         return JsonResponse({
             "success": True,
@@ -586,3 +532,14 @@ def detect_county_api(request):
             "error": str(e),
             "county": None
         })
+
+@require_http_methods(["GET"])
+def prediction_explanation(request, job_id):
+    """
+    Poll for the LLM explanation and care instructions of a prediction
+    """
+    from .llm_jobs import get_job, job_payload
+    job = get_job(job_id)
+    if not job:
+        return JsonResponse({"success": False, "error": "Explanation job not found"}, status=404)
+    return JsonResponse(job_payload(job))
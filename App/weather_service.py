@@ -1,77 +1,438 @@
-import requests
+import logging
+import threading
 import time
+from collections import OrderedDict
+from datetime import timedelta
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from . import http_client
 
-#in-memory cache 
-_WEATHER_CACHE = {}
-CACHE_TTL = 60 * 60  
+logger = logging.getLogger(__name__)
+
+# Cache settings (overridable in settings.py)
+CACHE_TTL = getattr(settings, 'WEATHER_CACHE_TTL', 60 * 60)
+CACHE_STALE_TTL = getattr(settings, 'WEATHER_CACHE_STALE_TTL', 6 * 60 * 60)
+CACHE_GRID_DEGREES = getattr(settings, 'WEATHER_CACHE_GRID_DEGREES', 0.05)
+CACHE_MAX_ENTRIES = getattr(settings, 'WEATHER_CACHE_MAX_ENTRIES', 512)
+SNAPSHOT_RETENTION_DAYS = getattr(settings, 'WEATHER_SNAPSHOT_RETENTION_DAYS', 7)
+
+# Fetches on the request path fail fast without retries and fall back to
+# stale or default weather; prefetch_county_weather keeps the client's retries
+REQUEST_TIMEOUT = getattr(settings, 'WEATHER_REQUEST_TIMEOUT', 3)
+REQUEST_TIMEOUTS = (http_client.HTTP_CONNECT_TIMEOUT, REQUEST_TIMEOUT)
+
+# Circuit breaker settings
+BREAKER_FAILURE_THRESHOLD = getattr(settings, 'WEATHER_BREAKER_FAILURE_THRESHOLD', 5)
+BREAKER_COOLDOWN = getattr(settings, 'WEATHER_BREAKER_COOLDOWN', 5 * 60)
+
+
+def snap_coordinates(lat, lon, grid=None):
+    """Snap coordinates to the cache grid so nearby farms share one entry"""
+    grid = grid or CACHE_GRID_DEGREES
+    return (
+        round(round(float(lat) / grid) * grid, 4),
+        round(round(float(lon) / grid) * grid, 4),
+    )
+
+
+def is_entry_fresh(entry):
+    """Entries older than CACHE_TTL are stale and get revalidated in the background"""
+    return time.time() - entry["timestamp"] < CACHE_TTL
+
+
+class WeatherCache:
+    """In-process LRU cache with a TTL, shared by all threads of a worker"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL + CACHE_STALE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["timestamp"] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, data, timestamp=None, snapshot_id=None):
+        entry = {
+            "timestamp": timestamp or time.time(),
+            "data": data,
+            "snapshot_id": snapshot_id,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result"""
+
+    def __init__(self, wait_timeout=15):
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def is_running(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None}
+                self._calls[key] = call
+
+        if not leader:
+            call["event"].wait(self.wait_timeout)
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+        return call["result"]
+
+
+class CircuitBreaker:
+    """Stop calling a failing API for a cool-down period after repeated failures"""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.time() - self._opened_at < self.cooldown or self._trial_running:
+                return False
+            # Half-open: let one trial call through
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.time()
+            self._trial_running = False
+
+
+# In-process tier; the shared tier is the WeatherSnapshot table
+_WEATHER_CACHE = WeatherCache()
+# Waiters give up only after the leader's fetch would have timed out
+_IN_FLIGHT = SingleFlight(wait_timeout=sum(REQUEST_TIMEOUTS) + 1)
+_BREAKER = CircuitBreaker()
 
 
 class WeatherService:
     BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
 
+    @staticmethod
+    def cache_key(lat, lon):
+        snapped_lat, snapped_lon = snap_coordinates(lat, lon)
+        return f"{snapped_lat:.4f},{snapped_lon:.4f}"
+
+    @staticmethod
+    def snapshot_to_weather(snapshot):
+        """Convert a WeatherSnapshot row into the get_weather() dict format"""
+        return {
+            "temperature": snapshot.temperature_c,
+            "humidity": snapshot.humidity,
+            "wind_speed": snapshot.wind_speed,
+            "rainfall": snapshot.rain_mm_hour,
+            "pressure": snapshot.pressure,
+            "weather_main": snapshot.weather_main,
+        }
+
     @classmethod
-    def get_weather(cls, lat, lon):
+    def _get_shared(cls, cache_key):
+        """Look up the newest usable (fresh or stale) snapshot written by any worker"""
+        from .models import WeatherSnapshot
+        cutoff = timezone.now() - timedelta(seconds=CACHE_TTL + CACHE_STALE_TTL)
+        try:
+            return WeatherSnapshot.objects.filter(
+                grid_key=cache_key, created_at__gte=cutoff
+            ).order_by('-created_at').first()
+        except Exception as e:
+            logger.warning("Shared weather cache lookup failed: %s", e)
+            return None
+
+    @classmethod
+    def _store_shared(cls, cache_key, weather_data):
+        """Persist fetched weather so other workers and restarts can reuse it"""
+        from .models import WeatherSnapshot
+        snapped_lat, snapped_lon = (float(part) for part in cache_key.split(","))
+        try:
+            return WeatherSnapshot.objects.create(
+                grid_key=cache_key,
+                latitude=snapped_lat,
+                longitude=snapped_lon,
+                temperature_c=weather_data["temperature"],
+                humidity=weather_data["humidity"],
+                rain_mm_hour=weather_data["rainfall"],
+                wind_speed=weather_data["wind_speed"],
+                pressure=weather_data["pressure"],
+                weather_main=weather_data["weather_main"],
+                cached=False,
+            )
+        except Exception as e:
+            logger.warning("Shared weather cache write failed: %s", e)
+            return None
+
+    @classmethod
+    def _cached_entry(cls, cache_key):
+        """Return the newest cache entry from either tier, which may be stale"""
+        #Check in-process cache
+        cached = _WEATHER_CACHE.get(cache_key)
+        if cached and is_entry_fresh(cached):
+            logger.debug("Using cached weather for %s", cache_key)
+            return cached
+
+        #Check shared cache, another worker may have refreshed it
+        snapshot = cls._get_shared(cache_key)
+        if snapshot and (not cached or snapshot.created_at.timestamp() > cached["timestamp"]):
+            logger.debug("Using shared cached weather for %s", cache_key)
+            return _WEATHER_CACHE.set(
+                cache_key,
+                cls.snapshot_to_weather(snapshot),
+                timestamp=snapshot.created_at.timestamp(),
+                snapshot_id=snapshot.pk,
+            )
+        return cached
+
+    @classmethod
+    def _refresh(cls, lat, lon):
+        """Fetch from the API and store the result in both tiers"""
+        weather_data = cls.fetch_weather(*snap_coordinates(lat, lon))
+        if not weather_data:
+            return None
+        return cls.store_weather(lat, lon, weather_data)
+
+    @classmethod
+    def _refresh_in_background(cls, lat, lon):
+        """Revalidate a stale entry without blocking the request"""
+        cache_key = cls.cache_key(lat, lon)
+        if _IN_FLIGHT.is_running(cache_key):
+            return
+
+        def run():
+            try:
+                _IN_FLIGHT.do(cache_key, lambda: cls._refresh(lat, lon))
+            finally:
+                connection.close()  # Thread-local DB connection opened by the refresh
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @classmethod
+    def _lookup(cls, lat, lon):
+        """Return the cache entry for coordinates, fetching from the API on a miss"""
+        cache_key = cls.cache_key(lat, lon)
+
+        entry = cls._cached_entry(cache_key)
+        if entry:
+            if not is_entry_fresh(entry):
+                # Stale-while-revalidate: serve the old value, refresh behind it
+                logger.info("Serving stale weather for %s, refreshing in background", cache_key)
+                cls._refresh_in_background(lat, lon)
+            return entry
+
+        # Miss: concurrent requests for the same cell share one API call
+        return _IN_FLIGHT.do(cache_key, lambda: cls._refresh(lat, lon))
+
+    @classmethod
+    def store_weather(cls, lat, lon, weather_data):
         """
-        Get current weather data for coordinates with caching
+        Save fetched weather to both cache tiers and return the cache entry
         """
-        cache_key = f"{lat},{lon}"
-        now = time.time()
+        cache_key = cls.cache_key(lat, lon)
+        snapshot = cls._store_shared(cache_key, weather_data)
+        return _WEATHER_CACHE.set(cache_key, weather_data, snapshot_id=snapshot.pk if snapshot else None)
 
-        #Check cache
-        if cache_key in _WEATHER_CACHE:
-            cached = _WEATHER_CACHE[cache_key]
-            if now - cached["timestamp"] < CACHE_TTL:
-                print(f"[WEATHER] Using cached data for {lat},{lon}")
-                return cached["data"]
+    @classmethod
+    def is_fresh(cls, lat, lon, max_age=None):
+        """
+        Check whether the shared cache holds weather younger than max_age seconds
+        """
+        from .models import WeatherSnapshot
+        max_age = CACHE_TTL if max_age is None else max_age
+        cutoff = timezone.now() - timedelta(seconds=max_age)
+        return WeatherSnapshot.objects.filter(
+            grid_key=cls.cache_key(lat, lon), created_at__gte=cutoff
+        ).exists()
 
-        #Call API
-        if not settings.OPENWEATHER_API_KEY:
-            print("[WEATHER] No API key configured, using fallback")
-            return None
+    @staticmethod
+    def prune_snapshots(days=SNAPSHOT_RETENTION_DAYS):
+        """
+        Delete snapshots older than days that no prediction references; returns how many
+        """
+        from .models import WeatherSnapshot
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = WeatherSnapshot.objects.filter(
+            created_at__lt=cutoff, treeprediction__isnull=True
+        ).delete()
+        return deleted
 
-        params = {
+    @staticmethod
+    def _request_params(lat, lon):
+        return {
             "lat": lat,
             "lon": lon,
             "units": "metric",
             "appid": settings.OPENWEATHER_API_KEY,
         }
 
+    @staticmethod
+    def _parse_response(raw):
+        """Extract the fields we use from a 2.5 API response"""
+        main = raw.get("main", {})
+        wind = raw.get("wind", {})
+        rain = raw.get("rain", {})
+        weather = raw.get("weather", [{}])[0]
+
+        return {
+            "temperature": main.get("temp", 20.0),
+            "humidity": main.get("humidity", 65),
+            "wind_speed": wind.get("speed", 2.0),
+            "rainfall": rain.get("1h", 0.0),
+            "pressure": main.get("pressure", 1013),
+            "weather_main": weather.get("main", "Clear"),
+        }
+
+    @staticmethod
+    def _can_call_api():
+        if not settings.OPENWEATHER_API_KEY:
+            logger.warning("No OpenWeather API key configured, using fallback")
+            return False
+
+        if not _BREAKER.allow():
+            logger.warning("Weather circuit open after repeated failures, using fallback")
+            return False
+        return True
+
+    @classmethod
+    def fetch_weather(cls, lat, lon, retries=0, timeout=REQUEST_TIMEOUTS):
+        """
+        Call the OpenWeather API, bypassing the cache
+
+        Defaults suit the request path; batch callers pass retries=None and a
+        longer timeout to use the HTTP client's defaults.
+        """
+        if not cls._can_call_api():
+            return None
+
         try:
-            print(f"[WEATHER] Calling API for {lat},{lon}", flush=True)
-            response = requests.get(cls.BASE_URL, params=params, timeout=10)
+            logger.info("Calling weather API for %s,%s", lat, lon)
+            response = http_client.get(cls.BASE_URL, params=cls._request_params(lat, lon), retries=retries, timeout=timeout)
             response.raise_for_status()
-            raw = response.json()
-
-            #Extract data from 2.5 API 
-            main = raw.get("main", {})
-            wind = raw.get("wind", {})
-            rain = raw.get("rain", {})
-            weather = raw.get("weather", [{}])[0]
-            
-            weather_data = {
-                "temperature": main.get("temp", 20.0),
-                "humidity": main.get("humidity", 65),
-                "wind_speed": wind.get("speed", 2.0),
-                "rainfall": rain.get("1h", 0.0),
-                "pressure": main.get("pressure", 1013),
-                "weather_main": weather.get("main", "Clear"),
-            }
-
-            #Save to cache
-            _WEATHER_CACHE[cache_key] = {
-                "timestamp": now,
-                "data": weather_data,
-            }
-
-            print(f"[WEATHER] API success: {weather_data['temperature']}°C, {weather_data['humidity']}% humidity", flush=True)
+            weather_data = cls._parse_response(response.json())
+
+            _BREAKER.record_success()
+            logger.info("Weather API success: %s°C, %s%% humidity", weather_data['temperature'], weather_data['humidity'])
             return weather_data
 
         except Exception as e:
-            print(f"[WEATHER] API failed: {e}")
+            _BREAKER.record_failure()
+            logger.warning("Weather API failed: %s", e)
             #Fail gracefully
             return None
 
+    @classmethod
+    async def afetch_weather(cls, lat, lon):
+        """
+        asyncio variant of fetch_weather() for async views
+        """
+        if not cls._can_call_api():
+            return None
+
+        try:
+            logger.info("Calling weather API for %s,%s", lat, lon)
+            response = await http_client.async_get(
+                cls.BASE_URL, params=cls._request_params(lat, lon), retries=0,
+                timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=http_client.HTTP_CONNECT_TIMEOUT),
+            )
+            response.raise_for_status()
+            weather_data = cls._parse_response(response.json())
+
+            _BREAKER.record_success()
+            return weather_data
+
+        except Exception as e:
+            _BREAKER.record_failure()
+            logger.warning("Weather API failed: %s", e)
+            return None
+
+    @classmethod
+    def get_weather(cls, lat, lon):
+        """
+        Get current weather data for coordinates with caching
+        """
+        entry = cls._lookup(lat, lon)
+        return entry["data"] if entry else None
+
+    @classmethod
+    async def aget_weather(cls, lat, lon):
+        """
+        asyncio variant of get_weather(); the API call does not block a thread
+        """
+        cache_key = cls.cache_key(lat, lon)
+        entry = _WEATHER_CACHE.get(cache_key)
+        if not entry or not is_entry_fresh(entry):
+            entry = await sync_to_async(cls._cached_entry)(cache_key)
+
+        if entry:
+            if not is_entry_fresh(entry):
+                cls._refresh_in_background(lat, lon)
+            return entry["data"]
+
+        weather_data = await cls.afetch_weather(*snap_coordinates(lat, lon))
+        if not weather_data:
+            return None
+        await sync_to_async(cls.store_weather)(lat, lon, weather_data)
+        return weather_data
+
+    @classmethod
+    def get_weather_snapshot(cls, lat, lon):
+        """
+        Get the WeatherSnapshot row backing the cached weather for coordinates
+        """
+        from .models import WeatherSnapshot
+        entry = cls._lookup(lat, lon)
+        if not entry or not entry["snapshot_id"]:
+            return None
+        return WeatherSnapshot.objects.filter(pk=entry["snapshot_id"]).first()
+
     @classmethod
     def get_weather_summary(cls, lat, lon):
         """
@@ -80,5 +441,5 @@ class WeatherService:
         weather = cls.get_weather(lat, lon)
         if not weather:
             return "Weather data unavailable"
-        
-        return f"{weather['temperature']:.1f}°C, {weather['humidity']}% humidity, {weather['weather_main']}"
\ No newline at end of file
+
+        return f"{weather['temperature']:.1f}°C, {weather['humidity']}% humidity, {weather['weather_main']}"
@@ -212,6 +212,15 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default=None)
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='MsituGuard <noreply@msituguard.com>')
 SERVER_EMAIL = config('EMAIL_HOST_USER', default='noreply@msituguard.com')
 
+SITE_URL = config('SITE_URL', default='http://127.0.0.1:8000')  # absolute links in emails sent outside a request
+
+# Transactional email outbox (App/email_outbox.py)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)  # messages per SMTP connection
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)  # then the message is marked failed
+EMAIL_OUTBOX_BACKOFF_BASE = config('EMAIL_OUTBOX_BACKOFF_BASE', default=60, cast=int)  # seconds, doubled per retry with jitter
+EMAIL_OUTBOX_BACKOFF_MAX = config('EMAIL_OUTBOX_BACKOFF_MAX', default=60 * 60, cast=int)  # seconds
+EMAIL_OUTBOX_CLAIM_TIMEOUT = config('EMAIL_OUTBOX_CLAIM_TIMEOUT', default=10 * 60, cast=int)  # reclaim messages stuck in sending
+
 
 # Django Allauth Configuration
 SITE_ID = 1
@@ -254,16 +263,71 @@ SOCIALACCOUNT_PROVIDERS = {
 GOOGLE_OAUTH2_CLIENT_ID = config('GOOGLE_OAUTH2_CLIENT_ID', default=None)
 GOOGLE_OAUTH2_CLIENT_SECRET = config('GOOGLE_OAUTH2_CLIENT_SECRET', default=None)
 
+# Shared outbound HTTP pool (App/http_client.py)
+HTTP_CONNECT_TIMEOUT = config('HTTP_CONNECT_TIMEOUT', default=3.05, cast=float)  # seconds
+HTTP_READ_TIMEOUT = config('HTTP_READ_TIMEOUT', default=10, cast=float)  # seconds
+HTTP_POOL_MAXSIZE = config('HTTP_POOL_MAXSIZE', default=10, cast=int)  # keep-alive connections per host
+HTTP_MAX_PER_HOST = config('HTTP_MAX_PER_HOST', default=8, cast=int)  # concurrent requests per host
+HTTP_MAX_RETRIES = config('HTTP_MAX_RETRIES', default=2, cast=int)  # idempotent requests only
+HTTP_BACKOFF_BASE = config('HTTP_BACKOFF_BASE', default=0.5, cast=float)  # seconds, doubled per retry with jitter
+HTTP_BACKOFF_MAX = config('HTTP_BACKOFF_MAX', default=8, cast=float)  # seconds
+
+# County boundary polygons for point-in-polygon county detection (App/county_boundaries.py)
+COUNTY_BOUNDARIES_GEOJSON = config('COUNTY_BOUNDARIES_GEOJSON', default='')  # path to a county boundary FeatureCollection; required for polygon lookups (check App.W001)
+COUNTY_BOUNDARY_GRID_DEGREES = config('COUNTY_BOUNDARY_GRID_DEGREES', default=0.25, cast=float)  # bounding-box grid cell size
+
+# Near-duplicate tree photo detection (treeregistration/photo_index.py)
+PHOTO_DUPLICATE_DISTANCE = config('PHOTO_DUPLICATE_DISTANCE', default=6, cast=int)  # max differing bits of the 64-bit dHash
+
+# Dashboards (treeregistration/services.py, App/org_dashboard.py)
+TREE_ANALYTICS_CACHE_TTL = config('TREE_ANALYTICS_CACHE_TTL', default=60, cast=int)  # seconds the dashboard figures are reused
+ORG_DASHBOARD_PAGE_SIZE = config('ORG_DASHBOARD_PAGE_SIZE', default=24, cast=int)  # report / tree cards per page
+ORG_DASHBOARD_MARKER_PAGE_SIZE = config('ORG_DASHBOARD_MARKER_PAGE_SIZE', default=500, cast=int)  # map markers per request
+
 # Free geocoding APIs for location detection (no payment required)
 OPENSTREETMAP_API_URL = 'https://nominatim.openstreetmap.org/reverse'
 LOCATIONIQ_API_KEY = config('LOCATIONIQ_API_KEY', default=None)  # Free tier: 5000 requests/day
 
 # OpenWeather API Configuration
 OPENWEATHER_API_KEY = os.environ.get('OPENWEATHER_API_KEY')
+WEATHER_CACHE_TTL = config('WEATHER_CACHE_TTL', default=60 * 60, cast=int)  # seconds
+WEATHER_CACHE_STALE_TTL = config('WEATHER_CACHE_STALE_TTL', default=6 * 60 * 60, cast=int)  # serve stale while refreshing
+WEATHER_BREAKER_FAILURE_THRESHOLD = config('WEATHER_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+WEATHER_BREAKER_COOLDOWN = config('WEATHER_BREAKER_COOLDOWN', default=5 * 60, cast=int)  # seconds
+WEATHER_CACHE_GRID_DEGREES = config('WEATHER_CACHE_GRID_DEGREES', default=0.05, cast=float)  # ~5.5km cells
+WEATHER_CACHE_MAX_ENTRIES = config('WEATHER_CACHE_MAX_ENTRIES', default=512, cast=int)  # per-process LRU size
+WEATHER_REQUEST_TIMEOUT = config('WEATHER_REQUEST_TIMEOUT', default=3, cast=float)  # read timeout for fetches on the request path, not retried
+WEATHER_SNAPSHOT_RETENTION_DAYS = config('WEATHER_SNAPSHOT_RETENTION_DAYS', default=7, cast=int)  # snapshots no prediction references
 
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Persistent Mistral response cache (App/llm_cache.py)
+LLM_CACHE_TTL = config('LLM_CACHE_TTL', default=30 * 24 * 60 * 60, cast=int)  # seconds
+LLM_CACHE_MAX_ENTRIES = config('LLM_CACHE_MAX_ENTRIES', default=5000, cast=int)  # LRU eviction beyond this
+LLM_CACHE_SURVIVAL_BUCKET = config('LLM_CACHE_SURVIVAL_BUCKET', default=5, cast=int)  # percentage points
+LLM_CACHE_EVICT_EVERY = config('LLM_CACHE_EVICT_EVERY', default=100, cast=int)  # stores per process between evictions
+
+# Public page fragment / payload cache (App/page_cache.py)
+PAGE_CACHE_TTL = config('PAGE_CACHE_TTL', default=10 * 60, cast=int)  # seconds, backstop for writes that bypass signals
+
+# Background LLM explanation jobs (App/llm_jobs.py)
+LLM_JOB_WORKERS = config('LLM_JOB_WORKERS', default=2, cast=int)  # threads per process
+LLM_JOB_POLL_INTERVAL = config('LLM_JOB_POLL_INTERVAL', default=1.0, cast=float)  # seconds between client polls
+LLM_JOB_EXPIRY_SECONDS = config('LLM_JOB_EXPIRY_SECONDS', default=5 * 60, cast=int)  # unfinished jobs older than this fail
+LLM_JOB_RETENTION_DAYS = config('LLM_JOB_RETENTION_DAYS', default=7, cast=int)  # prune_explanation_jobs deletes older rows
+
+# Background image processing (App/media_pipeline.py)
+MEDIA_STAGING_PREFIX = config('MEDIA_STAGING_PREFIX', default='media_staging')  # originals awaiting processing, in the default storage
+MEDIA_WORKERS = config('MEDIA_WORKERS', default=2, cast=int)  # threads per process
+MEDIA_MAX_ATTEMPTS = config('MEDIA_MAX_ATTEMPTS', default=3, cast=int)
+MEDIA_JPEG_QUALITY = config('MEDIA_JPEG_QUALITY', default=85, cast=int)
+MEDIA_STALE_MINUTES = config('MEDIA_STALE_MINUTES', default=30, cast=int)  # processing attempts older than this are retried
+
+# Background bulk exports (App/export_jobs.py)
+EXPORT_ROOT = config('EXPORT_ROOT', default=os.path.join(BASE_DIR, 'exports'))  # local directory for export files
+EXPORT_JOB_WORKERS = config('EXPORT_JOB_WORKERS', default=1, cast=int)  # threads per process
+
 # MISTRAL AI Configuration - Debug and load from secret file
 MISTRAL_API_KEY = os.environ.get('MISTRAL_API_KEY')
 print(f"Environment MISTRAL_API_KEY: {'Found' if MISTRAL_API_KEY else 'Not found'}")
@@ -313,6 +377,12 @@ LOGGING = {
         'App.adapters': {
             'handlers': ['console'],
             'level': 'DEBUG',
+            'propagate': False,
+        },
+        # Background pipelines (email outbox, exports, media, LLM jobs, weather, HTTP client)
+        'App': {
+            'handlers': ['console'],
+            'level': config('APP_LOG_LEVEL', default='INFO'),
         },
         'allauth': {
             'handlers': ['console'],
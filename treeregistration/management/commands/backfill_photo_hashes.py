@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from treeregistration.models import Tree, generate_perceptual_hash
+
+class Command(BaseCommand):
+    help = "Compute perceptual hashes for tree photos so near-duplicate uploads can be detected"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute trees that already have a hash')
+        parser.add_argument('--batch-size', type=int, default=500, help='Trees hashed and updated per batch')
+
+    def handle(self, *args, **options):
+        trees = Tree.objects.exclude(photo='')
+        if not options['all']:
+            trees = trees.filter(photo_dhash='')
+
+        batch_size = max(1, options['batch_size'])
+        tree_ids = list(trees.order_by('pk').values_list('pk', flat=True))
+        self.stdout.write(f"Hashing {len(tree_ids)} tree photos...")
+
+        updated = 0
+        failed = []
+        for start in range(0, len(tree_ids), batch_size):
+            batch = list(Tree.objects.filter(pk__in=tree_ids[start:start + batch_size]).only('pk', 'photo'))
+            changed = []
+            for tree in batch:
+                try:
+                    with tree.photo.open('rb') as photo:
+                        tree.set_perceptual_hash(generate_perceptual_hash(photo))
+                except Exception as e:
+                    failed.append(tree.pk)
+                    self.stdout.write(f"  Tree {tree.pk}: {e}")
+                    continue
+                changed.append(tree)
+            # bulk_update skips Tree.save(), which would bump the uploader's tree count
+            Tree.objects.bulk_update(changed, ['photo_dhash', 'dhash_0', 'dhash_1', 'dhash_2', 'dhash_3'])
+            updated += len(changed)
+            self.stdout.write(f"  {updated} of {len(tree_ids)} hashed")
+
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Could not hash {len(failed)} photos"))
+        self.stdout.write(self.style.SUCCESS(f"Stored perceptual hashes for {updated} trees"))
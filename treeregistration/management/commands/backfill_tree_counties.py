@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from App.county_boundaries import detect_counties
+from treeregistration.models import Tree
+
+class Command(BaseCommand):
+    help = "Resolve detected_county for uploaded trees from their GPS coordinates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-resolve trees that already have a county')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Trees resolved and updated per batch')
+
+    def handle(self, *args, **options):
+        trees = Tree.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        if not options['all']:
+            trees = trees.filter(detected_county__isnull=True) | trees.filter(detected_county='')
+
+        batch_size = max(1, options['batch_size'])
+        tree_ids = list(trees.order_by('pk').values_list('pk', flat=True))
+        self.stdout.write(f"Resolving counties for {len(tree_ids)} trees...")
+
+        updated = 0
+        for start in range(0, len(tree_ids), batch_size):
+            batch = list(Tree.objects.filter(pk__in=tree_ids[start:start + batch_size]).only('pk', 'latitude', 'longitude', 'detected_county'))
+            counties = detect_counties([(tree.latitude, tree.longitude) for tree in batch])
+            changed = []
+            for tree, county in zip(batch, counties):
+                if tree.detected_county != county:
+                    tree.detected_county = county
+                    changed.append(tree)
+            # bulk_update skips Tree.save(), which would bump the uploader's tree count
+            Tree.objects.bulk_update(changed, ['detected_county'])
+            updated += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f"Updated detected_county for {updated} trees"))
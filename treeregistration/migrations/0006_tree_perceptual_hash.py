@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-17 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('treeregistration', '0005_tree_detected_county_tree_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tree',
+            name='dhash_0',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='dhash_1',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='dhash_2',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='dhash_3',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='photo_dhash',
+            field=models.CharField(blank=True, default='', help_text='Perceptual hash of the photo', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='tree',
+            name='photo_hash',
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 import hashlib
@@ -21,33 +23,52 @@ class UserProfile(models.Model):
     tree_count = models.PositiveIntegerField(default=0)
     badge = models.CharField(max_length=20, default="None")
 
+    # Badge thresholds per user type, highest first
+    BADGE_THRESHOLDS = {
+        INDIVIDUAL: [(1000, "Diamond"), (500, "Gold"), (300, "Silver"), (100, "Bronze")],  # 500 + 500 for diamond
+        ORGANISATION: [(10000, "Diamond"), (5000, "Gold"), (3000, "Silver"), (1000, "Bronze")],  # 5000 + 5000 for diamond
+    }
+
+    @classmethod
+    def badge_for(cls, user_type, tree_count):
+        for threshold, badge in cls.BADGE_THRESHOLDS.get(user_type, []):
+            if tree_count >= threshold:
+                return badge
+        return "None"
+
+    @classmethod
+    def badge_expression(cls, tree_count):
+        """SQL CASE that picks the badge for a tree_count expression, per user_type"""
+        return Case(
+            *[
+                When(GreaterThanOrEqual(tree_count, threshold), user_type=user_type, then=Value(badge))
+                for user_type, thresholds in cls.BADGE_THRESHOLDS.items()
+                for threshold, badge in thresholds
+            ],
+            default=Value("None"),
+            output_field=models.CharField(),
+        )
+
+    @classmethod
+    def add_trees(cls, user, count=1):
+        """
+        Add count trees to a user's profile in one UPDATE, recomputing the badge
+
+        The badge CASE reads tree_count + count because the UPDATE's right-hand
+        side still sees the old row, so concurrent uploads never lose increments.
+        """
+        if not count:
+            return
+        new_count = F('tree_count') + count
+        changes = {'tree_count': new_count, 'badge': cls.badge_expression(new_count)}
+        if not cls.objects.filter(user=user).update(**changes):
+            cls.objects.get_or_create(user=user)
+            cls.objects.filter(user=user).update(**changes)
+
     def update_badge(self):
         """Update badge based on user_type and tree_count."""
         old_badge = self.badge
-        
-        if self.user_type == self.INDIVIDUAL:
-            if self.tree_count >= 1000:  # 500 + 500 for diamond
-                self.badge = "Diamond"
-            elif self.tree_count >= 500:
-                self.badge = "Gold"
-            elif self.tree_count >= 300:
-                self.badge = "Silver"
-            elif self.tree_count >= 100:
-                self.badge = "Bronze"
-            else:
-                self.badge = "None"
-
-        elif self.user_type == self.ORGANISATION:
-            if self.tree_count >= 10000:  # 5000 + 5000 for diamond
-                self.badge = "Diamond"
-            elif self.tree_count >= 5000:
-                self.badge = "Gold"
-            elif self.tree_count >= 3000:
-                self.badge = "Silver"
-            elif self.tree_count >= 1000:
-                self.badge = "Bronze"
-            else:
-                self.badge = "None"
+        self.badge = self.badge_for(self.user_type, self.tree_count)
         
         # Only save if badge changed
         if old_badge != self.badge:
@@ -67,6 +88,26 @@ def generate_photo_hash(image_file) -> str:
     return hasher.hexdigest()
 
 
+def generate_perceptual_hash(image_file) -> str:
+    """
+    64-bit difference hash (dHash) of an image, as 16 hex digits.
+
+    Unlike the MD5 hash it barely changes when a photo is resized,
+    recompressed or re-saved, so near-duplicates have hashes a few bits apart.
+    """
+    from PIL import Image, ImageOps
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        image = ImageOps.exif_transpose(image).convert('L').resize((9, 8), Image.LANCZOS)
+        pixels = list(image.getdata())
+    image_file.seek(0)
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
 # -----------------------------
 # Tree Model
 # -----------------------------
@@ -74,27 +115,76 @@ class Tree(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='treeregistration_trees')
     photo = models.ImageField(upload_to="tree_photos/")
     uploaded_at = models.DateTimeField(auto_now_add=True)
-    photo_hash = models.CharField(max_length=64)
+    photo_hash = models.CharField(max_length=64, db_index=True)
+    photo_dhash = models.CharField(max_length=16, blank=True, default='', help_text="Perceptual hash of the photo")
+    # The perceptual hash split into four 16-bit chunks for near-duplicate lookups (see photo_index.py)
+    dhash_0 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    dhash_1 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    dhash_2 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    dhash_3 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
     latitude = models.FloatField(null=True, blank=True, help_text="GPS latitude coordinate")
     longitude = models.FloatField(null=True, blank=True, help_text="GPS longitude coordinate")
     location_name = models.CharField(max_length=255, null=True, blank=True, help_text="Location name")
     detected_county = models.CharField(max_length=100, null=True, blank=True, help_text="Detected county from location service")
 
     def save(self, *args, **kwargs):
-        # Generate hash if not already set
+        self.fill_photo_hashes()
+
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        # Count the tree (and update the badge) once, when it is first saved
+        if adding:
+            UserProfile.add_trees(self.user)
+
+    def fill_photo_hashes(self):
+        """Generate the exact and perceptual photo hashes if not already set"""
         if not self.photo_hash and self.photo:
             self.photo_hash = generate_photo_hash(self.photo)
+        if not self.photo_dhash and self.photo:
+            try:
+                self.set_perceptual_hash(generate_perceptual_hash(self.photo))
+            except Exception as e:
+                print(f"Perceptual hash failed for {self.photo.name}: {e}")
 
-        super().save(*args, **kwargs)
+    @classmethod
+    def bulk_import(cls, user, trees, batch_size=1000):
+        """
+        Insert many of a user's trees and count them in one profile UPDATE
 
-        # Increment user's tree count and update badge
-        profile, created = UserProfile.objects.get_or_create(user=self.user)
-        profile.tree_count += 1
-        badge_changed = profile.update_badge()
-        profile.save()
-        
-        if badge_changed:
-            print(f"Congratulations! {self.user.username} earned a new badge: {profile.badge}!")
+        Photos are hashed like save() does, and trees whose photo matches a
+        stored tree or an earlier one in the batch, exactly or nearly, are
+        skipped as upload_tree would reject them. Returns the created trees.
+        """
+        from .photo_index import PHOTO_DUPLICATE_DISTANCE, find_near_duplicates, hamming
+        for tree in trees:
+            tree.user = user
+            tree.fill_photo_hashes()
+
+        seen_hashes = set(cls.objects.filter(
+            photo_hash__in=[tree.photo_hash for tree in trees]
+        ).values_list('photo_hash', flat=True))
+        accepted = []
+        for tree in trees:
+            if tree.photo_hash in seen_hashes:
+                continue
+            if tree.photo_dhash and (
+                find_near_duplicates(tree.photo_dhash, limit=1)
+                or any(other.photo_dhash and hamming(tree.photo_dhash, other.photo_dhash) <= PHOTO_DUPLICATE_DISTANCE
+                       for other in accepted)
+            ):
+                continue
+            seen_hashes.add(tree.photo_hash)
+            accepted.append(tree)
+
+        created = cls.objects.bulk_create(accepted, batch_size=batch_size)
+        UserProfile.add_trees(user, len(created))
+        return created
+
+    def set_perceptual_hash(self, dhash):
+        from .photo_index import hash_chunks
+        self.photo_dhash = dhash
+        self.dhash_0, self.dhash_1, self.dhash_2, self.dhash_3 = hash_chunks(dhash)
 
     def __str__(self):
         return f"Tree {self.id} by {self.user.username}"
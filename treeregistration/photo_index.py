@@ -0,0 +1,66 @@
+"""
+Near-duplicate lookup for tree photos by perceptual hash
+
+Each Tree stores its 64-bit dHash split into four indexed 16-bit chunks
+(multi-index hashing). Two hashes within Hamming distance d must agree to
+within d // 4 bits on at least one chunk, so candidates are fetched with
+indexed equality lookups on the chunk values within that radius, and only
+those candidates are compared bit by bit. Lookups touch a few index ranges
+instead of scanning every tree.
+"""
+from functools import reduce
+from itertools import combinations
+from operator import or_
+from django.conf import settings
+from django.db.models import Q
+
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_FIELDS = [f'dhash_{i}' for i in range(CHUNKS)]
+
+# Hashes this many bits apart or fewer are treated as the same photo
+PHOTO_DUPLICATE_DISTANCE = getattr(settings, 'PHOTO_DUPLICATE_DISTANCE', 6)
+
+
+def hash_chunks(dhash):
+    """Split a 16-hex-digit hash into CHUNKS integers, most significant first"""
+    value = int(dhash, 16)
+    mask = (1 << CHUNK_BITS) - 1
+    return tuple((value >> (CHUNK_BITS * (CHUNKS - 1 - i))) & mask for i in range(CHUNKS))
+
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def chunk_neighbors(chunk, radius):
+    """Every chunk value within radius bits of chunk"""
+    values = [chunk]
+    for distance in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), distance):
+            values.append(reduce(lambda value, bit: value ^ (1 << bit), bits, chunk))
+    return values
+
+
+def candidate_filter(dhash, max_distance):
+    radius = max_distance // CHUNKS
+    return reduce(or_, (
+        Q(**{f'{field}__in': chunk_neighbors(chunk, radius)})
+        for field, chunk in zip(CHUNK_FIELDS, hash_chunks(dhash))
+    ))
+
+
+def find_near_duplicates(dhash, max_distance=PHOTO_DUPLICATE_DISTANCE, exclude_pk=None, limit=5):
+    """Return up to limit (tree, distance) pairs whose photo is within max_distance bits, closest first"""
+    from .models import Tree
+    candidates = Tree.objects.filter(candidate_filter(dhash, max_distance)).only('pk', 'user', 'photo', 'photo_dhash', 'uploaded_at')
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+
+    matches = []
+    for tree in candidates:
+        distance = hamming(dhash, tree.photo_dhash)
+        if distance <= max_distance:
+            matches.append((tree, distance))
+    matches.sort(key=lambda match: match[1])
+    return matches[:limit]
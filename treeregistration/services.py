@@ -1,7 +1,24 @@
+"""
+Analytics for the tree registration dashboards
+
+Every figure comes from a grouped query (per user type, per badge, per month)
+rather than one COUNT per bucket, and get_dashboard_stats() caches the whole
+set for TREE_ANALYTICS_CACHE_TTL seconds so the admin dashboard renders with
+a constant number of queries.
+"""
+from datetime import date
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db.models import Count
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
-from datetime import timedelta
-from .models import User, Tree
+from .models import Tree, UserProfile
+
+TREE_ANALYTICS_CACHE_TTL = getattr(settings, 'TREE_ANALYTICS_CACHE_TTL', 60)
+DASHBOARD_CACHE_KEY = 'treeregistration:dashboard_stats'
+
+BADGES = ["None", "Bronze", "Silver", "Gold", "Diamond"]
 
 
 # Total number of trees in the system
@@ -9,54 +26,95 @@ def get_total_trees():
     return Tree.objects.count()
 
 
-# Count of users by type
+# Users and uploaded trees per user type
 def get_user_counts():
+    users = dict(
+        UserProfile.objects.values('user_type').annotate(total=Count('pk')).values_list('user_type', 'total')
+    )
+    trees = dict(
+        Tree.objects.values('user__treeregistration_profile__user_type').annotate(total=Count('pk'))
+        .values_list('user__treeregistration_profile__user_type', 'total')
+    )
     return {
-        "individuals": User.objects.filter(user_type=User.INDIVIDUAL).count(),
-        "organisations": User.objects.filter(user_type=User.ORGANISATION).count(),
+        "individuals": users.get(UserProfile.INDIVIDUAL, 0),
+        "organisations": users.get(UserProfile.ORGANISATION, 0),
+        "individual_trees": trees.get(UserProfile.INDIVIDUAL, 0),
+        "organisation_trees": trees.get(UserProfile.ORGANISATION, 0),
+        "total_trees": sum(trees.values()),
     }
 
 
-# Leaderboard: Top users by tree_count
+# Leaderboard: Top profiles by tree_count
 def get_leaderboard(limit=10):
-    return User.objects.order_by('-tree_count')[:limit]
+    return list(UserProfile.objects.select_related('user').order_by('-tree_count')[:limit])
 
 
 # Badge distribution: Count of users per badge
 def get_badge_distribution():
-    badges = ["None", "Bronze", "Silver", "Gold", "Diamond"]
-    return {badge: User.objects.filter(badge=badge).count() for badge in badges}
+    counts = dict(UserProfile.objects.values('badge').annotate(total=Count('pk')).values_list('badge', 'total'))
+    return {badge: counts.get(badge, 0) for badge in BADGES}
 
 
-# Monthly tree uploads for the past N months (default 6)
-def get_monthly_tree_uploads(months=6):
-    today = timezone.now().date()
-    data = []
+def _month_starts(months, today):
+    """First day of each of the last N calendar months, oldest first"""
+    year, month = today.year, today.month
+    starts = []
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return list(reversed(starts))
 
-    for i in range(months):
-        month_start = today - timedelta(days=30 * (i + 1))
-        month_end = today - timedelta(days=30 * i)
-        count = Tree.objects.filter(
-            uploaded_at__gte=month_start,
-            uploaded_at__lt=month_end
-        ).count()
-        data.append({
-            "month": month_end.strftime("%B %Y"),
-            "trees_uploaded": count
-        })
 
-    return list(reversed(data))
+# Monthly tree uploads for the past N calendar months (default 6), in one grouped query
+def get_monthly_tree_uploads(months=6):
+    starts = _month_starts(months, timezone.localdate())
+    counts = {
+        row['month'].date() if hasattr(row['month'], 'date') else row['month']: row['total']
+        for row in Tree.objects.filter(uploaded_at__date__gte=starts[0])
+        .annotate(month=TruncMonth('uploaded_at')).values('month').annotate(total=Count('pk'))
+    }
+    return [
+        {"month": start.strftime("%B %Y"), "trees_uploaded": counts.get(start, 0)}
+        for start in starts
+    ]
 
 
 # Organisation analytics: Returns list of org users with tree counts
 def get_org_analytics():
-    return User.objects.filter(
-        user_type=User.ORGANISATION
-    ).values("username", "tree_count").order_by("-tree_count")
+    return UserProfile.objects.filter(
+        user_type=UserProfile.ORGANISATION
+    ).values("user__username", "tree_count").order_by("-tree_count")
 
 
 # Individual analytics: Returns list of individual users with tree counts
 def get_individual_analytics():
-    return User.objects.filter(
-        user_type=User.INDIVIDUAL
-    ).values("username", "tree_count").order_by("-tree_count")
+    return UserProfile.objects.filter(
+        user_type=UserProfile.INDIVIDUAL
+    ).values("user__username", "tree_count").order_by("-tree_count")
+
+
+def compute_dashboard_stats():
+    user_counts = get_user_counts()
+    return {
+        'total_users': User.objects.count(),
+        'total_trees': user_counts['total_trees'],
+        'individual_count': user_counts['individuals'],
+        'individual_trees': user_counts['individual_trees'],
+        'org_count': user_counts['organisations'],
+        'org_trees': user_counts['organisation_trees'],
+        'badge_distribution': get_badge_distribution(),
+        'monthly_uploads': get_monthly_tree_uploads(),
+        'recent_trees': list(
+            Tree.objects.select_related('user__treeregistration_profile').order_by('-uploaded_at')[:10]
+        ),
+        'top_users': get_leaderboard(),
+    }
+
+
+def get_dashboard_stats():
+    """Dashboard figures, cached for TREE_ANALYTICS_CACHE_TTL seconds"""
+    stats = cache.get(DASHBOARD_CACHE_KEY)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(DASHBOARD_CACHE_KEY, stats, timeout=TREE_ANALYTICS_CACHE_TTL)
+    return stats
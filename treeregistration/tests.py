@@ -1,3 +1,87 @@
-from django.test import TestCase
+import random
+import shutil
+import tempfile
+from io import BytesIO
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from .models import Tree, UserProfile
+from .photo_index import find_near_duplicates, hash_chunks
 
-# Create your tests here.
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def photo(seed, name, quality=90, size=(64, 64)):
+    """A noise JPEG; the same seed gives the same picture"""
+    rng = random.Random(seed)
+    image = Image.new('L', (16, 16))
+    image.putdata([rng.randrange(256) for _ in range(16 * 16)])
+    buffer = BytesIO()
+    image.resize(size).convert('RGB').save(buffer, 'JPEG', quality=quality)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TreeBulkImportTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user('grower', 'grower@example.com', 'password')
+
+    def test_imports_hashed_trees_and_counts_them_once(self):
+        created = Tree.bulk_import(self.user, [Tree(photo=photo(seed, f'{seed}.jpg')) for seed in (1, 2, 3)])
+
+        self.assertEqual(len(created), 3)
+        for tree in Tree.objects.all():
+            self.assertTrue(tree.photo_hash)
+            self.assertEqual(len(tree.photo_dhash), 16)
+            self.assertIsNotNone(tree.dhash_0)
+        self.assertEqual(UserProfile.objects.get(user=self.user).tree_count, 3)
+
+    def test_skips_exact_and_near_duplicates(self):
+        Tree.objects.create(user=self.user, photo=photo(1, 'stored.jpg'))
+        created = Tree.bulk_import(self.user, [
+            Tree(photo=photo(1, 'same.jpg')),                           # same bytes as the stored photo
+            Tree(photo=photo(2, 'new.jpg')),
+            Tree(photo=photo(2, 'resaved.jpg', quality=60, size=(96, 96))),  # re-encoded copy in the batch
+        ])
+
+        self.assertEqual([tree.photo.name.split('/')[-1] for tree in created], ['new.jpg'])
+        self.assertEqual(Tree.objects.count(), 2)
+        self.assertEqual(UserProfile.objects.get(user=self.user).tree_count, 2)
+
+
+class PhotoIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('indexer', 'indexer@example.com', 'password')
+
+    def tree(self, dhash):
+        tree = Tree(user=self.user, photo=f'{dhash}.jpg', photo_hash=dhash)
+        tree.set_perceptual_hash(dhash)
+        tree.save()
+        return tree
+
+    def flip(self, dhash, *bits):
+        value = int(dhash, 16)
+        for bit in bits:
+            value ^= 1 << bit
+        return f'{value:016x}'
+
+    def test_hash_chunks_split_most_significant_first(self):
+        self.assertEqual(hash_chunks('0123456789abcdef'), (0x0123, 0x4567, 0x89ab, 0xcdef))
+
+    def test_finds_hashes_within_distance_closest_first(self):
+        base = '0123456789abcdef'
+        # Differences spread over every chunk still share one chunk within d // 4 bits
+        near = self.tree(self.flip(base, 0, 17, 33, 49, 50))
+        nearer = self.tree(self.flip(base, 60))
+        self.tree(self.flip(base, 0, 1, 16, 17, 32, 33, 48, 49))
+        self.tree('fedcba9876543210')
+
+        matches = find_near_duplicates(base, max_distance=6)
+        self.assertEqual([(tree.pk, distance) for tree, distance in matches], [(nearer.pk, 1), (near.pk, 5)])
+        self.assertEqual(find_near_duplicates(base, max_distance=6, exclude_pk=nearer.pk, limit=1)[0][0].pk, near.pk)
@@ -87,37 +87,9 @@ def home(request):
 
 @staff_member_required
 def admin_dashboard(request):
-    # Get statistics
-    total_users = User.objects.count()
-    total_trees = Tree.objects.count()
-    
-    # Individual users stats
-    individual_users = User.objects.filter(treeregistration_profile__user_type='individual')
-    individual_count = individual_users.count()
-    individual_trees = Tree.objects.filter(user__treeregistration_profile__user_type='individual').count()
-    
-    # Organization users stats
-    org_users = User.objects.filter(treeregistration_profile__user_type='organisation')
-    org_count = org_users.count()
-    org_trees = Tree.objects.filter(user__treeregistration_profile__user_type='organisation').count()
-    
-    # Recent trees
-    recent_trees = Tree.objects.select_related('user').order_by('-uploaded_at')[:10]
-    
-    # Top users
-    top_users = User.objects.filter(treeregistration_profile__isnull=False).order_by('-treeregistration_profile__tree_count')[:10]
-    
-    context = {
-        'total_users': total_users,
-        'total_trees': total_trees,
-        'individual_count': individual_count,
-        'individual_trees': individual_trees,
-        'org_count': org_count,
-        'org_trees': org_trees,
-        'recent_trees': recent_trees,
-        'top_users': top_users,
-    }
-    return render(request, 'treeregistration/admin_dashboard.html', context)
+    # Grouped, cached statistics (see services.py)
+    from .services import get_dashboard_stats
+    return render(request, 'treeregistration/admin_dashboard.html', get_dashboard_stats())
 
 
 @staff_member_required
@@ -175,9 +147,23 @@ def upload_tree(request):
                 form.add_error('photo', 'This tree photo has already been uploaded!')
                 return render(request, "treeregistration/upload.html", {"form": form})
             
+            # Catch resized, recompressed or re-saved copies of an uploaded photo
+            from .models import generate_perceptual_hash
+            from .photo_index import find_near_duplicates
+            try:
+                photo_dhash = generate_perceptual_hash(request.FILES['photo'])
+            except Exception as e:
+                print(f"Perceptual hash failed: {e}")
+                photo_dhash = ''
+            if photo_dhash and find_near_duplicates(photo_dhash, limit=1):
+                form.add_error('photo', 'This tree photo looks like one that has already been uploaded!')
+                return render(request, "treeregistration/upload.html", {"form": form})
+            
             tree = form.save(commit=False)
             tree.user = request.user
             tree.photo_hash = photo_hash  # Set hash to avoid regenerating
+            if photo_dhash:
+                tree.set_perceptual_hash(photo_dhash)
             
             # Get location data if provided
             latitude = request.POST.get('latitude')
@@ -188,17 +174,11 @@ def upload_tree(request):
                 tree.latitude = float(latitude)
                 tree.longitude = float(longitude)
                 
-                # Use location service to detect county and region
+                # Resolve the county from boundary polygons (nearest centroid outside them)
                 try:
-                    from Tree_Prediction.integration.location_service import get_accurate_location
-                    location_data = get_accurate_location(float(latitude), float(longitude))
-                    if location_data.get('success', False):
-                        tree.detected_county = location_data.get('county', '')
-                        if not location_name:
-                            tree.location_name = location_data.get('county', 'Unknown Location')
-                    else:
-                        tree.detected_county = ''
-                        tree.location_name = location_name or 'Unknown Location'
+                    from App.county_boundaries import detect_county
+                    tree.detected_county = detect_county(tree.latitude, tree.longitude)
+                    tree.location_name = location_name or tree.detected_county
                 except Exception as e:
                     print(f"Location detection error: {e}")
                     tree.detected_county = ''
@@ -207,7 +187,12 @@ def upload_tree(request):
                 tree.location_name = location_name or 'Unknown Location'
                 tree.detected_county = ''
             
+            # The photo is processed and uploaded in the background
+            photo = request.FILES['photo']
+            tree.photo = None
             tree.save()
+            from App.media_pipeline import stage_upload
+            stage_upload(tree, 'photo', photo)
             return redirect("profile_detail")
     else:
         form = TreeUploadForm()